@@ -0,0 +1,133 @@
+'''
+# 命令解析耗时对比
+
+比较原`CommandParser.__call__`(逐个参数`index`查找, 逐个子解析器`re.search`)与预先生成解析计划后的单次遍历
+
+```bash
+python -m benchmarks.command_parse
+```
+'''
+import re
+import timeit
+
+from typing import Any, Type
+
+from chara.lib.commandparse import CommandParser, KeywordArgument, ParseResult, split_command
+
+
+class LegacyCommandParser(CommandParser):
+    '''## 原解析实现'''
+
+    __slots__ = ()
+
+    def __call__(self, command: str | list[str]) -> ParseResult:
+        if isinstance(command, str):
+            command_args = split_command(command)
+        else:
+            command_args = command
+
+        if command_args:
+            command_start = command_args[0]
+            for sub_parser in self.sub_parsers:
+                if re.search(sub_parser.pattern, command_start):
+                    result = sub_parser(command_args[1:])
+                    result.commands.insert(0, self.start)
+                    return result
+
+        result_command = [self.start]
+        result_flags = {flag.name: False for flag in self.flags}
+        result_kwargs = {kwarg.name: kwarg.default for kwarg in self.kwargs}
+        result_posargs: list[Any] = list()
+        result_uncatch: list[str] = list()
+        catched_kwargs: dict[str, KeywordArgument] = dict()
+        len_command_args = len(command_args)
+        command_args_mask = [0] * len_command_args
+
+        for kwarg in self.kwargs:
+            if (key := kwarg.key) not in command_args:
+                continue
+            index = command_args.index(key)
+            command_args_mask[index] = 3
+            catched_kwargs[key] = kwarg
+
+        for flag in self.flags:
+            if flag.name not in command_args:
+                continue
+            index = command_args.index(flag.name)
+            command_args_mask[index] = 1
+
+        if self.posargs:
+            for i in range(len_command_args):
+                if command_args_mask[i] == 0:
+                    command_args_mask[i] = 2
+                else:
+                    break
+        last_arg = ''
+        last_mask = 0
+        for index, mask in enumerate(command_args_mask):
+            arg = command_args[index]
+            if mask == 0:
+                if last_mask == 3 and last_arg in catched_kwargs:
+                    kwarg = catched_kwargs[last_arg]
+                    result_kwargs[kwarg.name] = kwarg.as_type(arg)
+                else:
+                    result_uncatch.append(command_args[index])
+            elif mask == 1:
+                result_flags[arg] = True
+            elif mask == 2:
+                len_posargs = len(result_posargs)
+                result_posargs.append(self.posargs[len_posargs].as_type(arg))
+
+            last_arg = arg
+            last_mask = mask
+        if (lack := len(result_posargs) - len(self.posargs)) > 0:
+            result_posargs.extend([arg.default for arg in self.posargs[-lack:]])
+
+        return ParseResult(result_command, result_flags, result_kwargs, result_posargs, result_uncatch)
+
+
+def build(cls: Type[CommandParser], start: str = '^/admin$', depth: int = 0) -> CommandParser:
+    '''## 三层子解析器, 每层12个子命令, 每个解析器20个标记参数与20个键值参数'''
+    parser = cls(start)
+    for i in range(20):
+        parser.add_flag_argument(f'--flag{i}')
+        parser.add_keyword_argument(f'opt{i}', default=i, as_type=int)
+    parser.add_postion_argument()
+    parser.add_postion_argument(as_type=int)
+    if depth < 2:
+        for i in range(12):
+            parser.add_sub_parser(build(cls, f'^sub{depth}x{i}$' if i % 2 else f'cmd{depth}x{i}', depth + 1))
+    return parser
+
+
+COMMANDS = [
+    ['sub0x11', 'sub1x7', 'name', '3', '--flag3', '-opt5', '10', '--flag19', '-opt19', '7', 'extra'],
+    ['cmd0x10', 'cmd1x4', '--flag0', '-opt0', '1', '-opt1', '2', '-opt2', '3', '--flag1'],
+    ['sub0x5', 'target', '2', '-opt7', '99'],
+    ['name', '1', '--flag10', '-opt10', '4', 'a', 'b', 'c'],
+]
+
+
+def _dump(result: ParseResult) -> tuple[Any, ...]:
+    return result.commands, result.flags, result.kwargs, result.posargs, result.uncatch
+
+
+def main() -> None:
+    legacy = build(LegacyCommandParser)
+    compiled = build(CommandParser)
+    compiled.compile()
+    for command in COMMANDS:
+        assert _dump(legacy(list(command))) == _dump(compiled(list(command))), command
+
+    number = 5000
+    total = number * len(COMMANDS)
+    for name, parser in (('legacy', legacy), ('compiled', compiled)):
+        def run() -> None:
+            for command in COMMANDS:
+                parser(command)
+        elapsed = min(timeit.repeat(run, number=number, repeat=5))
+        print(f'{name:>9}: {elapsed / total * 1e6:7.2f} us/command')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+'''
+# 群消息事件构建开销对比
+
+比较pydantic事件模型与`chara.onebot.compact`紧凑事件的构建耗时与单个事件内存占用
+
+```bash
+python -m benchmarks.event_construct
+```
+'''
+import gc
+import timeit
+import tracemalloc
+
+from typing import Any, Callable
+
+from chara.core.bot.event import get_event
+from chara.lib import codec
+
+
+# 典型的群消息: 回复 + at + 文本 + 表情
+GROUP_MESSAGE: dict[str, Any] = {
+    'time': 1700000000,
+    'self_id': 12345678,
+    'post_type': 'message',
+    'message_type': 'group',
+    'sub_type': 'normal',
+    'message_id': 1024,
+    'group_id': 87654321,
+    'user_id': 23456789,
+    'anonymous': None,
+    'font': 0,
+    'raw_message': '[CQ:reply,id=1023][CQ:at,qq=12345678] 今天[晚饭]吃什么&喝什么[CQ:face,id=178]',
+    'message': [
+        {'type': 'reply', 'data': {'id': '1023'}},
+        {'type': 'at', 'data': {'qq': '12345678'}},
+        {'type': 'text', 'data': {'text': ' 今天[晚饭]吃什么&喝什么'}},
+        {'type': 'face', 'data': {'id': '178'}},
+    ],
+    'sender': {
+        'user_id': 23456789,
+        'nickname': 'chara',
+        'card': '',
+        'sex': 'unknown',
+        'age': 0,
+        'area': '',
+        'level': '1',
+        'role': 'member',
+        'title': '',
+    },
+}
+
+
+# 从JSON数据构建, 紧凑事件引用的原始消息段计入内存占用
+GROUP_MESSAGE_JSON = codec.dumps(GROUP_MESSAGE)
+
+
+def _check() -> None:
+    model = get_event(GROUP_MESSAGE)
+    compact = get_event(GROUP_MESSAGE, True)
+    assert model is not None and compact is not None
+    for name in ('pure_text', 'at_ids', 'at_all', 'at_me', 'reply_id', 'group_id', 'user_id', 'raw_message'):
+        assert getattr(model, name) == getattr(compact, name), name
+    assert model.sender.role == compact.sender.role # type: ignore
+    assert str(model.message) == str(compact.message)
+
+
+def _memory(build: Callable[[], Any], count: int = 10000) -> float:
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.take_snapshot()
+    events = [build() for _ in range(count)]
+    end = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in end.compare_to(start, 'filename'))
+    del events
+    return size / count
+
+
+def main() -> None:
+    _check()
+
+    cases: list[tuple[str, Callable[[], Any]]] = [
+        ('model', lambda: get_event(codec.loads(GROUP_MESSAGE_JSON))),
+        ('compact', lambda: get_event(codec.loads(GROUP_MESSAGE_JSON), True)),
+        ('compact+text', lambda: get_event(codec.loads(GROUP_MESSAGE_JSON), True).pure_text), # type: ignore
+    ]
+    number = 20000
+    print(f'json backend: {codec.BACKEND}')
+    for name, build in cases:
+        elapsed = min(timeit.repeat(build, number=number, repeat=5))
+        print(f'{name:>12}: {elapsed / number * 1e6:7.2f} us/event')
+
+    for name, build in cases[:2]:
+        print(f'{name:>12}: {_memory(build):7.0f} bytes/event')
+
+
+if __name__ == '__main__':
+    main()
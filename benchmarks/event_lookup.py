@@ -0,0 +1,102 @@
+'''
+# 事件类型查找耗时对比
+
+比较原`chara.lib.tree.Node`逐层查找与扁平查找表`get_event_class`的耗时
+
+```bash
+python -m benchmarks.event_lookup
+```
+'''
+import timeit
+
+from itertools import chain
+from typing import Any, Type
+
+from chara.core.bot.event import get_event_class
+from chara.lib.tree import Node
+from chara.onebot.events import Event
+
+
+_SUB_POST_TYPES = ['message_type', 'meta_event_type', 'notice_type', 'request_type']
+
+# 按实际比例录制的事件组合: 群消息为主, 其次为私聊消息/心跳/通知/请求
+RECORDED_EVENTS: list[dict[str, Any]] = (
+    [{'post_type': 'message', 'message_type': 'group', 'sub_type': 'normal'}] * 60
+    + [{'post_type': 'message', 'message_type': 'private', 'sub_type': 'friend'}] * 10
+    + [{'post_type': 'meta_event', 'meta_event_type': 'heartbeat'}] * 15
+    + [{'post_type': 'meta_event', 'meta_event_type': 'lifecycle', 'sub_type': 'connect'}] * 1
+    + [{'post_type': 'notice', 'notice_type': 'notify', 'sub_type': 'poke'}] * 4
+    + [{'post_type': 'notice', 'notice_type': 'group_recall'}] * 4
+    + [{'post_type': 'notice', 'notice_type': 'group_increase', 'sub_type': 'approve'}] * 3
+    + [{'post_type': 'request', 'request_type': 'friend'}] * 2
+    + [{'post_type': 'request', 'request_type': 'group', 'sub_type': 'add'}] * 1
+)
+
+
+def _generate_event_tree() -> Node:
+    def get_subclass(cls: Type[Event] | list[Type[Event]]) -> list[Type[Event]]:
+        if isinstance(cls, list):
+            return list(chain(*[get_subclass(c) for c in cls]))
+        elif subcls := cls.__subclasses__():
+            return get_subclass(subcls) + [cls]
+        return [cls]
+
+    tree = Node()
+    for event in get_subclass(Event):
+        pt = event.model_fields.get('post_type', None)
+        rt = None
+        st = event.model_fields.get('sub_type')
+        for spt in _SUB_POST_TYPES:
+            if rt := event.model_fields.get(spt, None):
+                break
+        pt_v = pt.default if pt and not pt.is_required() else None
+        rt_v = rt.default if rt and not rt.is_required() else None
+        st_v = st.default if st and not st.is_required() else None
+        tree[pt_v, rt_v, st_v] = Node(event)
+    return tree
+
+
+_EVENT_TREE = _generate_event_tree()
+
+
+def _get_event_nodes(json_data: dict[str, Any]) -> tuple[Any, Any, Any]:
+    sub_type = None
+    if 'notice_type' in json_data:
+        sub_type = json_data.get('sub_type', None)
+    for post_type in _SUB_POST_TYPES:
+        if _type := json_data.get(post_type, None):
+            return post_type, _type, sub_type
+    return None, None, None
+
+
+def tree_lookup() -> None:
+    for data in RECORDED_EVENTS:
+        if node := _EVENT_TREE[_get_event_nodes(data)]:
+            node.value
+
+
+def table_lookup() -> None:
+    for data in RECORDED_EVENTS:
+        get_event_class(data)
+
+
+def main() -> None:
+    unresolved = 0
+    for data in RECORDED_EVENTS:
+        if node := _EVENT_TREE[_get_event_nodes(data)]:
+            assert node.value is get_event_class(data), data
+        else:
+            # 树查找不支持通配, 带sub_type的通知事件(如group_increase.approve)无法找到
+            assert get_event_class(data) is not None, data
+            unresolved += 1
+    print(f'events unresolved by tree: {unresolved}/{len(RECORDED_EVENTS)}')
+
+    number = 2000
+    total = number * len(RECORDED_EVENTS)
+    for name, func in (('tree', tree_lookup), ('table', table_lookup)):
+        elapsed = min(timeit.repeat(func, number=number, repeat=5))
+        print(f'{name:>6}: {elapsed / total * 1e9:8.1f} ns/event')
+
+
+if __name__ == '__main__':
+    main()
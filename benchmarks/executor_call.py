@@ -0,0 +1,94 @@
+'''
+# 处理函数与检查器调用开销对比
+
+比较原`Executor`(每次调用前后两次逐个`isinstance`扫描)与按实参类型缓存参数绑定后的调用耗时
+
+- handler: `Handler.__call__`中的`verify_params` + 调用处理函数
+- checker: 触发器条件中的单个检查器
+
+```bash
+python -m benchmarks.executor_call
+```
+'''
+import asyncio
+import time
+
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+
+from benchmarks.event_construct import GROUP_MESSAGE
+from chara.core.bot import Bot
+from chara.core.bot.event import get_event
+from chara.core.plugin import Handler, Trigger, TriggerCapturedData
+from chara.lib.executor import Executor
+from chara.onebot.events import GroupMessageEvent, MessageEvent
+
+
+class LegacyExecutor:
+    '''## 原执行器实现'''
+
+    __slots__ = ('executor', 'annotations')
+
+    def __init__(self, func: Callable[..., Any]) -> None:
+        self.executor = Executor(func)
+        self.annotations = self.executor._Executor__param_annotations # type: ignore
+
+    def verify_params(self, params: tuple[Any, ...]) -> bool:
+        return all(any(isinstance(arg, t) for arg in params) for t in self.annotations)
+
+    async def __call__(self, *params: Any) -> Any:
+        func = self.executor.func
+        args = tuple(next((param for param in params if isinstance(param, t)), None) for t in self.annotations)
+        if self.executor.awaitable:
+            return await func(*args) # type: ignore
+        return func(*args)
+
+
+async def handle(bot: Bot, event: GroupMessageEvent, handler: Handler, tcd: TriggerCapturedData) -> None:
+    pass
+
+async def check(bot: Bot, event: MessageEvent, trigger: Trigger, context: ContextVar[TriggerCapturedData]) -> bool:
+    return True
+
+
+def _params() -> tuple[tuple[Any, ...], tuple[Any, ...]]:
+    bot = Bot.__new__(Bot)
+    event = get_event(GROUP_MESSAGE)
+    handler = Handler.__new__(Handler)
+    trigger = Trigger.__new__(Trigger)
+    tcd = TriggerCapturedData(bot, event, dict()) # type: ignore
+    handler_params = (event, handler, bot, trigger, tcd)
+    checker_params = (event, trigger, bot, ContextVar('tcd'))
+    return handler_params, checker_params
+
+
+async def _run(call: Callable[[], Awaitable[Any]], number: int) -> float:
+    start = time.perf_counter()
+    for _ in range(number):
+        await call()
+    return time.perf_counter() - start
+
+
+async def main() -> None:
+    handler_params, checker_params = _params()
+    number = 50000
+
+    for name, factory in (('legacy', LegacyExecutor), ('cached', Executor)):
+        handler_exc = factory(handle)
+        checker_exc = factory(check)
+
+        async def handler_call() -> None:
+            if handler_exc.verify_params(handler_params):
+                await handler_exc(*handler_params)
+
+        async def checker_call() -> None:
+            if checker_exc.verify_params(checker_params):
+                await checker_exc(*checker_params)
+
+        for case, call in (('handler', handler_call), ('checker', checker_call)):
+            elapsed = min([await _run(call, number) for _ in range(5)])
+            print(f'{name:>8} {case}: {elapsed / number * 1e6:6.2f} us/call')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
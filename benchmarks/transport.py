@@ -0,0 +1,127 @@
+'''
+# 事件广播传输方式吞吐对比
+
+比较主进程向多个子进程广播事件时`pipe`与`ring`两种传输方式的耗时
+
+```bash
+python -m benchmarks.transport
+```
+'''
+import pickle
+import time
+
+from multiprocessing import get_context
+from multiprocessing.connection import Connection
+
+from chara.core.share import SharedRingBuffer
+
+
+EVENTS = 20000
+RING_SIZE = 4 * 1024 * 1024
+SIGNAL_RING = b'chara.signal.ring'
+SIGNAL_DONE = b'chara.signal.done'
+
+SAMPLE_EVENT = {
+    'time': 1700000000,
+    'self_id': 12345678,
+    'post_type': 'message',
+    'message_type': 'group',
+    'sub_type': 'normal',
+    'message_id': 1234567,
+    'group_id': 87654321,
+    'user_id': 23456789,
+    'message': [{'type': 'text', 'data': {'text': '这是一条用于测试的群消息' * 4}}],
+    'raw_message': '这是一条用于测试的群消息' * 4,
+    'font': 0,
+    'sender': {'user_id': 23456789, 'nickname': 'tester', 'card': '', 'role': 'member'},
+}
+
+
+def _consume_pipe(conn: Connection) -> None:
+    count = 0
+    while (data := conn.recv_bytes()) != SIGNAL_DONE:
+        pickle.loads(data)
+        count += 1
+    conn.send(count)
+
+
+def _consume_ring(conn: Connection, ring_name: str) -> None:
+    from chara.core import hazard
+    
+    hazard.IN_SUB_PROCESS = True
+    ring = SharedRingBuffer(ring_name, RING_SIZE)
+    conn.send(None)
+    count = 0
+    while (data := conn.recv_bytes()) != SIGNAL_DONE:
+        for record in ring.read():
+            pickle.loads(record)
+            count += 1
+    for record in ring.read():
+        pickle.loads(record)
+        count += 1
+    conn.send((count, ring.lost))
+    ring.close()
+
+
+def bench_pipe(workers: int) -> float:
+    ctx = get_context('spawn')
+    pipes = [ctx.Pipe() for _ in range(workers)]
+    processes = [ctx.Process(target=_consume_pipe, args=(child,)) for _, child in pipes]
+    for process in processes:
+        process.start()
+
+    start = time.perf_counter()
+    for _ in range(EVENTS):
+        data = pickle.dumps(SAMPLE_EVENT)
+        for parent, _ in pipes:
+            parent.send_bytes(data)
+    for parent, _ in pipes:
+        parent.send_bytes(SIGNAL_DONE)
+    counts = [parent.recv() for parent, _ in pipes]
+    elapsed = time.perf_counter() - start
+
+    for process in processes:
+        process.join()
+    assert all(count == EVENTS for count in counts)
+    return elapsed
+
+
+def bench_ring(workers: int) -> tuple[float, int]:
+    ring_name = f'chara_bench_ring_{workers}'
+    ring = SharedRingBuffer(ring_name, RING_SIZE)
+    ctx = get_context('spawn')
+    pipes = [ctx.Pipe() for _ in range(workers)]
+    processes = [ctx.Process(target=_consume_ring, args=(child, ring_name)) for _, child in pipes]
+    for process in processes:
+        process.start()
+    for parent, _ in pipes:
+        parent.recv()
+
+    start = time.perf_counter()
+    for _ in range(EVENTS):
+        ring.write(pickle.dumps(SAMPLE_EVENT))
+        # 最坏情况: 每个事件都发送一次通知, 实际分发时通知会在发送队列中合并
+        for parent, _ in pipes:
+            parent.send_bytes(SIGNAL_RING)
+    for parent, _ in pipes:
+        parent.send_bytes(SIGNAL_DONE)
+    results = [parent.recv() for parent, _ in pipes]
+    elapsed = time.perf_counter() - start
+
+    for process in processes:
+        process.join()
+    ring.unlink()
+    return elapsed, sum(lost for _, lost in results)
+
+
+def main() -> None:
+    print(f'events: {EVENTS}, event size: {len(pickle.dumps(SAMPLE_EVENT))} bytes')
+    print(f'{"workers":>8} {"pipe(ev/s)":>12} {"ring(ev/s)":>12} {"ring lost":>10}')
+    for workers in (1, 2, 4, 8):
+        pipe_elapsed = bench_pipe(workers)
+        ring_elapsed, lost = bench_ring(workers)
+        print(f'{workers:>8} {EVENTS / pipe_elapsed:>12.0f} {EVENTS / ring_elapsed:>12.0f} {lost:>10}')
+
+
+if __name__ == '__main__':
+    main()
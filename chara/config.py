@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Optional, Union
+from typing import Literal, Optional, Union
 
 import yaml
 
@@ -76,12 +76,45 @@ class ServerConfig(_BaseConfig):
 class PluginGroupConfig(_BaseConfig):
     group_name: str
     directory: Path
+    history_budget: int = 10000
+    handler_concurrency: int = 256
+    plugin_concurrency: int = 64
+    trigger_concurrency: int = 16
+    handler_queue_size: int = 4096
+    handler_timeout: Optional[float] = 60
+    handler_timeout_cancel: bool = False
 
     @field_validator('directory', mode='before')
     def _field_validator_directory(cls, raw_path: str) -> Path:
         return Path(raw_path)
 
 
+class DispatchConfig(_BaseConfig):
+    transport: Literal['pipe', 'ring'] = 'pipe'
+    ring_size: int = 4 * 1024 * 1024
+    forward_raw: bool = False
+    compact_events: bool = False
+    queue_size: int = 1024
+    overflow: Literal['block', 'drop_oldest', 'drop_meta'] = 'drop_oldest'
+
+    @field_validator('queue_size', 'ring_size', mode='after')
+    def _field_validator_size(cls, size: int) -> int:
+        if size <= 0:
+            raise ValueError('size must be positive.')
+        return size
+
+
+class RateLimitConfig(_BaseConfig):
+    capacity: int = 16384
+    depth: int = 16
+
+    @field_validator('capacity', 'depth', mode='after')
+    def _field_validator_size(cls, size: int) -> int:
+        if size <= 0:
+            raise ValueError('size must be positive.')
+        return size
+
+
 class FastAPIConfig(_BaseConfig):
     enable_docs: bool
 
@@ -106,6 +139,8 @@ class GlobalConfig(_BaseConfig):
     bots: list[BotConfig]
     server: ServerConfig
     plugins: list[PluginGroupConfig]
+    dispatch: DispatchConfig = DispatchConfig()
+    ratelimit: RateLimitConfig = RateLimitConfig()
     module: ModuleConfig
     log: LogConfig
 
@@ -166,6 +201,47 @@ plugins:
   # 每个插件组会作为一个单独的子进程运行
   - group_name: core
     directory: ./plugins
+    # 所有会话在内存中的历史消息记录总数上限
+    history_budget: 10000
+    # 同时执行的事件处理流程总数上限, 超出后进入等待队列
+    handler_concurrency: 256
+    # 每个插件同时执行的事件处理流程上限
+    plugin_concurrency: 64
+    # 每个触发器同时执行的事件处理流程上限, 可由触发器的 concurrency 单独设置
+    trigger_concurrency: 16
+    # 等待队列长度上限, 已满时丢弃优先级最低的等待流程
+    handler_queue_size: 4096
+    # 事件处理流程的默认超时时间(s), 超时后记录警告, 留空时不检查
+    handler_timeout: 60
+    # 超过默认超时时间时是否取消事件处理流程[触发器或事件处理流程单独设置 timeout 时总是取消]
+    handler_timeout_cancel: false
+
+# 事件分发配置
+dispatch:
+  # 事件传输方式
+  # pipe: 每个子进程单独写入一次管道
+  # ring: 写入一次共享内存环形缓冲区, 管道仅用于通知子进程读取
+  transport: pipe
+  # 环形缓冲区大小(字节), 子进程落后超过该大小时会丢失事件
+  ring_size: 4194304
+  # 主进程仅读取分发所需字段并转发原始JSON数据, 由子进程按需构建事件
+  forward_raw: false
+  # 消息事件使用紧凑实现(不进行字段校验, 消息段在首次访问时构建)
+  compact_events: false
+  # 每个子进程待发送事件队列的最大长度
+  queue_size: 1024
+  # 队列已满时的处理方式
+  # drop_oldest: 丢弃队列中最早的事件
+  # drop_meta: 优先丢弃元事件(心跳等), 没有可丢弃的元事件时不丢弃
+  # block: 不丢弃事件, 队列继续增长直到子进程读取(子进程长时间阻塞时占用内存不受限制)
+  overflow: drop_oldest
+
+# 跨进程共享限流配置(`Frequency`/`Cooldown`的`shared=True`)
+ratelimit:
+  # 共享限流表最多容纳的键数量
+  capacity: 16384
+  # 每个键最多保存的时间戳数量, 共享限流的`num`不能超过该值
+  depth: 16
 
 # 其他模块配置
 module:
@@ -1,5 +1,4 @@
 import asyncio
-import json
 
 from functools import partial
 from typing import Any, Coroutine, Optional
@@ -15,6 +14,7 @@ from chara.core.bot.data.superuser import SuperUsers
 from chara.core.bot.protocol import Protocol
 from chara.core.hazard import CONTEXT_LOOP
 from chara.exception import APICallFailed
+from chara.lib import codec
 from chara.onebot.api.base import API
 from chara.onebot.message import Message, MessageSegment
 from chara.typing import T
@@ -83,8 +83,14 @@ class Bot:
         '''## 调用API'''
         if not api.startswith('/'):
             api = '/' + api
+        # 消息参数预先转为OneBot消息格式, 序列化时不再回调
+        for key, value in data.items():
+            if isinstance(value, Message):
+                data[key] = value.array
+            elif isinstance(value, MessageSegment):
+                data[key] = [value.dict]
         try:
-            body = json.dumps(data, ensure_ascii=False, cls=_MessageJSONEncoder).encode('utf-8')
+            body = codec.dumps(data)
             headers = Headers(self._client.headers)
             headers.update({'Content-Length': str(len(body)), 'Content-Type': 'application/json'})
             request = Request('POST', URL(self._client.base_url, path=api), headers=headers, stream=ByteStream(body))
@@ -92,7 +98,7 @@ class Bot:
         except TimeoutException:
             raise APICallFailed(api, f'无法请求到Http Server[{self.config.http_host}:{self.config.http_port}].')
         
-        data = resp.json()
+        data = codec.loads(resp.content)
         if data['status'] == 'failed':
             raise APICallFailed(api)
         return data.get('data')
@@ -117,12 +123,3 @@ class Bot:
         
         self._update_loop_running = False
 
-
-class _MessageJSONEncoder(json.JSONEncoder):
-    def default(self, o: object) -> list[MessageSegment] | Any:
-        if isinstance(o, Message):
-            return o.array
-        elif isinstance(o, MessageSegment):
-            return Message(o).array
-        return super().default(o)
-
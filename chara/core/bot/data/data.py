@@ -1,4 +1,3 @@
-import json
 import time
 
 from typing import Any, TYPE_CHECKING
@@ -10,6 +9,7 @@ from chara.core.bot.data.superuser import SuperUsers
 from chara.core.color import colorize
 from chara.core.hazard import BOTS, CONTEXT_GLOBAL_CONFIG
 from chara.core.share import shared_bot_data_update_time
+from chara.lib import codec
 from chara.log import logger
 from chara.onebot.api import OneBotAPI
 
@@ -60,7 +60,7 @@ class Data:
 
     def load(self) -> None:
         if (path := (self.path / 'data.json')).exists():
-            data: dict[str, Any] = json.loads(path.read_bytes())
+            data: dict[str, Any] = codec.loads(path.read_bytes())
             self.last_update_time = data.get('update_time', -1)
 
             if groups := data.get('groups', None):
@@ -81,8 +81,7 @@ class Data:
         self._sv_update_time.write(self.last_update_time)
 
     def save(self) -> None:
-        with open(self.path / 'data.json', 'w', encoding='UTF-8') as f:
-            json.dump(self.json(), f, ensure_ascii=False, indent=4)
+        (self.path / 'data.json').write_bytes(codec.dumps(self.json(), indent=True))
 
     async def update(self) -> None:
         BOT = BOTS[self.uin]
@@ -1,11 +1,16 @@
 from dataclasses import dataclass
 from itertools import chain
-from typing import Any, Type
+from typing import Any, Optional, Type, TypeVar
 
-from chara.lib.tree import Node
+from pydantic import ValidationError
+
+from chara.onebot.compact import COMPACT_EVENTS, compact_message_event
 from chara.onebot.events import Event, GroupMessageEvent, MessageEvent
 
 
+E = TypeVar('E', bound=Event)
+
+
 @dataclass(repr=False, eq=False, slots=True)
 class BotEvent:
     self_id: int
@@ -20,50 +25,152 @@ class BotConnectedEvent(BotEvent):
 class BotDisConnectedEvent(BotEvent):
     pass
 
+
+@dataclass(repr=False, eq=False, slots=True)
+class RawEvent:
+    '''
+    ## 未解析的Onebot事件
+    
+    仅包含用于分发的字段, `data`为原始JSON数据
+    '''
+    self_id: int
+    post_type: str
+    detail_type: Optional[str]
+    sub_type: Optional[str]
+    group_id: Optional[int]
+    user_id: Optional[int]
+    event_type: Optional[Type[Event]]
+    data: bytes
+
+    @property
+    def is_meta(self) -> bool:
+        return self.post_type == 'meta_event'
+
+
 # 解析Onebot事件
 _SUB_POST_TYPES = ['message_type', 'meta_event_type', 'notice_type', 'request_type']
 
-def _generate_event_tree() -> Node:
+def peek_event(json_data: dict[str, Any], raw: bytes) -> RawEvent | None:
+    '''
+    ## 仅读取分发所需字段, 不构建事件模型
+    '''
+    self_id = json_data.get('self_id', None)
+    post_type = json_data.get('post_type', None)
+    if self_id is None or post_type is None:
+        return None
+    if field := _POST_TYPE_FIELDS.get(post_type, None):
+        detail_type = json_data.get(field, None)
+    else:
+        detail_type = None
+    return RawEvent(int(self_id), post_type, detail_type, json_data.get('sub_type', None), json_data.get('group_id', None), json_data.get('user_id', None), get_event_class(json_data), raw)
+
+def is_raw_event(data: bytes) -> bool:
+    '''
+    ## 子进程收到的数据是否为原始JSON数据
+    
+    pickle(protocol >= 2)数据总以`0x80`开头
+    '''
+    return data[:1] != b'\x80'
+
+EventKey = tuple[Optional[str], Optional[str], Optional[str]]
+'''## (post_type, detail_type, sub_type), `None`为通配'''
+
+_EVENT_TABLE: dict[EventKey, Type[Event]] = dict()
+
+# Onebot上报的post_type -> 对应的细分类型字段
+_POST_TYPE_FIELDS = {
+    'message': 'message_type',
+    'message_sent': 'message_type',
+    'meta_event': 'meta_event_type',
+    'notice': 'notice_type',
+    'request': 'request_type',
+}
+
+def _field_default(event_class: Type[Event], name: str) -> Optional[str]:
+    if (field := event_class.model_fields.get(name, None)) and not field.is_required():
+        return field.default
+    return None
+
+def event_key(event_class: Type[Event]) -> EventKey:
+    '''
+    ## 由事件类字段默认值推断查找键
+    '''
+    detail_type = None
+    for sub_post_type in _SUB_POST_TYPES:
+        if sub_post_type in event_class.model_fields:
+            detail_type = _field_default(event_class, sub_post_type)
+            break
+    return _field_default(event_class, 'post_type'), detail_type, _field_default(event_class, 'sub_type')
+
+def register_event(event_class: Type[E], key: Optional[EventKey] = None) -> Type[E]:
+    '''
+    ## 注册事件类
+    
+    可用作装饰器, 相同查找键的事件类会被覆盖, 用于添加不同协议端的扩展事件
+    
+    ---
+    ### 参数
+    - event_class: 事件类
+    - key: 查找键, 默认由字段默认值推断
+    '''
+    _EVENT_TABLE[key or event_key(event_class)] = event_class
+    return event_class
+
+def _register_builtin_events() -> None:
     def get_subclass(cls: Type[Event] | list[Type[Event]]) -> list[Type[Event]]:
         if isinstance(cls, list):
             return list(chain(*[get_subclass(c) for c in cls]))
         elif subcls := cls.__subclasses__():
             return get_subclass(subcls) + [cls]
         return [cls]
-    event_subclass = get_subclass(Event)
     
-    TREE = Node()
-
-    for event in event_subclass:
-        pt = event.model_fields.get('post_type', None)
-        rt = None
-        st = event.model_fields.get('sub_type')
-        for spt in _SUB_POST_TYPES:
-            if rt := event.model_fields.get(spt, None):
+    for event_class in get_subclass(Event):
+        register_event(event_class)
+
+_register_builtin_events()
+
+def get_event_class(json_data: dict[str, Any]) -> Type[Event] | None:
+    '''
+    ## 查找事件类
+    
+    依次尝试`(post_type, detail_type, sub_type)`, `(post_type, detail_type, *)`, `(post_type, *, *)`
+    
+    无法识别`post_type`时使用`(*, *, *)`
+    '''
+    if field := _POST_TYPE_FIELDS.get(json_data.get('post_type', None), None): # type: ignore
+        detail_type = json_data.get(field, None)
+    else:
+        # 未知的post_type
+        for field in _SUB_POST_TYPES:
+            if detail_type := json_data.get(field, None):
                 break
-        pt_v = pt.default if pt and not pt.is_required() else None
-        rt_v = rt.default if rt and not rt.is_required() else None
-        st_v = st.default if st and not st.is_required() else None
-        TREE[pt_v, rt_v, st_v] = Node(event)
+        else:
+            return _EVENT_TABLE.get((None, None, None), None)
+    
+    table = _EVENT_TABLE
+    if sub_type := json_data.get('sub_type', None):
+        if event_class := table.get((field, detail_type, sub_type), None):
+            return event_class
+    return table.get((field, detail_type, None), None) or table.get((field, None, None), None)
+
+def get_event(json_data: dict[str, Any], compact: bool = False) -> Event | None:
+    '''
+    ## 构建事件
     
-    return TREE
-
-_EVENT_TREE = _generate_event_tree()
-
-def _get_event_nodes(json_data: dict[str, str]) -> tuple[str, str, str | None] | tuple[None, None, None]:
-    sub_type = None
-    if 'notice_type' in json_data:
-        sub_type = json_data.get('sub_type', None)
-    for post_type in _SUB_POST_TYPES:
-        if _type := json_data.get(post_type, None):
-            return post_type, _type, sub_type
-    return None, None, None    
-
-def get_event(json_data: dict[str, Any]) -> Event | None:
-    if node := _EVENT_TREE[_get_event_nodes(json_data)]:
-        event = node.value(**json_data)
+    `compact`为`True`时消息事件使用`chara.onebot.compact`跳过校验构建
+    '''
+    if event_class := get_event_class(json_data):
+        if compact and event_class in COMPACT_EVENTS:
+            try:
+                return compact_message_event(event_class, json_data)
+            except (KeyError, TypeError, ValueError):
+                return None
+        try:
+            event = event_class(**json_data)
+        except ValidationError:
+            return None
         if isinstance(event, MessageEvent):
-            if event.message.array and (cqcode := event.message.segments[0]).type == 'reply':
+            if event.message.segments and (cqcode := event.message.segments[0]).type == 'reply':
                 event.reply_id = cqcode.data.get('id')
             if isinstance(event, GroupMessageEvent):
                 event.at_me = event.self_id in event.at_ids                        
@@ -73,4 +180,4 @@ def get_event(json_data: dict[str, Any]) -> Event | None:
     else:
         return None
 
-del _generate_event_tree
+del _register_builtin_events
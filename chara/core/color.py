@@ -1,4 +1,4 @@
-from typing import Union, TYPE_CHECKING
+from typing import Any, Union, TYPE_CHECKING
 
 from chara.log import C256
 from chara.onebot.events import Event, MetaEvent, MessageEvent, NoticeEvent, RequestEvent
@@ -50,11 +50,10 @@ class ColorWrap:
         return log
 
     def message_event(self, event: MessageEvent) -> str:
-        data = event.model_dump()
         log = self._const_event_message
-        if group_id := data.get('group_id', None):
+        if group_id := getattr(event, 'group_id', None):
             log += self.gid(group_id)
-        if user_id := data.get('user_id', None):
+        if user_id := getattr(event, 'user_id', None):
             log += self.uid(user_id)
         log += unescape(event.raw_message)
         return log
@@ -117,6 +116,36 @@ class ColorWrap:
         else:
             return self.unknown_event(event)
 
+    def raw_event(self, data: dict[str, Any]) -> str:
+        post_type = data.get('post_type', None)
+        if post_type == 'meta_event':
+            log = self._const_event_meta
+        elif post_type == 'message':
+            log = self._const_event_message
+        elif post_type == 'notice':
+            log = self._const_event_notice
+        elif post_type == 'request':
+            log = self._const_event_request
+        else:
+            log = self._const_event_unknown
+        if group_id := data.get('group_id', None):
+            log += self.gid(group_id)
+        if user_id := data.get('user_id', None):
+            log += self.uid(user_id)
+        if operator_id := data.get('operator_id', None):
+            log += self.oid(operator_id)
+        if target_id := data.get('target_id', None):
+            log += self.tid(target_id)
+        if post_type == 'message':
+            return log + unescape(data.get('raw_message', ''))
+        detail_type = data.get('meta_event_type', None) or data.get('notice_type', None) or data.get('request_type', None)
+        if detail_type:
+            if sub_type := data.get('sub_type', None):
+                log += C256.f_fcf16e(f'[{detail_type}.{sub_type}]')
+            else:
+                log += C256.f_fcf16e(f'[{detail_type}]')
+        return log
+
     def bot(self, bot: 'Bot') -> str:
         return C256.f_faa755(bot.name) + C256.f_7bbfea(f'[{bot.uin}]')
 
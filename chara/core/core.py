@@ -12,11 +12,12 @@ from fastapi import FastAPI
 from chara.config import GlobalConfig
 from chara.core.bot import Bot
 from chara.core.color import colorize
+from chara.core import hazard
 from chara.core.hazard import BOTS, CONTEXT_GLOBAL_CONFIG, CONTEXT_LOOP, SHARED_VALUES
 from chara.core.plugin.load import load_plugins
 from chara.core.web.websocket import WebSocketServer
 from chara.core.web.ui import WebUI
-from chara.core.workers.manager import WorkerManager
+from chara.core.workers.manager import RATE_LIMIT_SNAPSHOT, WorkerManager
 from chara.log import C256, logger
 
 
@@ -123,6 +124,11 @@ class Core:
         load_plugins()
                 
         asyncio.run(self._main())
+        if hazard.SHARED_RATE_LIMIT is not None:
+            try:
+                hazard.SHARED_RATE_LIMIT.save(self.config.data.directory / RATE_LIMIT_SNAPSHOT)
+            except:
+                logger.exception('共享限流表快照保存失败.')
         for sv in SHARED_VALUES.values():
             sv.unlink()
 
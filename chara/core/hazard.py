@@ -8,14 +8,14 @@ import sys
 
 from asyncio import AbstractEventLoop
 from contextvars import ContextVar
-from typing import Any, TYPE_CHECKING
+from typing import Any, Callable, Optional, TYPE_CHECKING
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
     from chara.config import GlobalConfig, PluginGroupConfig
     from chara.core.bot import Bot
-    from chara.core.plugin import Plugin
-    from chara.core.share import SharedValue
+    from chara.core.plugin import Plugin, Trigger
+    from chara.core.share import SharedRateLimitTable, SharedRingBuffer, SharedValue
     from chara.core.workers.manager import Worker
 
 
@@ -27,7 +27,10 @@ MACOS_PLATFORM: bool = sys.platform.startswith('darwin')
 
 IN_SUB_PROCESS: bool = False
 
-SHARED_VALUES: dict[str, 'SharedValue[Any]'] = dict()
+SHARED_VALUES: dict[str, 'SharedValue[Any] | SharedRingBuffer | SharedRateLimitTable'] = dict()
+
+SHARED_RATE_LIMIT: Optional['SharedRateLimitTable'] = None
+'''## 所有进程共用的限流表'''
 
 CONTEXT_LOOP: ContextVar[AbstractEventLoop] = ContextVar('loop')
 
@@ -39,6 +42,12 @@ CONTEXT_CURRENT_PLUGIN_GROUP_CONFIG: ContextVar['PluginGroupConfig'] = ContextVa
 
 CONTEXT_CURRENT_WORKER: ContextVar['Worker'] = ContextVar('current_worker')
 
+CONTEXT_EVENT_CACHE: ContextVar[dict[Any, Any]] = ContextVar('event_cache')
+'''## 当前事件的纯检查器结果缓存, 同一事件的所有触发器与处理流程共用'''
+
+CONTEXT_DISPATCH_TICKET: ContextVar[Optional[int]] = ContextVar('dispatch_ticket', default=None)
+'''## 当前事件在所属会话中的分发序号, 顺序执行的触发器按此序号执行事件处理流程'''
+
 BOTS: dict[int, 'Bot'] = dict()
 
 PLUGINS: dict[str, 'Plugin'] = dict()
@@ -50,3 +59,9 @@ PLUGIN_GROUPS: dict[str, dict[str, 'Plugin']] = dict()
 PLUGIN_CUSTOM_CONFIGS: dict[str, dict[str, Any]] = dict()
 '''## 所有插件自定义配置'''
 
+TRIGGER_REMOVED_CALLBACKS: list[Callable[['Trigger'], None]] = list()
+'''## 当前分组下任一插件移除触发器时以该触发器调用'''
+
+WORKER_STATS: dict[str, Callable[[], Any]] = dict()
+'''## 子进程定期发送至主进程的统计, 统计名称 -> 生成统计的函数'''
+
@@ -1,6 +1,7 @@
 from chara.core.plugin.condition import Condition
 from chara.core.plugin.handler import Handler
 from chara.core.plugin.plugin import Plugin, PluginState, PlugiMetaData
+from chara.core.plugin.session import wait_for_message
 from chara.core.plugin.trigger import Session, Trigger, TriggerCapturedData
 
 
@@ -13,5 +14,6 @@ __all__ = [
     'Session',
     'Trigger',
     'TriggerCapturedData',
+    'wait_for_message',
 ]
 
@@ -1,20 +1,43 @@
-from typing import Any, Optional, Union
+from typing import Any, Callable, Optional, Union
 
+from chara.core.hazard import CONTEXT_EVENT_CACHE
 from chara.lib.executor import Executor, ExecutorCallable
 from chara.typing import ConditionCallable
 
 
 class Checker(Executor[bool]):
+    '''
+    ## 检查器
+
+    ---
+    ### 参数
+    - call: 检查函数
+    - invert: 是否取反
+    - cost: 开销, 条件按开销从低到高执行
+    - stateful: 是否有状态[如频率限制], 有状态的检查器总是在最后执行
+    - pure: 是否仅由参数决定结果, 纯检查器对同一事件只执行一次
+    '''
 
-    __slots__ = ('__callable', '__awaitable', '__param_annotations', '__invert')
-    
-    def __init__(self, call: ExecutorCallable[bool], invert: bool = False) -> None:
+    __slots__ = ('__invert', 'cost', 'stateful', 'pure')
+
+    cost: int
+    stateful: bool
+    pure: bool
+
+    def __init__(self, call: ExecutorCallable[bool], invert: bool = False, cost: int = 0, stateful: bool = False, pure: bool = False) -> None:
         super().__init__(call)
         self.__invert = invert
-    
+        self.cost = cost
+        self.stateful = stateful
+        self.pure = pure and not stateful
+
+    @property
+    def invert(self) -> bool:
+        return self.__invert
+
     def __neg__(self) -> 'Checker':
-        return Checker(self.func, not self.__invert)
-    
+        return Checker(self.func, not self.__invert, self.cost, self.stateful, self.pure)
+
     async def __call__(self, *params: Any) -> bool:
         result = await super().__call__(*params)
         if self.__invert:
@@ -22,20 +45,42 @@ class Checker(Executor[bool]):
         return result
 
 
+_Step = tuple[Callable[..., Any], tuple[int, ...], bool, bool, bool]
+'''## `(检查函数, 实参位置, 是否异步, 是否取反, 是否为纯检查器)`'''
+
+
 class Condition:
     '''
     ## 条件类
 
     同时使用多个条件时可用`&`连接, 如`A & B`
-    
+
     使用`-`取对立条件, 如`-A`
+
+    检查器按声明顺序执行, 指定`cost`时按开销从低到高执行, 有状态的检查器总是在最后执行, 任一检查器不满足时立即返回
+
+    纯检查器的结果按实参缓存在当前事件的上下文中, 所有触发器与处理流程共用
+
+    ---
+    ### 参数
+    - checkers: 检查函数
+    - cost: 检查函数的开销[已是`Checker`的检查器保留自身开销]
+    - stateful: 检查函数是否有状态[已是`Checker`的检查器保留自身设置]
+    - pure: 检查函数结果是否仅由参数决定[已是`Checker`的检查器保留自身设置]
     '''
-    __slots__ = ('checkers', )
-    
-    checkers: set[Checker]
+    __slots__ = ('checkers', '_plans')
 
-    def __init__(self, *checkers: Union[ConditionCallable, Executor[bool]]) -> None:
-        self.checkers = {Checker(checker.func) if isinstance(checker, Executor) else Checker(checker) for checker in checkers}
+    checkers: tuple[Checker, ...]
+
+    def __init__(self, *checkers: Union[ConditionCallable, Executor[bool]], cost: int = 0, stateful: bool = False, pure: bool = False) -> None:
+        ordered: dict[tuple[Any, bool], Checker] = dict()
+        for checker in checkers:
+            if not isinstance(checker, Checker):
+                checker = Checker(checker.func if isinstance(checker, Executor) else checker, cost=cost, stateful=stateful, pure=pure)
+            ordered.setdefault((checker.func, checker.invert), checker)
+        # 排序稳定, 开销相同时保持声明顺序
+        self.checkers = tuple(sorted(ordered.values(), key=lambda c: (c.stateful, c.cost)))
+        self._plans: dict[tuple[type, ...], Optional[tuple[_Step, ...]]] = dict()
 
     def __and__(self, other: Optional[Union['Condition', ConditionCallable, Executor[bool]]]) -> 'Condition':
         if other is None:
@@ -54,15 +99,36 @@ class Condition:
             return Condition(other, *self.checkers)
 
     def __neg__(self) -> 'Condition':
-        condition = Condition()
-        condition.checkers = set(-c for c in self.checkers)
-        return condition
-    
-    async def __call__(self, *params: Any) -> bool:
+        return Condition(*(-c for c in self.checkers))
+
+    def _compile(self, types: tuple[type, ...]) -> Optional[tuple[_Step, ...]]:
+        steps: list[_Step] = list()
         for checker in self.checkers:
-            if not checker.verify_params(params):
-                return False
-            if not await checker(*params):
+            if (indexes := checker.bind(types)) is None:
+                return None
+            steps.append((checker.func, indexes, checker.awaitable, checker.invert, checker.pure))
+        return tuple(steps)
+
+    async def __call__(self, *params: Any) -> bool:
+        types = tuple(map(type, params))
+        try:
+            plan = self._plans[types]
+        except KeyError:
+            plan = self._plans[types] = self._compile(types)
+        # 存在无法绑定参数的检查器时条件不满足
+        if plan is None:
+            return False
+        cache = CONTEXT_EVENT_CACHE.get(None)
+        for func, indexes, awaitable, invert, pure in plan:
+            args = [params[i] for i in indexes]
+            if pure and cache is not None:
+                # 缓存仅在当前事件内有效, 实参均存活, 可用id作为键
+                key = (func, *map(id, args))
+                if (result := cache.get(key, None)) is None:
+                    result = cache[key] = bool(await func(*args) if awaitable else func(*args))
+            else:
+                result = await func(*args) if awaitable else func(*args)
+            if bool(result) is invert:
                 return False
         return True
 
@@ -70,4 +136,3 @@ class Condition:
 __all__ = [
     'Condition',
 ]
-
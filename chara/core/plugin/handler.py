@@ -5,6 +5,7 @@ from typing import Any, NoReturn, Optional, TYPE_CHECKING
 from chara.core.bot import Bot
 from chara.core.color import colorize
 from chara.core.plugin.condition import Condition
+from chara.core.plugin.watchdog import WATCHDOG
 from chara.exception import HandleFinished, IgnoreException
 from chara.log import logger
 from chara.lib.executor import Executor
@@ -18,24 +19,27 @@ if TYPE_CHECKING:
 
 class Handler:
     
-    __slots__ = ('bot', 'condition', 'exc', 'loop', 'tcd', 'trigger', '__running')
+    __slots__ = ('bot', 'condition', 'exc', 'loop', 'tcd', 'timeout', 'trigger', '__running')
     
     bot: Bot
     condition: Optional[Condition]
     exc: Executor[Any]
     loop: asyncio.AbstractEventLoop
     tcd: 'TriggerCapturedData'
+    timeout: Optional[float]
+    '''## 超时时间(s), 超时后取消, `None`时使用触发器的`timeout`'''
     trigger: 'Trigger'
     __running: bool
     
-    def __init__(self, exc: Executor[Any], condition: Optional[Condition], trigger: 'Trigger') -> None:
+    def __init__(self, exc: Executor[Any], condition: Optional[Condition], trigger: 'Trigger', timeout: Optional[float] = None) -> None:
         self.exc = exc
         self.condition = condition
+        self.timeout = timeout
         self.trigger = trigger
         self.__running = False
         
     def new(self, bot: Bot, loop: asyncio.AbstractEventLoop, tcd: 'TriggerCapturedData') -> 'Handler':
-        handler = Handler(self.exc, self.condition, self.trigger)
+        handler = Handler(self.exc, self.condition, self.trigger, self.timeout)
         handler.bot = bot
         handler.loop = loop
         handler.tcd = tcd
@@ -55,17 +59,17 @@ class Handler:
         - group_id: 群号[发送群聊消息时需要]
         '''
 
-        event_dict = self.tcd.event.model_dump()
+        event = self.tcd.event
         
         params: dict[str, Any] = dict()
-        group_id = event_dict.get('group_id', group_id)
-        user_id = event_dict.get('user_id', user_id)
+        group_id = getattr(event, 'group_id', group_id)
+        user_id = getattr(event, 'user_id', user_id)
         if group_id:
             params['group_id'] = group_id
         elif user_id:
             params['user_id'] = user_id
         else:
-            logger.warning(f'获取user_id或group_id失败. 当前事件: \n{event_dict}')
+            logger.warning(f'获取user_id或group_id失败. 当前事件: \n{event.model_dump()}')
             raise HandleFinished
         message = Message(message)
         if at_sender and group_id and user_id:
@@ -122,14 +126,23 @@ class Handler:
             logger.exception(log_text + '在检查自身条件时发生异常.')
             return 2
         
+        record = WATCHDOG.enter(self)
         try:
             if self.exc.verify_params(params):
                 await self.exc(*params)
             
         except IgnoreException:
             return 1
+        except asyncio.CancelledError:
+            # 仅吞掉看门狗因超时发起的取消
+            if not record.cancelled or (task := asyncio.current_task()) is None:
+                raise
+            task.uncancel()
+            return 2
         except:
             logger.exception(log_text + '在处理事件时发生异常.')
             return 2
+        finally:
+            WATCHDOG.exit(record)
 
         return 0
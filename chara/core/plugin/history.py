@@ -0,0 +1,175 @@
+import pickle
+import uuid
+import weakref
+
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Generator, Optional
+
+from chara.core.hazard import CONTEXT_CURRENT_PLUGIN_GROUP_CONFIG
+from chara.onebot.events import Event
+
+
+DEFAULT_HISTORY_BUDGET = 10000
+
+
+class HistoryBudget:
+    '''
+    ## 会话历史记录内存预算
+
+    当前进程(插件组)内所有会话历史记录共用, 内存中的事件总数超出预算时移出最早记录的事件
+    '''
+
+    __slots__ = ('size', '_limit', '_order')
+
+    size: int
+    '''## 内存中的事件总数'''
+
+    def __init__(self, limit: Optional[int] = None) -> None:
+        self.size = 0
+        self._limit = limit
+        # (历史记录, 序号), 历史记录自行移出事件后对应项失效, 在移出或整理时跳过
+        self._order: deque[tuple['SessionHistory', int]] = deque()
+
+    @property
+    def limit(self) -> int:
+        if self._limit is None:
+            config = CONTEXT_CURRENT_PLUGIN_GROUP_CONFIG.get(None)
+            self._limit = config.history_budget if config is not None else DEFAULT_HISTORY_BUDGET
+        return self._limit
+
+    def put(self, history: 'SessionHistory', seq: int) -> None:
+        self.size += 1
+        self._order.append((history, seq))
+        limit = self.limit
+        while self.size > limit and self._evict():
+            pass
+
+    def release(self, count: int) -> None:
+        self.size -= count
+        # 失效项过多时整理
+        if len(self._order) > 2 * self.size + 64:
+            self._order = deque(item for item in self._order if item[0].alive(item[1]))
+
+    def _evict(self) -> bool:
+        order = self._order
+        while order:
+            history, seq = order.popleft()
+            if history.alive(seq):
+                history.pop_oldest()
+                self.size -= 1
+                return True
+        return False
+
+
+_BUDGET = HistoryBudget()
+
+
+class SessionHistory:
+    '''
+    ## 会话历史记录
+
+    - `maxsize > 0`时仅在内存中保留最近`maxsize`条, `maxsize < 0`时不限数量, `0`时不记录
+    - 内存中的事件同时受插件组的`history_budget`限制
+    - 设置`spill`时移出内存的事件追加写入文件, 遍历时再按需读取, 否则直接丢弃
+
+    ---
+    ### 参数
+    - maxsize: 内存中最大记录数量
+    - spill: 返回溢出文件路径的函数, 返回`None`时丢弃
+    '''
+
+    __slots__ = ('events', 'maxsize', 'spill', 'spilled', '_head', '_path', '_finalizer', '__weakref__')
+
+    events: deque[Event]
+    '''## 内存中的事件'''
+    maxsize: int
+    spill: Optional[Callable[[], Optional[Path]]]
+    spilled: int
+    '''## 写入文件的事件数量'''
+
+    def __init__(self, maxsize: int, spill: Optional[Callable[[], Optional[Path]]] = None) -> None:
+        self.events = deque()
+        self.maxsize = maxsize
+        self.spill = spill
+        self.spilled = 0
+        self._head = 0
+        '''## 内存中最早事件的序号'''
+        self._path: Optional[Path] = None
+        self._finalizer: Optional[weakref.finalize] = None
+
+    def __iter__(self) -> Generator[Event, Any, None]:
+        if self._path is not None and self.spilled:
+            with open(self._path, 'rb') as f:
+                for _ in range(self.spilled):
+                    yield pickle.load(f)
+        for event in list(self.events):
+            yield event
+
+    def __len__(self) -> int:
+        return self.length
+
+    def put(self, event: Event) -> None:
+        if self.maxsize == 0:
+            return
+        if 0 < self.maxsize <= len(self.events):
+            self.pop_oldest()
+            _BUDGET.release(1)
+        self.events.append(event)
+        _BUDGET.put(self, self._head + len(self.events) - 1)
+
+    def alive(self, seq: int) -> bool:
+        '''
+        ## 序号对应的事件是否仍在内存中
+        '''
+        return self._head <= seq < self._head + len(self.events)
+
+    def pop_oldest(self) -> None:
+        '''
+        ## 移出内存中最早的事件, 设置`spill`时写入文件
+        '''
+        event = self.events.popleft()
+        self._head += 1
+        if self.spill is None:
+            return
+        if self._path is None:
+            if (path := self.spill()) is None:
+                return
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._path = path
+            self._finalizer = weakref.finalize(self, path.unlink, True)
+        with open(self._path, 'ab') as f:
+            pickle.dump(event, f, pickle.HIGHEST_PROTOCOL)
+        self.spilled += 1
+
+    def clear(self) -> None:
+        '''
+        ## 清空历史记录, 释放占用的内存预算并删除溢出文件
+        '''
+        if count := len(self.events):
+            # 序号前移, 内存预算中对应的项随之失效
+            self._head += count
+            self.events.clear()
+            _BUDGET.release(count)
+        if self._finalizer is not None:
+            self._finalizer()
+            self._finalizer = None
+        self._path = None
+        self.spilled = 0
+
+    @staticmethod
+    def spill_path(directory: Path) -> Path:
+        '''
+        ## 在目录下生成一个新的溢出文件路径
+        '''
+        return directory / f'{uuid.uuid4().hex}.history'
+
+    @property
+    def length(self) -> int:
+        return len(self.events) + self.spilled
+
+
+__all__ = [
+    'HistoryBudget',
+    'SessionHistory',
+]
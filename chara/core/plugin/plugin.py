@@ -5,11 +5,11 @@ from typing import Any, Optional, Union
 
 from chara.core.bot import Bot
 from chara.core.color import colorize
-from chara.core.plugin.trigger import Trigger
+from chara.core.plugin.session import SESSIONS
+from chara.core.plugin.trigger import Session, Trigger
 from chara.core.share import shared_plugin_state
 from chara.log import logger
 from chara.lib.executor import Executor
-from chara.onebot.events import Event
 from chara.typing import ExecutorCallable
 
 
@@ -138,28 +138,38 @@ class Plugin:
             'docs': self.metadata.docs,
         }
 
-    async def handle_event(self, bot: Bot, event: Event) -> None:
-        triggers = self.triggers.copy()
-        block = False
-        for trigger in triggers:
-            if not block and await trigger.check(bot, event):
-                block = trigger.block
-
-            if not trigger.alive and trigger in self.triggers:
-                self.triggers.remove(trigger)
-    
     def add_trigger(self, trigger: list[Trigger] | Trigger) -> None:
         '''
         ## 添加触发器至当前插件
         '''
-        if isinstance(trigger, list):
-            for t in trigger:
-                t.plugin = self
-            self.triggers.extend(trigger)
-        else:
-            trigger.plugin = self
-            self.triggers.append(trigger)
+        triggers = trigger if isinstance(trigger, list) else [trigger]
+        for t in triggers:
+            t.plugin = self
+            # 会话添加至插件后才登记至会话路由
+            if isinstance(t, Session) and t.alive:
+                SESSIONS.add(t)
+        self.triggers.extend(triggers)
         self.triggers.sort(key=lambda t: t.priority)
+        self._triggers_changed()
+
+    def remove_trigger(self, trigger: Trigger) -> None:
+        '''
+        ## 从当前插件移除触发器
+        '''
+        from chara.core.hazard import TRIGGER_REMOVED_CALLBACKS
+        
+        if trigger not in self.triggers:
+            return
+        self.triggers.remove(trigger)
+        for callback in TRIGGER_REMOVED_CALLBACKS:
+            callback(trigger)
+        self._triggers_changed()
+
+    def _triggers_changed(self) -> None:
+        from chara.core.hazard import CONTEXT_CURRENT_WORKER
+        
+        if worker := CONTEXT_CURRENT_WORKER.get(None):
+            worker.process.update_subscription()
 
     def on_load(self, func: Optional[ExecutorCallable[Any]] = None, priority: int = 0) -> ExecutorCallable[Any]:
         '''
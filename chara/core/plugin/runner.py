@@ -0,0 +1,373 @@
+import time
+
+from collections import deque
+from heapq import heappop, heappush
+from contextvars import Context, copy_context
+from itertools import count
+from dataclasses import dataclass, field
+from typing import Any, Callable, Coroutine, Hashable, Optional, TYPE_CHECKING
+
+from chara.core.color import colorize
+from chara.core.hazard import CONTEXT_CURRENT_PLUGIN_GROUP_CONFIG, CONTEXT_LOOP, WORKER_STATS
+from chara.log import logger
+from chara.onebot.events import Event
+
+if TYPE_CHECKING:
+    from chara.config import PluginGroupConfig
+    from chara.core.plugin.plugin import Plugin
+    from chara.core.plugin.trigger import Trigger
+
+
+DEFAULT_LIMITS = (256, 64, 16, 4096)
+
+
+def conversation_key(event: Event) -> Optional[tuple[Optional[int], Optional[int]]]:
+    '''
+    ## 事件所属会话
+
+    群聊事件为(群号, `None`), 其他事件为(`None`, QQ号), 均不存在时为`None`
+    '''
+    if (gid := getattr(event, 'group_id', None)) is not None:
+        return gid, None
+    if (uid := getattr(event, 'user_id', None)) is not None:
+        return None, uid
+    return None
+
+@dataclass(repr=False, eq=False, slots=True)
+class HandlerJob:
+    '''## 一次触发的事件处理流程'''
+
+    trigger: 'Trigger'
+    plugin: Optional['Plugin']
+    factory: Callable[[], Coroutine[Any, Any, Any]]
+    key: Optional[Hashable] = None
+    '''## 顺序执行的键, 同一触发器下键相同的流程依次执行, `None`时不限制'''
+    ticket: Optional[int] = None
+    '''## 事件的分发序号, 同一键下按序号执行, `None`时按提交顺序'''
+    context: Context = field(default_factory=copy_context)
+    '''## 提交时的上下文, 排队的流程在其他流程结束时开始, 需使用提交时的上下文'''
+    submitted_ns: int = field(default_factory=time.perf_counter_ns)
+    seq: int = 0
+    '''## 进入等待队列的顺序'''
+    token: int = 0
+    '''## 每次成为可检查的流程时递增, 调度堆中序号不一致的条目已失效'''
+
+
+@dataclass(repr=False, eq=False, slots=True)
+class HandlerSchedulerStats:
+    '''## 事件处理流程调度统计'''
+
+    submitted: int = 0
+    '''## 提交次数'''
+    started: int = 0
+    '''## 开始执行次数'''
+    queued: int = 0
+    '''## 因达到并发上限而排队的次数'''
+    dropped: int = 0
+    '''## 因队列已满而丢弃的次数'''
+    wait_ns: int = 0
+    '''## 排队总耗时'''
+    max_wait_ns: int = 0
+    '''## 最长排队耗时'''
+
+
+class HandlerScheduler:
+    '''
+    ## 事件处理流程调度器
+
+    限制当前进程(插件组)内同时执行的事件处理流程数量, 超出上限的流程进入等待队列
+
+    - 总并发/每个插件并发/每个触发器并发均有上限, 触发器可通过`concurrency`单独设置
+    - 等待队列按触发器的`priority`分道, `priority`越小越先执行, 同一道内先进先出
+    - 等待队列总长度有上限, 已满时丢弃优先度最低的一道中最早的流程, 新流程优先度不高于该道时直接丢弃新流程
+    - 提交时指定`key`的流程, 同一触发器下键相同的依次执行, 键不同的仍可并发
+    - 事件分发时通过`reserve`按到达顺序取得序号, 检查完所有触发器后`settle`; 同一键下的流程在更早的事件全部检查完毕后按序号执行, 与条件检查的完成顺序无关
+
+    等待中的流程按(触发器, 键)分组, 组内只有第一个流程可能执行; 各组的第一个流程在可执行时位于就绪堆,
+    因插件/触发器并发上限或键被占用而无法执行时挂在对应资源下, 资源释放时才重新检查, 每次调度不再遍历所有等待中的流程
+    '''
+
+    __slots__ = ('stats', '_limits', '_lanes', '_groups', '_ready', '_parked', '_pending', '_running', '_plugin_running', '_trigger_running', '_key_running', '_unsettled', '_settled', '_tickets', '_seq')
+
+    stats: HandlerSchedulerStats
+
+    def __init__(self, concurrency: Optional[int] = None, plugin_concurrency: Optional[int] = None, trigger_concurrency: Optional[int] = None, queue_size: Optional[int] = None) -> None:
+        self.stats = HandlerSchedulerStats()
+        self._limits = (concurrency, plugin_concurrency, trigger_concurrency, queue_size)
+        self._lanes: dict[int, dict[HandlerJob, None]] = dict()
+        '''## priority -> 等待中的流程(按进入顺序)'''
+        self._groups: dict[tuple['Trigger', Optional[Hashable]], deque[HandlerJob]] = dict()
+        '''## (触发器, 键) -> 等待中的流程(同一键下按分发序号)'''
+        self._ready: list[tuple[int, int, int, HandlerJob]] = list()
+        '''## 仅受总并发限制的各组第一个流程, (priority, seq, token, 流程)'''
+        self._parked: dict[Hashable, list[tuple[int, int, int, HandlerJob]]] = dict()
+        '''## 资源 -> 因该资源而无法执行的各组第一个流程'''
+        self._pending = 0
+        self._running = 0
+        self._plugin_running: dict[Optional['Plugin'], int] = dict()
+        self._trigger_running: dict['Trigger', int] = dict()
+        self._key_running: set[tuple['Trigger', Hashable]] = set()
+        self._unsettled: dict[Hashable, deque[int]] = dict()
+        '''## 键 -> 尚未检查完毕的事件序号(按分发顺序)'''
+        self._settled: set[int] = set()
+        '''## 已检查完毕但排在未完成序号之后的序号'''
+        self._tickets = count()
+        self._seq = count()
+
+    @property
+    def limits(self) -> tuple[int, int, int, int]:
+        '''## (总并发, 每个插件并发, 每个触发器并发, 等待队列长度)'''
+        if None in self._limits:
+            config: Optional['PluginGroupConfig'] = CONTEXT_CURRENT_PLUGIN_GROUP_CONFIG.get(None)
+            defaults = (config.handler_concurrency, config.plugin_concurrency, config.trigger_concurrency, config.handler_queue_size) if config is not None else DEFAULT_LIMITS
+            self._limits = tuple(default if limit is None else limit for limit, default in zip(self._limits, defaults)) # type: ignore
+        return self._limits # type: ignore
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def reserve(self, key: Hashable) -> int:
+        '''
+        ## 按事件到达顺序为所属会话的事件取得分发序号
+        '''
+        ticket = next(self._tickets)
+        self._unsettled.setdefault(key, deque()).append(ticket)
+        return ticket
+
+    def settle(self, key: Hashable, ticket: int) -> None:
+        '''
+        ## 事件的所有触发器检查完毕, 之后不会再以该序号提交流程
+        '''
+        if (tickets := self._unsettled.get(key, None)) is None:
+            return
+        self._settled.add(ticket)
+        head = tickets[0]
+        while tickets and tickets[0] in self._settled:
+            self._settled.discard(tickets.popleft())
+        if not tickets:
+            del self._unsettled[key]
+        if self._pending and (not tickets or tickets[0] != head):
+            self._release((3, key), True)
+            self._pump()
+
+    def submit(self, trigger: 'Trigger', factory: Callable[[], Coroutine[Any, Any, Any]], key: Optional[Hashable] = None, ticket: Optional[int] = None) -> bool:
+        '''
+        ## 提交一次事件处理流程, 返回是否被接受
+
+        未达到并发上限且同一键下没有正在执行的流程时立即执行, 否则进入等待队列
+
+        ---
+        ### 参数
+        - trigger: 触发器
+        - factory: 创建处理流程协程的函数
+        - key: 顺序执行的键, `None`时不限制
+        - ticket: 由`reserve`取得的分发序号, `None`时同一键下按提交顺序执行
+        '''
+        self.stats.submitted += 1
+        job = HandlerJob(trigger, getattr(trigger, 'plugin', None), factory, key, ticket if key is not None else None)
+        if (trigger, job.key) not in self._groups and self._running < self.limits[0] and self._blocker(job) is None:
+            self._start(job)
+            return True
+
+        queue_size = self.limits[3]
+        if self._pending >= queue_size:
+            if queue_size <= 0 or trigger.priority >= (lowest := max(self._lanes)):
+                self._drop(job)
+                return False
+            oldest = next(iter(self._lanes[lowest]))
+            self._dequeue(oldest)
+            self._drop(oldest)
+
+        self._enqueue(job)
+        self.stats.queued += 1
+        if self._ready:
+            self._pump()
+        return True
+
+    def json(self) -> dict[str, Any]:
+        stats = self.stats
+        concurrency, plugin_concurrency, trigger_concurrency, queue_size = self.limits
+        return {
+            'running': self._running,
+            'pending': self._pending,
+            'lanes': {priority: len(lane) for priority, lane in sorted(self._lanes.items())},
+            'submitted': stats.submitted,
+            'started': stats.started,
+            'queued': stats.queued,
+            'dropped': stats.dropped,
+            'avg_wait_ns': stats.wait_ns // stats.queued if stats.queued else 0,
+            'max_wait_ns': stats.max_wait_ns,
+            'limits': {
+                'concurrency': concurrency,
+                'plugin_concurrency': plugin_concurrency,
+                'trigger_concurrency': trigger_concurrency,
+                'queue_size': queue_size,
+            },
+        }
+
+    def _blocker(self, job: HandlerJob) -> Optional[Hashable]:
+        # 流程无法执行时返回所等待的资源, 总并发上限除外
+        _, plugin_concurrency, trigger_concurrency, _ = self.limits
+        if self._plugin_running.get(job.plugin, 0) >= plugin_concurrency:
+            return (0, job.plugin)
+        limit = job.trigger.concurrency if job.trigger.concurrency is not None else trigger_concurrency
+        if self._trigger_running.get(job.trigger, 0) >= limit:
+            return (1, job.trigger)
+        if job.key is None:
+            return None
+        if (job.trigger, job.key) in self._key_running:
+            return (2, job.trigger, job.key)
+        # 更早分发的事件检查完毕前可能仍会提交流程
+        if job.ticket is not None and (tickets := self._unsettled.get(job.key, None)) and tickets[0] < job.ticket:
+            return (3, job.key)
+        return None
+
+    def _start(self, job: HandlerJob) -> None:
+        self._running += 1
+        self._plugin_running[job.plugin] = self._plugin_running.get(job.plugin, 0) + 1
+        self._trigger_running[job.trigger] = self._trigger_running.get(job.trigger, 0) + 1
+        if job.key is not None:
+            self._key_running.add((job.trigger, job.key))
+        self.stats.started += 1
+        task = CONTEXT_LOOP.get().create_task(job.factory(), context=job.context)
+        task.add_done_callback(lambda _: self._finish(job))
+
+    def _finish(self, job: HandlerJob) -> None:
+        self._running -= 1
+        if (count := self._plugin_running[job.plugin] - 1) > 0:
+            self._plugin_running[job.plugin] = count
+        else:
+            del self._plugin_running[job.plugin]
+        if (count := self._trigger_running[job.trigger] - 1) > 0:
+            self._trigger_running[job.trigger] = count
+        else:
+            del self._trigger_running[job.trigger]
+        self._release((0, job.plugin))
+        self._release((1, job.trigger))
+        if job.key is not None:
+            self._key_running.discard((job.trigger, job.key))
+            self._release((2, job.trigger, job.key))
+        self._pump()
+
+    def _pump(self) -> None:
+        # 按优先度与进入顺序依次取出就绪的流程, 无法执行的挂在所等待的资源下
+        concurrency = self.limits[0]
+        ready = self._ready
+        while ready and self._running < concurrency:
+            entry = heappop(ready)
+            job = entry[3]
+            if not self._valid(entry):
+                continue
+            if (blocker := self._blocker(job)) is not None:
+                heappush(self._parked.setdefault(blocker, list()), entry)
+                continue
+            self._dequeue(job)
+            self._wait(job)
+            self._start(job)
+
+    def _release(self, resource: Hashable, every: bool = False) -> None:
+        # 资源释放后将挂在其下的流程移回就绪堆, 仍被其他资源阻塞的改挂在该资源下
+        # 并发上限每次只空出一个位置, 移回一个流程即可; `every`为`True`时移回所有流程
+        if (parked := self._parked.get(resource, None)) is None:
+            return
+        kept: list[tuple[int, int, int, HandlerJob]] = list()
+        while parked:
+            entry = heappop(parked)
+            if not self._valid(entry):
+                continue
+            if (blocker := self._blocker(entry[3])) == resource:
+                kept.append(entry)
+                if not every:
+                    break
+            elif blocker is not None:
+                heappush(self._parked.setdefault(blocker, list()), entry)
+            else:
+                heappush(self._ready, entry)
+                if not every:
+                    break
+        for entry in kept:
+            heappush(parked, entry)
+        if not parked:
+            del self._parked[resource]
+
+    def _valid(self, entry: tuple[int, int, int, HandlerJob]) -> bool:
+        job = entry[3]
+        return entry[2] == job.token and (group := self._groups.get((job.trigger, job.key), None)) is not None and group[0] is job
+
+    def _wake(self, job: HandlerJob) -> None:
+        # 流程成为所在组的第一个, 之前的调度条目随之失效
+        job.token += 1
+        heappush(self._ready, (job.trigger.priority, job.seq, job.token, job))
+
+    def _enqueue(self, job: HandlerJob) -> None:
+        job.seq = next(self._seq)
+        self._lanes.setdefault(job.trigger.priority, dict())[job] = None
+        self._pending += 1
+        if (group := self._groups.get((job.trigger, job.key), None)) is None:
+            self._groups[(job.trigger, job.key)] = deque((job, ))
+            self._wake(job)
+            return
+        index = len(group)
+        if job.ticket is not None:
+            while index and (ticket := group[index - 1].ticket) is not None and ticket > job.ticket:
+                index -= 1
+        group.insert(index, job)
+        if index == 0:
+            self._wake(job)
+
+    def _dequeue(self, job: HandlerJob) -> None:
+        lane = self._lanes[job.trigger.priority]
+        del lane[job]
+        if not lane:
+            del self._lanes[job.trigger.priority]
+        self._pending -= 1
+        job.token += 1
+        group = self._groups[(job.trigger, job.key)]
+        if group[0] is job:
+            group.popleft()
+            if group:
+                self._wake(group[0])
+        else:
+            group.remove(job)
+        if not group:
+            del self._groups[(job.trigger, job.key)]
+
+    def _wait(self, job: HandlerJob) -> None:
+        waited = time.perf_counter_ns() - job.submitted_ns
+        self.stats.wait_ns += waited
+        if waited > self.stats.max_wait_ns:
+            self.stats.max_wait_ns = waited
+
+    def _drop(self, job: HandlerJob) -> None:
+        self.stats.dropped += 1
+        # 丢弃的流程未创建协程, 无需关闭
+        logger.warning(colorize.trigger(job.trigger) + f'等待执行的事件处理流程过多, 已丢弃一次触发[等待中: {self._pending}].')
+
+
+HANDLER_SCHEDULER = HandlerScheduler()
+'''## 当前进程(插件组)内的事件处理流程调度器'''
+
+
+def handler_scheduler_stats() -> dict[str, Any]:
+    '''
+    ## 当前插件组内事件处理流程的执行与排队统计
+    '''
+    return HANDLER_SCHEDULER.json()
+
+
+WORKER_STATS['handlers'] = handler_scheduler_stats
+
+
+__all__ = [
+    'HandlerJob',
+    'HandlerScheduler',
+    'HandlerSchedulerStats',
+    'conversation_key',
+    'HANDLER_SCHEDULER',
+    'handler_scheduler_stats',
+]
@@ -0,0 +1,101 @@
+from heapq import merge
+from typing import Iterable, Optional, Type
+
+from chara.core.bot import Bot
+from chara.core.hazard import CONTEXT_DISPATCH_TICKET, PLUGINS
+from chara.core.plugin.runner import HANDLER_SCHEDULER, conversation_key
+from chara.core.plugin.session import SESSIONS
+from chara.core.plugin.trigger import Session, Trigger
+from chara.onebot.events import Event, MessageEvent
+
+
+class TriggerScheduler:
+    '''
+    ## 触发器调度器
+
+    将当前插件组内所有插件的触发器按优先度合并为一个列表, 每个事件仅创建一个任务按顺序检查
+
+    按事件类型索引触发器, 仅检查`event_types`包含该事件类型的触发器
+
+    `priority`越小越先检查, 优先度相同时按插件导入顺序与触发器添加顺序检查, 遇到第一个触发的`block=True`触发器后不再检查之后的触发器
+
+    会话不在此列表中, 由会话路由找到后按优先度合并; 被`wait_for_message`接收的消息不再检查任何触发器
+    '''
+
+    __slots__ = ('_triggers', '_index')
+
+    def __init__(self) -> None:
+        self._triggers: Optional[list[Trigger]] = None
+        self._index: dict[Type[Event], list[Trigger]] = dict()
+        '''## 事件类型 -> 可能触发的触发器'''
+
+    @property
+    def triggers(self) -> list[Trigger]:
+        if self._triggers is None:
+            triggers = [trigger for plugin in PLUGINS.values() for trigger in plugin.triggers if not isinstance(trigger, Session)]
+            # 排序稳定, 保持插件内的添加顺序
+            triggers.sort(key=lambda t: t.priority)
+            self._triggers = triggers
+        return self._triggers
+
+    def triggers_for(self, event_type: Type[Event]) -> list[Trigger]:
+        '''
+        ## 获取该类型事件可能触发的触发器
+
+        仅在每种事件类型首次出现时根据触发器的`event_types`生成
+        '''
+        if (triggers := self._index.get(event_type, None)) is None:
+            triggers = self._index[event_type] = [trigger for trigger in self.triggers if issubclass(event_type, trigger.event_types)]
+        return triggers
+
+    def invalidate(self) -> None:
+        '''
+        ## 触发器发生变化时调用, 下次调度时重新生成顺序
+        '''
+        self._triggers = None
+        self._index.clear()
+
+    async def handle_event(self, bot: Bot, event: Event) -> None:
+        # 在首次等待前按到达顺序取得分发序号, 顺序执行的触发器据此保持消息顺序
+        if (key := conversation_key(event)) is None:
+            return await self._handle_event(bot, event)
+        ticket = HANDLER_SCHEDULER.reserve(key)
+        CONTEXT_DISPATCH_TICKET.set(ticket)
+        try:
+            await self._handle_event(bot, event)
+        finally:
+            HANDLER_SCHEDULER.settle(key, ticket)
+
+    async def _handle_event(self, bot: Bot, event: Event) -> None:
+        # 仅消息事件会结束等待
+        if isinstance(event, MessageEvent):
+            for waiter in SESSIONS.waiters(event):
+                if await waiter.feed(bot, event):
+                    return
+
+        triggers: Iterable[Trigger] = self.triggers_for(type(event))
+        if sessions := [session for session in SESSIONS.sessions(event) if isinstance(event, session.event_types)]:
+            triggers = merge(sessions, triggers, key=lambda t: t.priority)
+
+        dead: list[Trigger] = list()
+        for trigger in triggers:
+            if not trigger.alive:
+                dead.append(trigger)
+                continue
+            triggered = await trigger.check(bot, event)
+            if not trigger.alive:
+                dead.append(trigger)
+            if triggered and trigger.block:
+                break
+
+        for trigger in dead:
+            if isinstance(trigger, Session):
+                SESSIONS.discard(trigger)
+            trigger.plugin.remove_trigger(trigger)
+        if dead:
+            self.invalidate()
+
+
+__all__ = [
+    'TriggerScheduler',
+]
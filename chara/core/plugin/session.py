@@ -0,0 +1,200 @@
+import asyncio
+
+from typing import Iterator, Literal, Optional, Type, TYPE_CHECKING
+
+from chara.core.bot import Bot
+from chara.core.hazard import CONTEXT_CURRENT_WORKER, CONTEXT_LOOP
+from chara.core.plugin.condition import Condition
+from chara.onebot.events import Event, MessageEvent
+
+if TYPE_CHECKING:
+    from chara.core.plugin.trigger import Session
+
+
+SessionKey = tuple[Optional[int], Optional[int], Optional[int]]
+'''## (bot的QQ号, 群号, QQ号), `None`表示不限'''
+
+WaiterKey = tuple[int, Optional[int], Optional[int]]
+'''## (bot的QQ号, 群号, QQ号), 私聊时群号为`None`, 等待群内任意成员时QQ号为`None`'''
+
+
+class SessionWaiter:
+    '''
+    ## 等待中的消息
+    '''
+
+    __slots__ = ('key', 'future', 'condition')
+
+    key: WaiterKey
+    future: asyncio.Future[MessageEvent]
+    condition: Optional[Condition]
+
+    def __init__(self, key: WaiterKey, future: asyncio.Future[MessageEvent], condition: Optional[Condition] = None) -> None:
+        self.key = key
+        self.future = future
+        self.condition = condition
+
+    async def feed(self, bot: Bot, event: MessageEvent) -> bool:
+        '''
+        ## 满足条件时以该事件结束等待, 返回是否接收
+        '''
+        if self.future.done():
+            return False
+        if self.condition and not await self.condition(event, bot):
+            return False
+        # 检查条件期间可能已超时
+        if self.future.done():
+            return False
+        self.future.set_result(event)
+        return True
+
+
+class SessionRegistry:
+    '''
+    ## 会话路由
+
+    按(bot的QQ号, 群号, QQ号)索引会话触发器与等待中的消息, 事件到达时直接找到对应的会话, 耗时与会话数量无关
+    '''
+
+    __slots__ = ('_sessions', '_waiters', '_count')
+
+    def __init__(self) -> None:
+        self._sessions: dict[SessionKey, list['Session']] = dict()
+        self._waiters: dict[WaiterKey, list[SessionWaiter]] = dict()
+        self._count = 0
+        '''## 会话与等待中的消息总数'''
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, session: 'Session') -> None:
+        sessions = self._sessions.setdefault((session.self_id, session.gid, session.uid), list())
+        if session not in sessions:
+            sessions.append(session)
+            self._count += 1
+
+    def discard(self, session: 'Session') -> None:
+        key = (session.self_id, session.gid, session.uid)
+        if (sessions := self._sessions.get(key, None)) is None:
+            return
+        if session in sessions:
+            sessions.remove(session)
+            self._count -= 1
+        if not sessions:
+            del self._sessions[key]
+
+    def sessions(self, event: Event) -> list['Session']:
+        '''
+        ## 获取可能被该事件触发的会话
+        '''
+        if not self._sessions:
+            return list()
+        result: list['Session'] = list()
+        for key in self._session_keys(event.self_id, getattr(event, 'group_id', None), getattr(event, 'user_id', None)):
+            if (sessions := self._sessions.get(key, None)) is not None:
+                result.extend(sessions)
+        return result
+
+    def wants(self, event_type: Type[Event], self_id: int, group_id: Optional[int], user_id: Optional[int]) -> bool:
+        '''
+        ## 是否有会话或等待中的消息可能需要该事件, 用于在构建事件前跳过
+        '''
+        if self._waiters and issubclass(event_type, MessageEvent) and user_id is not None:
+            if any(key in self._waiters for key in self._waiter_keys(self_id, group_id, user_id)):
+                return True
+        if self._sessions:
+            for key in self._session_keys(self_id, group_id, user_id):
+                if any(issubclass(event_type, session.event_types) for session in self._sessions.get(key, ())):
+                    return True
+        return False
+
+    @staticmethod
+    def _session_keys(self_id: int, gid: Optional[int], uid: Optional[int]) -> list[SessionKey]:
+        keys: list[SessionKey] = list()
+        for key_self_id in (self_id, None):
+            if gid is not None:
+                keys.append((key_self_id, gid, None))
+                if uid is not None:
+                    keys.append((key_self_id, gid, uid))
+            if uid is not None:
+                keys.append((key_self_id, None, uid))
+        return keys
+
+    @staticmethod
+    def _waiter_keys(self_id: int, gid: Optional[int], uid: int) -> tuple[WaiterKey, ...]:
+        return ((self_id, gid, uid), (self_id, gid, None)) if gid is not None else ((self_id, None, uid), )
+
+    def add_waiter(self, waiter: SessionWaiter) -> None:
+        self._waiters.setdefault(waiter.key, list()).append(waiter)
+        self._count += 1
+        self._update_subscription()
+
+    def discard_waiter(self, waiter: SessionWaiter) -> None:
+        if (waiters := self._waiters.get(waiter.key, None)) is None:
+            return
+        if waiter in waiters:
+            waiters.remove(waiter)
+            self._count -= 1
+        if not waiters:
+            del self._waiters[waiter.key]
+            self._update_subscription()
+
+    def waiters(self, event: MessageEvent) -> list[SessionWaiter]:
+        '''
+        ## 获取等待该事件的消息等待
+        '''
+        if not self._waiters:
+            return list()
+        keys = self._waiter_keys(event.self_id, getattr(event, 'group_id', None), event.user_id)
+        return [waiter for key in keys for waiter in self._waiters.get(key, ())]
+
+    def subscribe(self) -> Iterator[tuple[Type[Event], Optional[int], Optional[int]]]:
+        '''
+        ## 等待中的消息需要的事件范围
+        '''
+        for _, gid, uid in self._waiters:
+            yield MessageEvent, gid, uid
+
+    def _update_subscription(self) -> None:
+        if worker := CONTEXT_CURRENT_WORKER.get(None):
+            worker.process.update_subscription()
+
+
+SESSIONS = SessionRegistry()
+'''## 当前进程(插件组)内的会话路由'''
+
+
+async def wait_for_message(event: MessageEvent, timeout: Optional[float] = 60, condition: Optional[Condition] = None, mode: Literal['group_shared', 'independent'] = 'independent') -> Optional[MessageEvent]:
+    '''
+    ## 等待同一会话的下一条消息
+
+    接收到的消息不再触发其他触发器, 超时后返回`None`
+
+    ---
+    ### 参数
+    - event: 当前消息事件
+    - timeout: 超时时间(s), `None`时不超时
+    - condition: 条件, 可注入`Event`与`Bot`
+    - mode: 等待范围
+        - group_shared: 群聊中等待任意成员的消息
+        - independent: 仅等待当前消息发送者的消息
+    '''
+    gid: Optional[int] = getattr(event, 'group_id', None)
+    uid: Optional[int] = None if mode == 'group_shared' and gid is not None else event.user_id
+    future: asyncio.Future[MessageEvent] = CONTEXT_LOOP.get().create_future()
+    waiter = SessionWaiter((event.self_id, gid, uid), future, condition)
+    SESSIONS.add_waiter(waiter)
+    try:
+        return await asyncio.wait_for(future, timeout)
+    except asyncio.TimeoutError:
+        return None
+    finally:
+        SESSIONS.discard_waiter(waiter)
+
+
+__all__ = [
+    'SessionRegistry',
+    'SessionWaiter',
+    'SESSIONS',
+    'wait_for_message',
+]
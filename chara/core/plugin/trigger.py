@@ -1,13 +1,17 @@
 from asyncio import AbstractEventLoop
 from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import Any, Callable, Generator, NoReturn, Optional, overload, TYPE_CHECKING
+from pathlib import Path
+from typing import Any, Callable, NoReturn, Optional, Type, overload, TYPE_CHECKING
 
 from chara.core.bot import Bot
 from chara.core.color import colorize
-from chara.core.hazard import CONTEXT_LOOP
+from chara.core.hazard import CONTEXT_DISPATCH_TICKET, CONTEXT_LOOP
 from chara.core.plugin.condition import Condition
 from chara.core.plugin.handler import Handler
+from chara.core.plugin.history import SessionHistory
+from chara.core.plugin.runner import HANDLER_SCHEDULER, conversation_key
+from chara.core.plugin.session import SESSIONS
 from chara.exception import IgnoreException, KillTrigger
 from chara.log import logger
 from chara.lib.executor import Executor
@@ -18,6 +22,20 @@ if TYPE_CHECKING:
     from chara.core.plugin.plugin import Plugin
 
 
+def infer_event_types(condition: Condition, event_types: tuple[Type[Event], ...] = (Event, )) -> tuple[Type[Event], ...]:
+    '''
+    ## 根据条件中检查器的参数注解收窄可能触发的事件类型
+
+    检查器要求的事件类型无法绑定时条件不满足, 因此事件必须是所有注解事件类型的实例
+    '''
+    required = [t for checker in condition.checkers for t in checker.annotations if isinstance(t, type) and issubclass(t, Event)]
+    if not required:
+        return event_types
+    # 取最具体的注解类型, 互不相关时任取其一均不会遗漏
+    narrowest = next((t for t in required if all(issubclass(t, other) for other in required)), required[0])
+    return tuple(dict.fromkeys(narrowest if issubclass(narrowest, event_type) else event_type for event_type in event_types))
+
+
 @dataclass(repr=False, eq=False, slots=True)
 class TriggerCapturedData:
     '''
@@ -34,7 +52,7 @@ class Trigger:
     ## 触发器
     '''
 
-    __slots__ = ('alive', 'block', 'condition', 'handlers', 'name', 'plugin', 'priority', 'captured_data_factory')
+    __slots__ = ('alive', 'block', 'condition', 'handlers', 'name', 'plugin', 'priority', 'captured_data_factory', 'event_types', 'concurrency', 'ordered', 'timeout', '__weakref__')
     
     block: bool
     condition: Condition
@@ -43,8 +61,16 @@ class Trigger:
     plugin: 'Plugin'
     priority: int
     captured_data_factory: Callable[..., TriggerCapturedData]
+    event_types: tuple[Type[Event], ...]
+    '''## 可能触发的事件类型'''
+    concurrency: Optional[int]
+    '''## 同时执行的事件处理流程上限, `None`时使用插件组的`trigger_concurrency`'''
+    ordered: bool
+    '''## 同一会话内的事件处理流程是否依次执行'''
+    timeout: Optional[float]
+    '''## 每个事件处理流程的超时时间(s), 超时后取消, `None`时使用插件组的`handler_timeout`'''
 
-    def __init__(self, condition: Condition, block: bool = False, priority: int = 0, name: Optional[str] = None, captured_data_factory: Callable[..., TriggerCapturedData] = TriggerCapturedData) -> None:
+    def __init__(self, condition: Condition, block: bool = False, priority: int = 0, name: Optional[str] = None, captured_data_factory: Callable[..., TriggerCapturedData] = TriggerCapturedData, event_types: tuple[Type[Event], ...] = (Event, ), concurrency: Optional[int] = None, ordered: bool = False, timeout: Optional[float] = None) -> None:
         '''
         ## 创建一个触发器
         
@@ -52,8 +78,12 @@ class Trigger:
         ### 参数
         - condition: 条件
         - block: 是否阻塞
-        - priority: 优先级
+        - priority: 优先级, 越小越先检查, 事件处理流程排队时也越先执行
         - name: 名字
+        - event_types: 可能触发的事件类型, 其他类型的事件不会分发至此触发器所在进程, 也不会检查此触发器[会根据条件中检查器的事件参数注解进一步收窄]
+        - concurrency: 同时执行的事件处理流程上限, `None`时使用插件组的`trigger_concurrency`
+        - ordered: 同一会话[群聊按群号, 其他按QQ号]内的事件处理流程是否按触发顺序依次执行, 不同会话间仍可并发
+        - timeout: 每个事件处理流程的超时时间(s), 超时后取消, `None`时使用插件组的`handler_timeout`
         '''
         self.alive = True
         self.block = block
@@ -62,12 +92,24 @@ class Trigger:
         self.priority = priority
         self.handlers = list()
         self.captured_data_factory = captured_data_factory
+        self.event_types = infer_event_types(condition, event_types)
+        self.concurrency = concurrency
+        self.ordered = ordered
+        self.timeout = timeout
 
     def kill(self) -> NoReturn:
         self.alive = False
         raise KillTrigger
 
-    def handle(self, func: Optional[ExecutorCallable[Any]] = None, condition: Optional[Condition] = None) -> ExecutorCallable[Any]:
+    def subscribe(self) -> list[tuple[Type[Event], Optional[int], Optional[int]]]:
+        '''
+        ## 触发器可能触发的事件范围
+        
+        (事件类型, 群号, QQ号), `None`表示不限
+        '''
+        return [(event_type, None, None) for event_type in self.event_types]
+
+    def handle(self, func: Optional[ExecutorCallable[Any]] = None, condition: Optional[Condition] = None, timeout: Optional[float] = None) -> ExecutorCallable[Any]:
         '''
         ## 创建一个事件处理流程
         
@@ -75,6 +117,7 @@ class Trigger:
         ### 参数
         - func: 处理流程函数
         - condition: 条件
+        - timeout: 超时时间(s), 超时后取消, `None`时使用触发器的`timeout`
         
         ---
         ### 触发时可选注入参数类型
@@ -85,14 +128,14 @@ class Trigger:
         - chara.plugin.TriggerCapturedData [不同类型的Trigger不同]
         '''
         def wrapper(func: ExecutorCallable[Any]) -> ExecutorCallable[Any]:
-            self.handlers.append(Handler(Executor[Any](func), condition, self))
+            self.handlers.append(Handler(Executor[Any](func), condition, self, timeout))
             return func
         if func is not None:
             return wrapper(func)
         else:
             return wrapper
 
-    def exchange_handler(self, func: Optional[ExecutorCallable[Any]] = None, condition: Optional[Condition] = None, index: int = 0) -> ExecutorCallable[Any]:
+    def exchange_handler(self, func: Optional[ExecutorCallable[Any]] = None, condition: Optional[Condition] = None, index: int = 0, timeout: Optional[float] = None) -> ExecutorCallable[Any]:
         '''
         ## 替换一个事件处理流程
         
@@ -101,31 +144,32 @@ class Trigger:
         - func: 处理流程函数
         - condition: 条件
         - index: 索引
+        - timeout: 超时时间(s), 超时后取消, `None`时使用触发器的`timeout`
         '''
         if len(self.handlers) == 0:
-            return self.handle(func, condition)
+            return self.handle(func, condition, timeout)
         
         assert 0 <= index < len(self.handlers)
         
         def wrapper(func: ExecutorCallable[Any]) -> ExecutorCallable[Any]:
-            self.handlers[index] = Handler(Executor[Any](func), condition, self)
+            self.handlers[index] = Handler(Executor[Any](func), condition, self, timeout)
             return func
         if func is not None:
             return wrapper(func)
         else:
             return wrapper
     
-    async def check(self, bot: Bot, event: Event) -> None:
+    async def check(self, bot: Bot, event: Event) -> bool:
         '''
         ## 检查事件是否可触发
-        触发后开始事件处理流程
+        触发后将事件处理流程提交至调度器, 返回是否触发
         
         ---
         ### 参数
         - event: 事件
         '''
         if not self.alive:
-            return
+            return False
         
         loop = CONTEXT_LOOP.get()
         temp_context_tcd: ContextVar[Optional[TriggerCapturedData]] = ContextVar('temp_context_tcd', default=None)
@@ -134,19 +178,21 @@ class Trigger:
                 if (tcd := temp_context_tcd.get()) is None:
                     tcd = self.captured_data_factory(bot=bot, event=event, extra=dict())
             else:
-                return
+                return False
         
         except IgnoreException:
-            return
+            return False
         
         except:
             logger.exception(colorize.trigger(self) + '在检查自身条件时发生异常.')
-            return
+            return False
         
         finally:
             del temp_context_tcd
         
-        loop.create_task(self._handle(self.handlers.copy(), bot, loop, tcd))
+        handlers = self.handlers.copy()
+        HANDLER_SCHEDULER.submit(self, lambda: self._handle(handlers, bot, loop, tcd), conversation_key(event) if self.ordered else None, CONTEXT_DISPATCH_TICKET.get())
+        return True
     
     async def _handle(self, handlers: list[Handler], bot: Bot, loop: AbstractEventLoop, tcd: TriggerCapturedData) -> None:
         log_text = colorize.trigger(self)
@@ -159,70 +205,49 @@ class Trigger:
         logger.success(log_text + colorize.handler_results(count) + '处理完毕.')
 
 
-class SessionHistory:
-    
-    __slots__ = ('events', 'maxsize')
-    
-    events: list[Event]
-    maxsize: int
-    
-    def __init__(self, maxsize: int) -> None:
-        self.events = list()
-        self.maxsize = maxsize
-    
-    def __iter__(self) -> Generator[Event, Any, None]:
-        for event in self.events:
-            yield event
-    
-    def put(self, event: Event) -> None:
-        if self.maxsize > 0:
-            if self.length > self.maxsize:
-                self.events = self.events[-self.maxsize:]
-            self.events.append(event)
-        
-        elif self.maxsize < 0:
-            self.events.append(event)
-    
-    @property
-    def length(self) -> int:
-        return len(self.events)
-
-
 class Session(Trigger):
     '''
     ## 触发器(会话)
+
+    会话添加至插件时按(bot的QQ号, 群号, QQ号)登记在当前进程的会话路由中, 事件到达时直接找到对应的会话, 不随其他触发器逐个检查
     '''
 
-    __slots__ = ('alive', 'block', 'condition', 'handlers', 'name', 'plugin', 'priority', 'gid', 'uid', 'history')
+    __slots__ = ('self_id', 'gid', 'uid', 'history', '_timer')
     
     history: SessionHistory
 
     @overload
-    def __init__(self, *, gid: int, condition: Optional[Condition] = None, history_maxsize: int = 0) -> None:
+    def __init__(self, *, gid: int, self_id: Optional[int] = None, condition: Optional[Condition] = None, history_maxsize: int = 0, history_spill: bool = False, timeout: Optional[float] = None) -> None:
         '''
         ## 接收群消息
         
         ---
         ### 参数
         - gid: 群号
+        - self_id: bot的QQ号, `None`时接收所有bot收到的消息
         - condition: 条件
-        - history_maxsize: 最大历史消息记录数量, `0`时不记录, 小于`0`时无上限
+        - history_maxsize: 内存中最大历史消息记录数量, `0`时不记录, 小于`0`时无上限
+        - history_spill: 是否将移出内存的历史消息写入插件数据目录, 否则直接丢弃
+        - timeout: 超时时间(s), 超时后会话失效并移出, `None`时不超时
         '''
 
     @overload
-    def __init__(self, *, uid: int, condition: Optional[Condition] = None, history_maxsize: int = 0) -> None:
+    def __init__(self, *, uid: int, self_id: Optional[int] = None, condition: Optional[Condition] = None, history_maxsize: int = 0, history_spill: bool = False, timeout: Optional[float] = None) -> None:
         '''
         ## 接收私聊消息
         
         ---
         ### 参数
         - uid: QQ号
+        - self_id: bot的QQ号, `None`时接收所有bot收到的消息
         - condition: 条件
-        - history_maxsize: 最大历史消息记录数量, `0`时不记录, 小于`0`时无上限
+        - history_maxsize: 内存中最大历史消息记录数量, `0`时不记录, 小于`0`时无上限
+        - history_spill: 是否将移出内存的历史消息写入插件数据目录, 否则直接丢弃
+        - timeout: 超时时间(s), 超时后会话失效并移出, `None`时不超时
         '''
 
     @overload
-    def __init__(self, *, gid: int, uid: int, condition: Optional[Condition] = None, history_maxsize: int = 0) -> None:
+    def __init__(self, *, gid: int, uid: int, self_id: Optional[int] = None, condition: Optional[Condition] = None, history_maxsize: int = 0, history_spill: bool = False, timeout: Optional[float] = None) -> None:
         '''
         ## 接收群成员消息
         
@@ -230,22 +255,27 @@ class Session(Trigger):
         ### 参数
         - gid: 群号
         - uid: QQ号
+        - self_id: bot的QQ号, `None`时接收所有bot收到的消息
         - condition: 条件
-        - history_maxsize: 最大历史消息记录数量, `0`时不记录, 小于`0`时无上限
+        - history_maxsize: 内存中最大历史消息记录数量, `0`时不记录, 小于`0`时无上限
+        - history_spill: 是否将移出内存的历史消息写入插件数据目录, 否则直接丢弃
+        - timeout: 超时时间(s), 超时后会话失效并移出, `None`时不超时
         '''
 
-    def __init__(self, *, gid: Optional[int] = None, uid: Optional[int] = None, condition: Optional[Condition] = None, history_maxsize: int = 0) -> None:
+    def __init__(self, *, gid: Optional[int] = None, uid: Optional[int] = None, self_id: Optional[int] = None, condition: Optional[Condition] = None, history_maxsize: int = 0, history_spill: bool = False, timeout: Optional[float] = None) -> None:
         if uid is None and gid is None:
             raise
+        self.self_id = self_id
         self.gid = gid
         self.uid = uid
-        self.history = SessionHistory(history_maxsize)
+        self.history = SessionHistory(history_maxsize, self._history_spill_path if history_spill else None)
         
         async def check(event: Event):
-            event_dict = event.model_dump()
-            gid = event_dict.get('group_id', None)
-            uid = event_dict.get('user_id', None)
-            if self.gid is None:
+            gid = getattr(event, 'group_id', None)
+            uid = getattr(event, 'user_id', None)
+            if self.self_id is not None and self.self_id != event.self_id:
+                result = False
+            elif self.gid is None:
                 result = self.uid == uid
             elif self.uid is None:
                 result = self.gid == gid
@@ -260,4 +290,30 @@ class Session(Trigger):
             new_condition = new_condition & condition
         
         super().__init__(new_condition, True, -1, None)
+        self._timer = CONTEXT_LOOP.get().call_later(timeout, self.close) if timeout is not None else None
+
+    def _history_spill_path(self) -> Optional[Path]:
+        if (plugin := getattr(self, 'plugin', None)) is None:
+            return None
+        return SessionHistory.spill_path(plugin.data_path / 'sessions')
+
+    def kill(self) -> NoReturn:
+        self.close()
+        raise KillTrigger
+
+    def close(self) -> None:
+        '''
+        ## 使会话失效并移出会话路由与所在插件, 清空历史记录
+        '''
+        self.alive = False
+        SESSIONS.discard(self)
+        self.history.clear()
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if (plugin := getattr(self, 'plugin', None)) is not None:
+            plugin.remove_trigger(self)
+
+    def subscribe(self) -> list[tuple[Type[Event], Optional[int], Optional[int]]]:
+        return [(event_type, self.gid, self.uid) for event_type in self.event_types]
 
@@ -0,0 +1,179 @@
+import asyncio
+import time
+
+from dataclasses import dataclass, field
+from typing import Any, Optional, TYPE_CHECKING
+
+from chara.core.color import colorize
+from chara.core.hazard import CONTEXT_CURRENT_PLUGIN_GROUP_CONFIG, CONTEXT_LOOP, WORKER_STATS
+from chara.log import logger
+
+if TYPE_CHECKING:
+    from chara.config import PluginGroupConfig
+    from chara.core.plugin.handler import Handler
+
+
+DEFAULT_HANDLER_TIMEOUT = 60.0
+
+
+@dataclass(repr=False, eq=False, slots=True)
+class HandlerRecord:
+    '''## 正在执行的事件处理流程'''
+
+    handler: 'Handler'
+    task: Optional[asyncio.Task[Any]]
+    deadline: Optional[float]
+    '''## 超时时刻, `None`时不超时'''
+    cancel: bool
+    '''## 超时后是否取消'''
+    start: float = field(default_factory=time.monotonic)
+    expired: bool = False
+    cancelled: bool = False
+    '''## 是否已因超时被取消'''
+
+
+@dataclass(repr=False, eq=False, slots=True)
+class HandlerTiming:
+    '''## 事件处理流程耗时统计'''
+
+    plugin: str
+    trigger: str
+    handler: str
+    count: int = 0
+    total: float = 0
+    max: float = 0
+    timeouts: int = 0
+    cancelled: int = 0
+
+    def json(self) -> dict[str, Any]:
+        return {
+            'plugin': self.plugin,
+            'trigger': self.trigger,
+            'handler': self.handler,
+            'count': self.count,
+            'avg': self.total / self.count if self.count else 0,
+            'max': self.max,
+            'timeouts': self.timeouts,
+            'cancelled': self.cancelled,
+        }
+
+
+class HandlerWatchdog:
+    '''
+    ## 事件处理流程看门狗
+
+    每隔`interval`秒检查一次正在执行的事件处理流程, 超时的流程记录警告日志, 需要时取消
+
+    - 事件处理流程或触发器设置了`timeout`时, 超时后取消
+    - 否则使用插件组的`handler_timeout`, 仅在`handler_timeout_cancel`为`True`时取消
+    - 同步函数阻塞事件循环时无法检查与取消
+    '''
+
+    __slots__ = ('interval', '_defaults', '_running', '_timings', '_task')
+
+    interval: float
+
+    def __init__(self, interval: float = 1, timeout: Optional[float] = None, cancel: Optional[bool] = None) -> None:
+        self.interval = interval
+        self._defaults: Optional[tuple[Optional[float], bool]] = (timeout, bool(cancel)) if timeout is not None or cancel is not None else None
+        self._running: dict[HandlerRecord, None] = dict()
+        self._timings: dict[tuple[str, str, str], HandlerTiming] = dict()
+        self._task: Optional[asyncio.Task[None]] = None
+
+    @property
+    def defaults(self) -> tuple[Optional[float], bool]:
+        '''## (默认超时时间, 超时后是否取消)'''
+        if self._defaults is None:
+            config: Optional['PluginGroupConfig'] = CONTEXT_CURRENT_PLUGIN_GROUP_CONFIG.get(None)
+            self._defaults = (config.handler_timeout, config.handler_timeout_cancel) if config is not None else (DEFAULT_HANDLER_TIMEOUT, False)
+        return self._defaults
+
+    def enter(self, handler: 'Handler') -> HandlerRecord:
+        '''
+        ## 登记一次开始执行的事件处理流程
+        '''
+        if (timeout := handler.timeout if handler.timeout is not None else handler.trigger.timeout) is not None:
+            cancel = True
+        else:
+            timeout, cancel = self.defaults
+        record = HandlerRecord(handler, asyncio.current_task(), None, cancel)
+        if timeout is not None:
+            record.deadline = record.start + timeout
+            self._running[record] = None
+            if self._task is None:
+                self._task = CONTEXT_LOOP.get().create_task(self._watch())
+        return record
+
+    def exit(self, record: HandlerRecord) -> None:
+        '''
+        ## 登记一次结束执行的事件处理流程
+        '''
+        self._running.pop(record, None)
+        elapsed = time.monotonic() - record.start
+        timing = self._timing(record.handler)
+        timing.count += 1
+        timing.total += elapsed
+        if elapsed > timing.max:
+            timing.max = elapsed
+
+    def slowest(self, limit: int = 10) -> list[dict[str, Any]]:
+        '''
+        ## 最长耗时最高的事件处理流程
+        '''
+        return [timing.json() for timing in sorted(self._timings.values(), key=lambda t: t.max, reverse=True)[:limit]]
+
+    def _timing(self, handler: 'Handler') -> HandlerTiming:
+        trigger = handler.trigger
+        plugin = trigger.plugin.metadata.name if getattr(trigger, 'plugin', None) is not None else ''
+        func = handler.exc.func
+        key = (plugin, colorize.trigger_name(trigger), getattr(func, '__qualname__', None) or type(func).__qualname__)
+        if (timing := self._timings.get(key, None)) is None:
+            timing = self._timings[key] = HandlerTiming(*key)
+        return timing
+
+    async def _watch(self) -> None:
+        try:
+            while self._running:
+                await asyncio.sleep(self.interval)
+                now = time.monotonic()
+                for record in list(self._running):
+                    if record.expired or record.deadline is None or record.deadline > now:
+                        continue
+                    record.expired = True
+                    timing = self._timing(record.handler)
+                    timing.timeouts += 1
+                    log_text = colorize.handler(record.handler) + f'执行超过{record.deadline - record.start:g}s'
+                    if record.cancel and record.task is not None and not record.task.done():
+                        record.cancelled = True
+                        timing.cancelled += 1
+                        record.task.cancel()
+                        logger.warning(log_text + ', 已取消.')
+                    else:
+                        logger.warning(log_text + ', 仍未完成.')
+        finally:
+            self._task = None
+
+
+WATCHDOG = HandlerWatchdog()
+'''## 当前进程(插件组)内的事件处理流程看门狗'''
+
+
+def slow_handler_stats(limit: int = 10) -> list[dict[str, Any]]:
+    '''
+    ## 当前插件组内最长耗时最高的事件处理流程
+
+    包含所在插件与触发器的名字, 耗时单位为秒
+    '''
+    return WATCHDOG.slowest(limit)
+
+
+WORKER_STATS['slow_handlers'] = slow_handler_stats
+
+
+__all__ = [
+    'HandlerRecord',
+    'HandlerTiming',
+    'HandlerWatchdog',
+    'WATCHDOG',
+    'slow_handler_stats',
+]
@@ -1,7 +1,9 @@
-from hashlib import md5
+from hashlib import blake2b, md5
+from multiprocessing import get_context
 from multiprocessing.shared_memory import SharedMemory
-from struct import pack, unpack
-from typing import Callable, Generic
+from pathlib import Path
+from struct import Struct, pack, pack_into, unpack, unpack_from
+from typing import Any, Callable, Generator, Generic, Hashable, Optional
 
 from chara.typing import T
 
@@ -40,6 +42,247 @@ class SharedValue(Generic[T]):
         self._sm.unlink()
 
 
+class SharedRingBuffer:
+    '''
+    ## 共享内存环形缓冲区
+    
+    单生产者多消费者, 生产者写入一次, 每个消费者以各自的位置读取
+    
+    消费者落后超过一圈时会丢失被覆盖的数据
+    '''
+    
+    __slots__ = ('_capacity', '_sm', 'cursor', 'lost')
+    
+    # [0:8] 已提交写入位置 [8:16] 已预留写入位置 [16:] 数据区
+    _HEADER = 16
+    _WRAP = 0xFFFFFFFF
+    
+    cursor: int
+    '''## 当前进程的读取位置(写入总字节数)'''
+    lost: int
+    '''## 因落后于生产者而跳过数据的次数'''
+    
+    def __init__(self, name: str, capacity: int) -> None:
+        from chara.core.hazard import IN_SUB_PROCESS, SHARED_VALUES
+        
+        self._capacity = capacity
+        name = md5(name.encode('UTF-8')).hexdigest()
+        if IN_SUB_PROCESS or name in SHARED_VALUES:
+            self._sm = SharedMemory(name, False, capacity + self._HEADER)
+        else:
+            self._sm = SharedMemory(name, True, capacity + self._HEADER)
+            pack_into('>QQ', self._sm.buf, 0, 0, 0)
+        SHARED_VALUES[name] = self
+        self.cursor = unpack_from('>Q', self._sm.buf, 0)[0]
+        self.lost = 0
+    
+    @property
+    def capacity(self) -> int:
+        return self._capacity
+    
+    def write(self, data: bytes) -> None:
+        '''
+        ## 写入一条记录(仅生产者调用)
+        '''
+        buf = self._sm.buf
+        capacity = self._capacity
+        length = len(data)
+        size = length + 4
+        if size > capacity:
+            raise ValueError(f'record size {size} exceeds ring capacity {capacity}.')
+        
+        position = self.cursor
+        offset = position % capacity
+        if offset + size > capacity:
+            # 尾部空间不足时跳至下一圈起始位置
+            rest = capacity - offset
+            pack_into('>Q', buf, 8, position + rest + size)
+            if rest >= 4:
+                pack_into('>I', buf, self._HEADER + offset, self._WRAP)
+            position += rest
+            offset = 0
+        else:
+            pack_into('>Q', buf, 8, position + size)
+        
+        start = self._HEADER + offset
+        pack_into('>I', buf, start, length)
+        buf[start + 4:start + size] = data
+        self.cursor = position + size
+        pack_into('>Q', buf, 0, self.cursor)
+    
+    def read(self, until: Optional[int] = None) -> Generator[bytes, Any, None]:
+        '''
+        ## 读取当前位置之后的记录(消费者调用)
+
+        `until`为写入某条记录后生产者的`cursor`时只读取到该记录为止, 之后写入的记录留给下一次读取
+        '''
+        buf = self._sm.buf
+        capacity = self._capacity
+        while True:
+            end = unpack_from('>Q', buf, 0)[0]
+            if until is not None and until < end:
+                end = until
+            if self.cursor >= end:
+                return
+            if unpack_from('>Q', buf, 8)[0] - self.cursor > capacity:
+                self._skip(end)
+                return
+            
+            offset = self.cursor % capacity
+            rest = capacity - offset
+            if rest < 4:
+                self.cursor += rest
+                continue
+            start = self._HEADER + offset
+            length = unpack_from('>I', buf, start)[0]
+            if length == self._WRAP:
+                self.cursor += rest
+                continue
+            if length + 4 > rest:
+                self._skip(end)
+                return
+            data = bytes(buf[start + 4:start + 4 + length])
+            # 复制期间若被生产者覆盖则丢弃
+            if unpack_from('>Q', buf, 8)[0] - self.cursor > capacity:
+                self._skip(end)
+                return
+            self.cursor += length + 4
+            yield data
+    
+    def _skip(self, end: int) -> None:
+        # `end`为记录边界, 该位置也已被覆盖时跳至最新的已提交位置
+        self.lost += 1
+        if unpack_from('>Q', self._sm.buf, 8)[0] - end > self._capacity:
+            end = unpack_from('>Q', self._sm.buf, 0)[0]
+        self.cursor = end
+    
+    def close(self) -> None:
+        self._sm.close()
+
+    def unlink(self) -> None:
+        self._sm.unlink()
+
+
+class SharedRateLimitTable:
+    '''
+    ## 共享内存限流表
+
+    开放寻址哈希表, 每个键保存一个最多`depth`个时间戳的滑动窗口, 所有进程通过同一个进程锁更新
+
+    由主进程创建, 随子进程对象传递至子进程; 时间戳为`time.time()`, 快照恢复后仍然有效
+    '''
+
+    __slots__ = ('_name', '_capacity', '_depth', '_lock', '_sm', '_entry')
+
+    # 键哈希 窗口时长 有效时间戳数量 最早时间戳位置
+    _HEAD = Struct('>QdII')
+
+    MAX_PROBE = 64
+    '''## 查找键时最多探测的位置数量, 限制持有进程锁的时间'''
+
+    def __init__(self, name: str, capacity: int, depth: int, lock: Optional[Any] = None, create: bool = True) -> None:
+        from chara.core.hazard import SHARED_VALUES
+
+        self._name = md5(name.encode('UTF-8')).hexdigest()
+        self._capacity = capacity
+        self._depth = depth
+        self._lock = lock if lock is not None else get_context('spawn').Lock()
+        self._entry = self._HEAD.size + 8 * depth
+        self._sm = SharedMemory(self._name, create, capacity * self._entry)
+        if create:
+            self._sm.buf[:] = bytes(capacity * self._entry)
+        SHARED_VALUES[self._name] = self
+
+    def __getstate__(self) -> tuple[str, int, int, Any]:
+        return self._name, self._capacity, self._depth, self._lock
+
+    def __setstate__(self, state: tuple[str, int, int, Any]) -> None:
+        from chara.core.hazard import SHARED_VALUES
+
+        self._name, self._capacity, self._depth, self._lock = state
+        self._entry = self._HEAD.size + 8 * self._depth
+        self._sm = SharedMemory(self._name, False, self._capacity * self._entry)
+        SHARED_VALUES[self._name] = self
+
+    @property
+    def depth(self) -> int:
+        return self._depth
+
+    @staticmethod
+    def key_hash(key: Hashable) -> int:
+        # 0 表示空位
+        return int.from_bytes(blake2b(repr(key).encode('UTF-8'), digest_size=8).digest()) or 1
+
+    def hit(self, key: Hashable, limit: int, window: float, now: float) -> bool:
+        '''
+        ## 尝试通过一次, 返回是否允许
+
+        任意`window`秒内最多通过`limit`次, 表已满或探测`MAX_PROBE`个位置仍未找到空位时总是允许
+        '''
+        if limit > self._depth:
+            raise ValueError(f'limit {limit} exceeds shared table depth {self._depth}.')
+        key_hash = self.key_hash(key)
+        head, entry, depth, capacity = self._HEAD, self._entry, self._depth, self._capacity
+        buf = self._sm.buf
+        with self._lock:
+            reusable: Optional[int] = None
+            index = key_hash % capacity
+            for _ in range(min(capacity, self.MAX_PROBE)):
+                offset = index * entry
+                stored, stored_window, count, first = head.unpack_from(buf, offset)
+                if stored == key_hash or stored == 0:
+                    break
+                # 记录第一个已过期的位置, 键不存在时复用
+                if reusable is None and (count == 0 or unpack_from('>d', buf, offset + head.size + 8 * ((first + count - 1) % depth))[0] <= now - stored_window):
+                    reusable = offset
+                index = (index + 1) % capacity
+            else:
+                stored = 0
+                if reusable is None:
+                    return True
+
+            if stored != key_hash:
+                offset = reusable if reusable is not None else offset
+                count = first = 0
+
+            # 通过后满`window`秒的时间戳过期
+            expire = now - window
+            while count and unpack_from('>d', buf, offset + head.size + 8 * first)[0] <= expire:
+                first = (first + 1) % depth
+                count -= 1
+            if count >= limit:
+                head.pack_into(buf, offset, key_hash, window, count, first)
+                return False
+            pack_into('>d', buf, offset + head.size + 8 * ((first + count) % depth), now)
+            head.pack_into(buf, offset, key_hash, window, count + 1, first)
+            return True
+
+    def save(self, path: Path) -> None:
+        '''
+        ## 保存快照
+        '''
+        with self._lock:
+            data = bytes(self._sm.buf)
+        path.write_bytes(pack('>II', self._capacity, self._depth) + data)
+
+    def load(self, path: Path) -> bool:
+        '''
+        ## 读取快照, 表大小不一致时忽略
+        '''
+        data = path.read_bytes()
+        if len(data) < 8 or unpack_from('>II', data, 0) != (self._capacity, self._depth) or len(data) - 8 != len(self._sm.buf):
+            return False
+        with self._lock:
+            self._sm.buf[:] = data[8:]
+        return True
+
+    def close(self) -> None:
+        self._sm.close()
+
+    def unlink(self) -> None:
+        self._sm.unlink()
+
+
 def shared_should_exit(name: str, default: bool = False) -> SharedValue[bool]:
     def read(data: bytes) -> bool:
         return unpack('>?', data)[0]
@@ -82,4 +325,9 @@ def shared_bot_protocol(name: str, default: str = 'Unknown') -> SharedValue[str]
         return pack(f'>B{length}s', length, encode)
     
     return SharedValue(name, 128, default, read, write)
-    
+
+def shared_event_ring(name: str, capacity: int) -> SharedRingBuffer:
+    return SharedRingBuffer(name, capacity)
+
+def shared_rate_limit_table(name: str, capacity: int, depth: int) -> SharedRateLimitTable:
+    return SharedRateLimitTable(name, capacity, depth)
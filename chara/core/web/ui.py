@@ -9,12 +9,19 @@ from fastapi.websockets import WebSocket, WebSocketDisconnect
 from chara.config import WebUIConfig
 from chara.core.hazard import BOTS, PLUGINS, PLUGIN_GROUPS
 from chara.core.web.static import StaticFiles
+from chara.lib import codec
 from chara.log import logger
 
 if TYPE_CHECKING:
     from chara.core.core import Core
 
 
+class _JSONResponse(JSONResponse):
+    
+    def render(self, content: Any) -> bytes:
+        return codec.dumps(content)
+
+
 class WebUI:
     
     __slots__ = ('config', 'core', 'sf', 'api', 'web')
@@ -44,7 +51,7 @@ class WebUI:
         core.app.include_router(self.web)
     
     def _response(self, code: int, msg: Optional[str] = None, data: Any = None) -> JSONResponse:
-        return JSONResponse(dict(code=code, msg=msg, data=data), code)
+        return _JSONResponse(dict(code=code, msg=msg, data=data), code)
     
     def _set_apiroute(self):
         @self.web.get('')
@@ -64,10 +71,10 @@ class WebUI:
             try:
                 ticks = 0
                 while True:
-                    await websocket.send_json({'type': 'process', 'data': self.core.wm.all_process_status})
+                    await websocket.send_text(codec.dumps({'type': 'process', 'data': self.core.wm.all_process_status}).decode('UTF-8'))
                     
                     if ticks % 5 == 0:
-                        await websocket.send_json({'type': 'plugin', 'data': [{'uuid': plugin.metadata.uuid, 'state': plugin.state.value} for plugin in PLUGINS.values()]})
+                        await websocket.send_text(codec.dumps({'type': 'plugin', 'data': [{'uuid': plugin.metadata.uuid, 'state': plugin.state.value} for plugin in PLUGINS.values()]}).decode('UTF-8'))
                     
                     await asyncio.sleep(1)
 
@@ -81,7 +88,7 @@ class WebUI:
 
         @self.api.post('/process/list')
         async def _():
-            return JSONResponse(self.core.wm.all_process_status)
+            return _JSONResponse(self.core.wm.all_process_status)
 
         @self.api.post('/process/{name}/close')
         async def _(name: str):
@@ -4,9 +4,10 @@ from fastapi import APIRouter
 from fastapi.websockets import WebSocket, WebSocketDisconnect
 
 from chara.config import GlobalConfig
-from chara.core.bot.event import BotConnectedEvent, BotDisConnectedEvent, get_event
+from chara.core.bot.event import BotConnectedEvent, BotDisConnectedEvent, get_event, peek_event
 from chara.core.color import colorize
 from chara.core.hazard import BOTS
+from chara.lib import codec
 from chara.log import logger
 from chara.onebot.api.onebot import OneBotAPI
 from chara.onebot.events import MetaEvent
@@ -33,7 +34,7 @@ class WebSocketServer:
     async def _handle(self, websocket: WebSocket) -> None:
         await websocket.accept()
         
-        data: dict[str, Any] = await websocket.receive_json()
+        data: dict[str, Any] = codec.loads(await self._receive_bytes(websocket))
         if event := get_event(data):
             if bot := BOTS.get(event.self_id, None):
                 try:
@@ -54,10 +55,23 @@ class WebSocketServer:
         
         bot.connected = True
         await self.core.wm.dispatch(BotConnectedEvent(bot.uin))
+        forward_raw = self.config.dispatch.forward_raw
+        compact = self.config.dispatch.compact_events
         try:
             while True:
-                data = await websocket.receive_json()
-                if event := get_event(data):
+                raw = await self._receive_bytes(websocket)
+                data = codec.loads(raw)
+                if forward_raw:
+                    if raw_event := peek_event(data, raw):
+                        if raw_event.is_meta:
+                            logger.debug(colorize.raw_event(data))
+                        else:
+                            logger.info(colorize.raw_event(data))
+                        
+                        await self.core.wm.dispatch(raw_event)
+                    continue
+                
+                if event := get_event(data, compact):
                     if isinstance(event, MetaEvent):
                         logger.debug(colorize.event(event))
                     else:
@@ -71,4 +85,12 @@ class WebSocketServer:
         await self.core.wm.dispatch(BotDisConnectedEvent(bot.uin))        
         bot.connected = False
 
+    async def _receive_bytes(self, websocket: WebSocket) -> bytes:
+        message = await websocket.receive()
+        if message['type'] == 'websocket.disconnect':
+            raise WebSocketDisconnect(message.get('code', 1000), message.get('reason', None))
+        if (data := message.get('bytes', None)) is not None:
+            return data
+        return message['text'].encode('UTF-8')
+
 
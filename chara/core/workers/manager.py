@@ -3,15 +3,22 @@ import pickle
 
 from dataclasses import dataclass
 from multiprocessing import current_process
+from multiprocessing.connection import wait
 from typing import Any, Optional, Union, TYPE_CHECKING
 
 from psutil import Process as ProcessUtil
 
-from chara.core.bot.event import BotEvent
+from chara.core.bot.event import BotEvent, RawEvent
+from chara.core import hazard
+from chara.core.share import SharedRingBuffer, shared_event_ring, shared_rate_limit_table
 from chara.core.workers.plugin import PluginGroupProcess
-from chara.core.workers.worker import WorkerProcess
+from chara.core.workers.report import WorkerReport
+from chara.core.workers.sender import WorkerSender
+from chara.core.workers.subscription import Subscription
+from chara.core.workers.worker import EVENT_RING_NAME, RATE_LIMIT_TABLE_NAME, SIGNAL_RING, WorkerProcess
 from chara.core.hazard import CONTEXT_LOOP, IN_SUB_PROCESS
-from chara.onebot.events import Event
+from chara.log import logger
+from chara.onebot.events import Event, MetaEvent
 
 if TYPE_CHECKING:
     from chara.core.core import Core
@@ -19,6 +26,9 @@ if TYPE_CHECKING:
 
 CODE_RESTART: int = 100
 
+RATE_LIMIT_SNAPSHOT: str = 'ratelimit.snapshot'
+'''## 共享限流表快照文件名(位于数据目录)'''
+
 @dataclass(eq=False, repr=False, slots=True)
 class WorkerStatus:
     name: str
@@ -26,20 +36,30 @@ class WorkerStatus:
     pid: Optional[int]
     cpu: Optional[float]
     mem: Optional[float]
+    queue: Optional[dict[str, Any]] = None
+    stats: Optional[dict[str, Any]] = None
 
     def json(self) -> dict[str, Any]:
-        return {'name': self.name, 'alive': self.alive, 'pid': self.pid, 'cpu': self.cpu, 'mem': self.mem}
+        return {'name': self.name, 'alive': self.alive, 'pid': self.pid, 'cpu': self.cpu, 'mem': self.mem, 'queue': self.queue, 'stats': self.stats}
 
 
 class Worker:
     
-    __slots__ = ('process', 'psutil')
+    __slots__ = ('process', 'psutil', 'sender', 'subscription', 'report')
     
     process: WorkerProcess
     psutil: ProcessUtil
+    sender: Optional[WorkerSender]
+    subscription: Optional[Subscription]
+    '''## 子进程发送的事件订阅, `None`时接收所有事件'''
+    report: Optional[WorkerReport]
+    '''## 子进程最近一次发送的运行统计'''
     
     def __init__(self, process: WorkerProcess) -> None:
         self.process = process
+        self.sender = None
+        self.subscription = None
+        self.report = None
 
     @property
     def pid(self) -> Optional[int]:
@@ -51,17 +71,53 @@ class Worker:
             return True
         return self.process.is_alive()
     
-    def _start(self) -> None:
+    def accepts(self, event_type: Optional[type[Event]], group_id: Optional[int] = None, user_id: Optional[int] = None) -> bool:
+        '''
+        ## 子进程是否需要该事件
+        '''
+        if self.subscription is None or event_type is None:
+            return True
+        return self.subscription.match(event_type, group_id, user_id)
+    
+    def _start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.subscription = None
+        self.report = None
         try:
             self.process.start()
         except:
             process = self.process.new()
+            process.ring_slot = self.process.ring_slot
             del self.process
             self.process = process
             self.process.start()
         self.psutil = ProcessUtil(self.process.pid)
+        if self.process.use_pipes:
+            # 在等待子进程结束的同时接收子进程发送的数据
+            sentinel = self.process.sentinel
+            pipe = self.process.pipe_send
+            while True:
+                ready = wait([sentinel, pipe])
+                if pipe in ready:
+                    try:
+                        data = pipe.recv_bytes()
+                    except (EOFError, OSError):
+                        break
+                    loop.call_soon_threadsafe(self._receive, data)
+                elif sentinel in ready:
+                    break
         self.process.join()
     
+    def _receive(self, data: bytes) -> None:
+        try:
+            message = pickle.loads(data)
+        except:
+            logger.exception(f'无法解析子进程[{self.process.name}]发送的数据.')
+            return
+        if isinstance(message, Subscription):
+            self.subscription = message
+        elif isinstance(message, WorkerReport):
+            self.report = message
+    
     async def start(self) -> None:
         '''
         ## 启动Worker进程
@@ -70,7 +126,7 @@ class Worker:
         if self.is_alive:
             return
         assert not IN_SUB_PROCESS
-        await asyncio.to_thread(self._start)
+        await asyncio.to_thread(self._start, CONTEXT_LOOP.get())
         if self.process.exitcode == CODE_RESTART:
             LOOP = CONTEXT_LOOP.get()
             LOOP.create_task(self.start())
@@ -101,13 +157,16 @@ class Worker:
             mem = round(self.psutil.memory_info().vms / 1024 /1024, 2)
         else:
             pid = cpu = mem = None
-        return WorkerStatus(self.process.name, self.is_alive, pid, cpu, mem)
+        queue = self.sender.json() if self.sender else None
+        stats = self.report.stats if self.report else None
+        return WorkerStatus(self.process.name, self.is_alive, pid, cpu, mem, queue, stats)
 
 
 class WorkerManager:
     
-    __slots__ = ('core', 'current_process', 'psutil', 'workers')
+    __slots__ = ('core', 'current_process', 'psutil', 'ring', 'workers')
     
+    ring: Optional[SharedRingBuffer]
     workers: dict[str, Worker]
     
     def __init__(self, core: 'Core') -> None:
@@ -116,6 +175,21 @@ class WorkerManager:
         self.psutil = ProcessUtil(self.current_process.pid)
         self.workers = dict()
         
+        dispatch_config = self.core.config.dispatch
+        if dispatch_config.transport == 'ring':
+            self.ring = shared_event_ring(EVENT_RING_NAME, dispatch_config.ring_size)
+        else:
+            self.ring = None
+        
+        # 需在创建子进程对象前创建
+        ratelimit_config = self.core.config.ratelimit
+        hazard.SHARED_RATE_LIMIT = shared_rate_limit_table(RATE_LIMIT_TABLE_NAME, ratelimit_config.capacity, ratelimit_config.depth)
+        if (snapshot := self.core.config.data.directory / RATE_LIMIT_SNAPSHOT).exists():
+            try:
+                hazard.SHARED_RATE_LIMIT.load(snapshot)
+            except:
+                logger.exception('共享限流表快照读取失败.')
+        
         for group in self.core.config.plugins:
             self.add(PluginGroupProcess(group, self.core.config, group.group_name))
     
@@ -144,7 +218,12 @@ class WorkerManager:
     def add(self, process: WorkerProcess) -> None:
         name = process.name
         assert name not in self.workers, f'{name} 名称已存在.'
-        self.workers[name] = Worker(process)
+        worker = Worker(process)
+        if process.use_pipes:
+            config = self.core.config.dispatch
+            process.ring_slot = sum(1 for other in self.workers.values() if other.sender)
+            worker.sender = WorkerSender(worker, config.queue_size, config.overflow)
+        self.workers[name] = worker
 
     async def start_all(self) -> None:
         LOOP = CONTEXT_LOOP.get()
@@ -155,8 +234,43 @@ class WorkerManager:
         LOOP = CONTEXT_LOOP.get()
         for worker in self.workers.values():
             LOOP.create_task(worker.close())
+            if worker.sender:
+                worker.sender.close()
 
-    async def dispatch(self, event: Union[BotEvent, Event]) -> None:
-        event_bytes = pickle.dumps(event)
-        for worker in self.workers.values():
-            worker.process.pipe_send.send_bytes(event_bytes)
+    async def dispatch(self, event: Union[BotEvent, Event, RawEvent]) -> None:
+        if isinstance(event, BotEvent):
+            targets = [(worker.process.ring_slot, sender) for worker in self.workers.values() if (sender := worker.sender)]
+        else:
+            if isinstance(event, RawEvent):
+                event_type, group_id, user_id = event.event_type, event.group_id, event.user_id
+            else:
+                event_type, group_id, user_id = type(event), getattr(event, 'group_id', None), getattr(event, 'user_id', None)
+            targets = [(worker.process.ring_slot, sender) for worker in self.workers.values() if (sender := worker.sender) and worker.accepts(event_type, group_id, user_id)]
+        # 没有子进程需要该事件时不进行序列化
+        if not targets:
+            return
+        
+        if isinstance(event, RawEvent):
+            event_bytes = event.data
+            meta = event.is_meta
+        else:
+            event_bytes = pickle.dumps(event)
+            meta = isinstance(event, MetaEvent)
+        coalesce = False
+        # Bot事件数量极少且重启后的子进程需要收到, 始终通过管道发送
+        if self.ring is not None and not isinstance(event, BotEvent):
+            # 记录带有订阅掩码, 子进程跳过未订阅的记录
+            mask = 0
+            for slot, _ in targets:
+                mask |= 1 << slot
+            size = (mask.bit_length() + 7) // 8
+            record = size.to_bytes() + mask.to_bytes(size) + event_bytes
+            if len(record) + 4 <= self.ring.capacity:
+                self.ring.write(record)
+                # 控制帧携带写入后的位置, 子进程读取到该位置为止, 不会越过排在其后的管道数据
+                event_bytes = SIGNAL_RING + self.ring.cursor.to_bytes(8)
+                meta = False
+                coalesce = True
+        # 放入队列从不等待, 单个子进程阻塞不会推迟事件接收与其他子进程收到事件
+        for _, sender in targets:
+            sender.put_nowait(event_bytes, meta, coalesce)
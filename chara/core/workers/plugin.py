@@ -1,46 +1,113 @@
+import asyncio
+import pickle
+
 from multiprocessing.connection import _ConnectionBase as Connection # type: ignore
 from typing import Optional, Union
 
 from chara.config import GlobalConfig, PluginGroupConfig
 from chara.core.workers.worker import WorkerProcess
 from chara.core.bot import Bot
-from chara.core.bot.event import BotEvent, BotConnectedEvent, BotDisConnectedEvent
-from chara.core.hazard import BOTS, CONTEXT_CURRENT_PLUGIN_GROUP_CONFIG, CONTEXT_LOOP, PLUGINS
+from chara.core.bot.event import BotEvent, BotConnectedEvent, BotDisConnectedEvent, get_event, get_event_class, is_raw_event
+from chara.core.hazard import BOTS, CONTEXT_CURRENT_PLUGIN_GROUP_CONFIG, CONTEXT_EVENT_CACHE, CONTEXT_LOOP, PLUGINS, WORKER_STATS
 from chara.core.plugin.load import load_plugins
+from chara.core.plugin.scheduler import TriggerScheduler
+from chara.core.plugin.session import SESSIONS
+from chara.lib import codec
+from chara.log import logger
+from chara.core.workers.report import REPORT_INTERVAL, WorkerReport
+from chara.core.workers.subscription import Subscription
 from chara.onebot.events import Event
 
 
 class PluginGroupProcess(WorkerProcess):
     
-    def __init__(self, config: PluginGroupConfig, global_config: GlobalConfig, name: str, pipes: Optional[tuple[Connection, Connection]] = None) -> None:
+    def __init__(self, config: PluginGroupConfig, global_config: GlobalConfig, name: str, pipes: Optional[tuple[Connection, Connection]] = None, signals: Optional[tuple[Connection, Connection]] = None) -> None:
         self.config = config
-        super().__init__(global_config, name, pipes, True)
+        self._subscription: Optional[Subscription] = None
+        self._subscription_pending = False
+        self._report_task: Optional[asyncio.Task[None]] = None
+        self.scheduler = TriggerScheduler()
+        super().__init__(global_config, name, pipes, True, signals)
+    
+    def update_subscription(self) -> None:
+        self.scheduler.invalidate()
+        if self._subscription_pending:
+            return
+        self._subscription_pending = True
+        LOOP = CONTEXT_LOOP.get()
+        LOOP.call_soon(self.publish_subscription)
+    
+    def publish_subscription(self) -> None:
+        '''
+        ## 将当前可触发的事件范围发送至主进程
+        '''
+        self._subscription_pending = False
+        subscription = Subscription([entry for plugin in PLUGINS.values() for trigger in plugin.triggers if trigger.alive for entry in trigger.subscribe()] + list(SESSIONS.subscribe()))
+        if subscription == self._subscription:
+            return
+        self._subscription = subscription
+        # 管道为双工管道, 子进程一端同样可以发送
+        self.pipe_recv.send_bytes(pickle.dumps(subscription))
     
-    async def tick(self) -> None:
+    async def report(self) -> None:
+        '''
+        ## 定期将运行统计发送至主进程
+        '''
         while True:
-            if not self.pipe_recv.poll():
-                break
-            
-            event: Union[BotEvent, Event] = self.pipe_recv.recv()
-            bot = BOTS[event.self_id]
+            await asyncio.sleep(REPORT_INTERVAL)
+            stats = dict()
+            for name, func in WORKER_STATS.items():
+                try:
+                    stats[name] = func()
+                except:
+                    logger.exception(f'生成统计[{name}]时出错.')
+            self.pipe_recv.send_bytes(pickle.dumps(WorkerReport(stats)))
+    
+    def receive(self, data: bytes) -> None:
+        if is_raw_event(data):
+            self.receive_raw(data)
+            return
+        
+        event: Union[BotEvent, Event] = pickle.loads(data)
+        bot = BOTS[event.self_id]
 
-            LOOP = CONTEXT_LOOP.get()
-            if isinstance(event, Event):
-                for plugin in PLUGINS.values():
-                    LOOP.create_task(plugin.handle_event(bot, event))
-                continue
-            
-            if isinstance(event, BotConnectedEvent):
-                bot.connected = True
-                for plugin in PLUGINS.values():
-                    LOOP.create_task(plugin.tm.handle_on_bot_connect(bot))
-            
-            elif isinstance(event, BotDisConnectedEvent):
-                bot.connected = False
-                for plugin in PLUGINS.values():
-                    LOOP.create_task(plugin.tm.handle_on_bot_disconnect(bot))
+        LOOP = CONTEXT_LOOP.get()
+        if isinstance(event, Event):
+            # 任务创建时复制当前上下文, 同一事件的任务共用一个缓存
+            CONTEXT_EVENT_CACHE.set(dict())
+            LOOP.create_task(self.scheduler.handle_event(bot, event))
+            return
+        
+        if isinstance(event, BotConnectedEvent):
+            bot.connected = True
+            for plugin in PLUGINS.values():
+                LOOP.create_task(plugin.tm.handle_on_bot_connect(bot))
+        
+        elif isinstance(event, BotDisConnectedEvent):
+            bot.connected = False
+            for plugin in PLUGINS.values():
+                LOOP.create_task(plugin.tm.handle_on_bot_disconnect(bot))
+    
+    def receive_raw(self, data: bytes) -> None:
+        json_data = codec.loads(data)
+        if (event_class := get_event_class(json_data)) is None:
+            return
+        # 没有可能被该事件触发的触发器与会话时不构建事件
+        if not self.scheduler.triggers_for(event_class) and not (len(SESSIONS) and SESSIONS.wants(event_class, json_data.get('self_id', 0), json_data.get('group_id', None), json_data.get('user_id', None))):
+            return
+        
+        if (event := get_event(json_data, self.global_config.dispatch.compact_events)) is None:
+            return
+        bot = BOTS[event.self_id]
+        
+        LOOP = CONTEXT_LOOP.get()
+        CONTEXT_EVENT_CACHE.set(dict())
+        LOOP.create_task(self.scheduler.handle_event(bot, event))
     
     async def shutdown(self) -> None:
+        if self._report_task is not None:
+            self._report_task.cancel()
+            self._report_task = None
         LOOP = CONTEXT_LOOP.get()
         for plugin in PLUGINS.values():
             LOOP.create_task(plugin.tm.handle_on_shutdown())
@@ -55,9 +122,11 @@ class PluginGroupProcess(WorkerProcess):
         
         # plugin
         load_plugins()
+        self.publish_subscription()
         for plugin in PLUGINS.values():
             LOOP.create_task(plugin.tm.handle_on_load())
+        self._report_task = LOOP.create_task(self.report())
     
     def new(self) -> 'PluginGroupProcess':
-        return PluginGroupProcess(self.config, self.global_config, self.name, (self.pipe_recv, self.pipe_send))
+        return PluginGroupProcess(self.config, self.global_config, self.name, (self.pipe_recv, self.pipe_send), (self.signal_recv, self.signal_send))
 
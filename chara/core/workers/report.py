@@ -0,0 +1,33 @@
+from typing import Any
+
+
+REPORT_INTERVAL: float = 5
+'''## 子进程发送统计的间隔(s)'''
+
+
+class WorkerReport:
+    '''
+    ## 子进程运行统计
+
+    由子进程定期生成并发送至主进程, 供主进程的状态接口与web-ui展示
+    '''
+
+    __slots__ = ('stats', )
+
+    stats: dict[str, Any]
+    '''## 统计名称 -> 统计数据'''
+
+    def __init__(self, stats: dict[str, Any]) -> None:
+        self.stats = stats
+
+    def __getstate__(self) -> dict[str, Any]:
+        return self.stats
+
+    def __setstate__(self, state: dict[str, Any]) -> None:
+        self.stats = state
+
+
+__all__ = [
+    'REPORT_INTERVAL',
+    'WorkerReport',
+]
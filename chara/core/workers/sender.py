@@ -0,0 +1,164 @@
+import asyncio
+import threading
+
+from collections import deque
+from queue import SimpleQueue
+from typing import Any, Literal, Optional, TYPE_CHECKING
+
+from chara.core.hazard import CONTEXT_LOOP
+from chara.log import logger
+
+if TYPE_CHECKING:
+    from chara.core.workers.manager import Worker
+
+
+OverflowPolicy = Literal['block', 'drop_oldest', 'drop_meta']
+
+
+class WorkerSender:
+    '''
+    ## 子进程事件发送队列
+
+    每个子进程拥有独立的队列与写入线程, 放入队列从不等待, 管道阻塞时不会阻塞事件循环或影响其他子进程
+
+    队列长度达到`maxsize`后按`overflow`处理:
+    - block: 不丢弃事件, 队列继续增长, 仅该子进程的写入线程等待管道
+    - drop_oldest: 丢弃队列中最早的事件
+    - drop_meta: 优先丢弃元事件, 没有可丢弃的元事件时与`block`相同
+    '''
+
+    __slots__ = ('worker', 'maxsize', 'overflow', 'queue', 'inflight', 'sent', 'dropped', 'max_depth', '_batches', '_not_empty', '_task', '_thread')
+
+    worker: 'Worker'
+    maxsize: int
+    overflow: OverflowPolicy
+    queue: deque[tuple[bytes, bool, bool]]
+    '''## (数据, 是否为元事件, 是否可合并)'''
+    inflight: int
+    '''## 已交给写入线程但尚未写入管道的数量'''
+    sent: int
+    dropped: int
+    max_depth: int
+
+    def __init__(self, worker: 'Worker', maxsize: int, overflow: OverflowPolicy = 'drop_oldest') -> None:
+        self.worker = worker
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.queue = deque()
+        self.inflight = 0
+        self.sent = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._batches: SimpleQueue[Optional[tuple[list[bytes], asyncio.AbstractEventLoop, asyncio.Future[None]]]] = SimpleQueue()
+        self._not_empty = asyncio.Event()
+        self._task: Optional[asyncio.Task[None]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def depth(self) -> int:
+        return len(self.queue)
+
+    def put_nowait(self, data: bytes, meta: bool = False, coalesce: bool = False) -> bool:
+        '''
+        ## 将数据放入队列, 返回是否放入
+
+        `coalesce`为`True`时若队尾也是可合并的数据则以新数据替换队尾
+        '''
+        self._ensure_writer()
+        if coalesce and self.queue and self.queue[-1][2]:
+            self.queue[-1] = (data, meta, coalesce)
+            return True
+        if len(self.queue) >= self.maxsize:
+            if self.overflow == 'drop_oldest':
+                self.queue.popleft()
+                self.dropped += 1
+            elif self.overflow == 'drop_meta':
+                if meta:
+                    self.dropped += 1
+                    return False
+                self._drop_meta()
+
+        self.queue.append((data, meta, coalesce))
+        if (depth := len(self.queue)) > self.max_depth:
+            self.max_depth = depth
+        self._not_empty.set()
+        return True
+
+    def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._thread is not None:
+            self._batches.put(None)
+            self._thread = None
+
+    def json(self) -> dict[str, Any]:
+        return {'depth': self.depth, 'inflight': self.inflight, 'max_depth': self.max_depth, 'sent': self.sent, 'dropped': self.dropped}
+
+    def _drop_meta(self) -> bool:
+        for index, (_, meta, _) in enumerate(self.queue):
+            if meta:
+                del self.queue[index]
+                self.dropped += 1
+                return True
+        return False
+
+    def _ensure_writer(self) -> None:
+        if self._task is not None:
+            return
+        LOOP = CONTEXT_LOOP.get()
+        self._thread = threading.Thread(target=self._write_thread, name=f'{self.worker.process.name}-sender', daemon=True)
+        self._thread.start()
+        self._task = LOOP.create_task(self._writer())
+
+    async def _writer(self) -> None:
+        LOOP = CONTEXT_LOOP.get()
+        while True:
+            await self._not_empty.wait()
+            batch = [data for data, _, _ in self.queue]
+            self.queue.clear()
+            self._not_empty.clear()
+
+            self.inflight = len(batch)
+            future: asyncio.Future[None] = LOOP.create_future()
+            self._batches.put((batch, LOOP, future))
+            try:
+                await future
+                self.sent += len(batch)
+            except asyncio.CancelledError:
+                raise
+            except:
+                self.dropped += len(batch)
+                logger.exception(f'向子进程[{self.worker.process.name}]发送事件失败.')
+            finally:
+                self.inflight = 0
+
+    def _write_thread(self) -> None:
+        while (item := self._batches.get()) is not None:
+            batch, loop, future = item
+            error: Optional[BaseException] = None
+            try:
+                pipe = self.worker.process.pipe_send
+                for data in batch:
+                    pipe.send_bytes(data)
+            except BaseException as e:
+                error = e
+            try:
+                loop.call_soon_threadsafe(_set_future, future, error)
+            except RuntimeError:
+                # 事件循环已关闭
+                return
+
+
+def _set_future(future: asyncio.Future[None], error: Optional[BaseException]) -> None:
+    if future.done():
+        return
+    if error is None:
+        future.set_result(None)
+    else:
+        future.set_exception(error)
+
+
+__all__ = [
+    'WorkerSender',
+]
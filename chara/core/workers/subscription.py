@@ -0,0 +1,70 @@
+from typing import Iterable, Optional, Type
+
+from chara.onebot.events import Event
+
+
+SubscriptionEntry = tuple[Type[Event], Optional[int], Optional[int]]
+'''## (事件类型, 群号, QQ号), `None`表示不限'''
+
+
+class Subscription:
+    '''
+    ## 子进程事件订阅
+
+    由子进程根据已导入的触发器生成并发送至主进程, 主进程据此跳过不需要该事件的子进程
+    '''
+
+    __slots__ = ('entries', '_cache')
+
+    entries: frozenset[SubscriptionEntry]
+    _cache: dict[Type[Event], Optional[list[tuple[Optional[int], Optional[int]]]]]
+
+    def __init__(self, entries: Iterable[SubscriptionEntry] = ()) -> None:
+        self.entries = frozenset(entries)
+        self._cache = dict()
+
+    def __getstate__(self) -> frozenset[SubscriptionEntry]:
+        return self.entries
+
+    def __setstate__(self, state: frozenset[SubscriptionEntry]) -> None:
+        self.entries = state
+        self._cache = dict()
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Subscription) and self.entries == other.entries
+
+    def __hash__(self) -> int:
+        return hash(self.entries)
+
+    def match(self, event_type: Type[Event], group_id: Optional[int] = None, user_id: Optional[int] = None) -> bool:
+        '''
+        ## 是否订阅了该事件
+        '''
+        if event_type in self._cache:
+            scopes = self._cache[event_type]
+        else:
+            scopes = self._cache[event_type] = self._scopes(event_type)
+
+        if scopes is None:
+            return True
+        for gid, uid in scopes:
+            if (gid is None or gid == group_id) and (uid is None or uid == user_id):
+                return True
+        return False
+
+    def _scopes(self, event_type: Type[Event]) -> Optional[list[tuple[Optional[int], Optional[int]]]]:
+        # 返回`None`表示不限群号与QQ号
+        scopes: list[tuple[Optional[int], Optional[int]]] = list()
+        for subscribed, gid, uid in self.entries:
+            if not issubclass(event_type, subscribed):
+                continue
+            if gid is None and uid is None:
+                return None
+            scopes.append((gid, uid))
+        return scopes
+
+
+__all__ = [
+    'Subscription',
+    'SubscriptionEntry',
+]
@@ -1,30 +1,55 @@
 import asyncio
+import contextvars
 import signal
 import sys
+import threading
 
 from multiprocessing import Process
 from multiprocessing.connection import Pipe
 from multiprocessing.connection import _ConnectionBase as Connection # type: ignore
-from typing import Any, Optional
+from typing import Any, Callable, Optional
 
 from chara.config import GlobalConfig
-from chara.core.share import shared_should_exit
+from chara.core.share import SharedRingBuffer, shared_event_ring, shared_should_exit
+
+
+SIGNAL_EXIT: bytes = b'chara.signal.exit'
+'''## 唤醒子进程检查`should_exit`的控制帧'''
+
+SIGNAL_RING: bytes = b'chara.signal.ring'
+'''## 通知子进程读取环形缓冲区的控制帧, 其后为8字节的读取截止位置'''
+
+EVENT_RING_NAME: str = 'chara_event_ring'
+
+RATE_LIMIT_TABLE_NAME: str = 'chara_rate_limit'
 
 
 class WorkerProcess(Process):
     _start_method = 'spawn'
     
-    def __init__(self, global_config: GlobalConfig, name: str, pipes: Optional[tuple[Connection, Connection]] = None, use_pipes: bool = True) -> None:
+    def __init__(self, global_config: GlobalConfig, name: str, pipes: Optional[tuple[Connection, Connection]] = None, use_pipes: bool = True, signals: Optional[tuple[Connection, Connection]] = None) -> None:
+        from chara.core.hazard import SHARED_RATE_LIMIT
+        
         super().__init__(name=name)
         
         self.global_config = global_config
+        # 随进程对象传递至子进程, 子进程中重新连接共享内存
+        self.rate_limit = SHARED_RATE_LIMIT
         self._exitcode = 0
         self.use_pipes = use_pipes
+        self.ring: Optional[SharedRingBuffer] = None
+        self.ring_slot = -1
+        '''## 在环形缓冲区记录的订阅掩码中的位置, 由主进程分配'''
         if self.use_pipes:
             if pipes is None:
                 pipes = Pipe()
             self.pipe_recv = pipes[0]
             self.pipe_send = pipes[1]
+        # 控制管道仅传输控制帧, 不会因事件堆积而阻塞
+        if signals is None:
+            signals = Pipe(False)
+        self.signal_recv = signals[0]
+        self.signal_send = signals[1]
 
     @property
     def should_exit(self) -> bool:
@@ -32,7 +57,12 @@ class WorkerProcess(Process):
 
     @should_exit.setter
     def should_exit(self, value: bool) -> None:
+        from chara.core import hazard
+
         self._sv_should_exit.write(value)
+        # 唤醒子进程, 真实状态仍以共享内存为准; 子进程已退出时无人读取, 不再写入
+        if value and (hazard.IN_SUB_PROCESS or self.is_alive()):
+            self.signal_send.send_bytes(SIGNAL_EXIT)
 
     async def _main(self) -> None:
         from chara.core.hazard import CONTEXT_LOOP
@@ -53,9 +83,92 @@ class WorkerProcess(Process):
         await self.shutdown()
         
     async def main(self) -> None:
-        while not self.should_exit:
-            await self.tick()
-            await asyncio.sleep(0.2)
+        from chara.core.hazard import CONTEXT_LOOP
+        
+        LOOP = CONTEXT_LOOP.get()
+        # 读取线程的上下文为空, 回调需在事件循环的上下文中执行
+        context = contextvars.copy_context()
+        waiter: asyncio.Future[None] = LOOP.create_future()
+        
+        def on_exit() -> None:
+            if not waiter.done():
+                waiter.set_result(None)
+        
+        def on_signal(data: bytes) -> None:
+            # 重启前残留的控制帧会因共享内存中的值已被重置而被忽略
+            if data == SIGNAL_EXIT and self.should_exit:
+                on_exit()
+        
+        readers: list[int] = list()
+        connections: list[tuple[Connection, Callable[[bytes], None]]] = [(self.signal_recv, on_signal)]
+        if self.use_pipes:
+            connections.append((self.pipe_recv, self._receive))
+        
+        for conn, callback in connections:
+            try:
+                LOOP.add_reader(conn.fileno(), self._on_readable, conn, callback, on_exit)
+                readers.append(conn.fileno())
+            except NotImplementedError:
+                # ProactorEventLoop(Windows)不支持add_reader, 改由线程阻塞读取
+                threading.Thread(target=self._reader_thread, args=(LOOP, conn, callback, on_exit, context), name=f'{self.name}-reader', daemon=True).start()
+        
+        try:
+            if self.use_pipes:
+                await waiter
+            else:
+                while not waiter.done():
+                    await self.tick()
+                    await asyncio.wait([waiter], timeout=0.2)
+        finally:
+            for fd in readers:
+                LOOP.remove_reader(fd)
+    
+    def _on_readable(self, conn: Connection, callback: Callable[[bytes], None], on_exit: Callable[[], None]) -> None:
+        try:
+            while conn.poll():
+                callback(conn.recv_bytes())
+        except (EOFError, OSError):
+            on_exit()
+    
+    def _reader_thread(self, loop: asyncio.AbstractEventLoop, conn: Connection, callback: Callable[[bytes], None], on_exit: Callable[[], None], context: contextvars.Context) -> None:
+        while True:
+            try:
+                data = conn.recv_bytes()
+            except (EOFError, OSError):
+                loop.call_soon_threadsafe(on_exit, context=context)
+                return
+            loop.call_soon_threadsafe(callback, data, context=context)
+    
+    def _receive(self, data: bytes) -> None:
+        if len(data) == len(SIGNAL_RING) + 8 and data.startswith(SIGNAL_RING):
+            if self.ring is None:
+                return
+            lost = self.ring.lost
+            # 只读取到控制帧对应的位置, 与管道中的其他数据保持先后顺序
+            for record in self.ring.read(int.from_bytes(data[len(SIGNAL_RING):])):
+                # [0] 掩码长度 [1:1+n] 订阅掩码 [1+n:] 事件数据
+                size = record[0]
+                if int.from_bytes(record[1:1 + size]) >> self.ring_slot & 1:
+                    self.receive(record[1 + size:])
+            if self.ring.lost != lost:
+                from chara.log import logger
+                logger.warning(f'子进程[{self.name}]读取事件过慢, 部分事件已被覆盖.')
+            return
+        self.receive(data)
+    
+    def receive(self, data: bytes) -> None:
+        '''
+        ## 处理从管道接收到的数据
+        
+        数据到达时立即在事件循环中调用
+        '''
+        pass
+    
+    def update_subscription(self) -> None:
+        '''
+        ## 可触发的事件范围发生变化时调用
+        '''
+        pass
     
     async def tick(self) -> None:
         pass
@@ -82,8 +195,11 @@ class WorkerProcess(Process):
         hazard.IN_SUB_PROCESS = True
         hazard.CONTEXT_GLOBAL_CONFIG.set(self.global_config)
         hazard.CONTEXT_CURRENT_WORKER.set(Worker(self))
+        hazard.SHARED_RATE_LIMIT = self.rate_limit
 
         self._sv_should_exit = shared_should_exit(self.name)
+        if self.use_pipes and self.global_config.dispatch.transport == 'ring':
+            self.ring = shared_event_ring(EVENT_RING_NAME, self.global_config.dispatch.ring_size)
         logger.set_level(self.global_config.log.level)
         logger.success(C256.f_7bbfea('子进程启动') + colorize.pid(str(self.pid)) + '.')
         self.set_exitcode()
@@ -99,9 +215,10 @@ class WorkerProcess(Process):
         sys.exit(self._exitcode)
     
     def new(self) -> 'WorkerProcess':
+        signals = (self.signal_recv, self.signal_send)
         if self.use_pipes:
-            return WorkerProcess(self.global_config, self.name, (self.pipe_recv, self.pipe_send))
-        return WorkerProcess(self.global_config, self.name, None, False)
+            return WorkerProcess(self.global_config, self.name, (self.pipe_recv, self.pipe_send), True, signals)
+        return WorkerProcess(self.global_config, self.name, None, False, signals)
 
 
 __all__ = [
@@ -0,0 +1,181 @@
+'''
+## Aho-Corasick 多关键词匹配
+
+一次扫描文本即可找出所有出现的关键词, 耗时与关键词数量无关
+'''
+from collections import deque
+from typing import Iterable, Iterator, Optional
+
+
+class AhoCorasick:
+    '''
+    ## Aho-Corasick 自动机
+
+    增删关键词时仅修改字典树, 失配指针在下一次匹配前统一重新生成, 连续增删只生成一次
+
+    删除关键词时移除不再被其他关键词使用的节点, 节点在之后添加关键词时复用
+
+    ---
+    ### 参数
+    - keywords: 初始关键词
+    - ignore_case: 是否忽略大小写
+    '''
+
+    __slots__ = ('ignore_case', '_goto', '_fail', '_keyword', '_output', '_parent', '_char', '_free', '_keywords', '_dirty')
+
+    ignore_case: bool
+
+    def __init__(self, keywords: Iterable[str] = (), ignore_case: bool = False) -> None:
+        self.ignore_case = ignore_case
+        # 状态0为根节点
+        self._goto: list[dict[str, int]] = [dict()]
+        self._fail: list[int] = [0]
+        self._keyword: list[Optional[str]] = [None]
+        '''## 在该状态结束的关键词'''
+        self._output: list[tuple[str, ...]] = [()]
+        '''## 在该状态结束的所有关键词(含失配链上的关键词)'''
+        self._parent: list[int] = [0]
+        self._char: list[str] = ['']
+        '''## 由父状态转移至该状态的字符'''
+        self._free: list[int] = list()
+        '''## 已移除可复用的状态'''
+        self._keywords: dict[str, int] = dict()
+        '''## 关键词 -> 结束状态'''
+        self._dirty = False
+        for keyword in keywords:
+            self.add(keyword)
+
+    def __len__(self) -> int:
+        return len(self._keywords)
+
+    def __contains__(self, keyword: str) -> bool:
+        return self._normalize(keyword) in self._keywords
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._keywords)
+
+    def _normalize(self, text: str) -> str:
+        return text.lower() if self.ignore_case else text
+
+    def add(self, keyword: str) -> bool:
+        '''
+        ## 添加关键词
+
+        关键词已存在或为空字符串时返回`False`
+        '''
+        keyword = self._normalize(keyword)
+        if not keyword or keyword in self._keywords:
+            return False
+        goto = self._goto
+        state = 0
+        for char in keyword:
+            if (next_state := goto[state].get(char, None)) is None:
+                next_state = self._new_state(state, char)
+                goto[state][char] = next_state
+            state = next_state
+        self._keyword[state] = keyword
+        self._keywords[keyword] = state
+        self._dirty = True
+        return True
+
+    def remove(self, keyword: str) -> bool:
+        '''
+        ## 删除关键词
+
+        关键词不存在时返回`False`
+        '''
+        keyword = self._normalize(keyword)
+        if (state := self._keywords.pop(keyword, None)) is None:
+            return False
+        self._keyword[state] = None
+        # 自末端向上移除不再是其他关键词前缀的节点
+        goto = self._goto
+        while state and self._keyword[state] is None and not goto[state]:
+            parent = self._parent[state]
+            del goto[parent][self._char[state]]
+            self._output[state] = ()
+            self._free.append(state)
+            state = parent
+        self._dirty = True
+        return True
+
+    def _new_state(self, parent: int, char: str) -> int:
+        if self._free:
+            state = self._free.pop()
+            self._parent[state] = parent
+            self._char[state] = char
+            self._fail[state] = 0
+            return state
+        self._goto.append(dict())
+        self._fail.append(0)
+        self._keyword.append(None)
+        self._output.append(())
+        self._parent.append(parent)
+        self._char.append(char)
+        return len(self._goto) - 1
+
+    def update(self, keywords: Iterable[str]) -> None:
+        '''
+        ## 批量添加关键词
+        '''
+        for keyword in keywords:
+            self.add(keyword)
+
+    def _build(self) -> None:
+        goto, fail, keyword, output = self._goto, self._fail, self._keyword, self._output
+        queue: deque[int] = deque()
+        for state in goto[0].values():
+            fail[state] = 0
+            output[state] = (keyword[state], ) if keyword[state] is not None else () # type: ignore
+            queue.append(state)
+        # 按广度优先顺序生成失配指针, 失配状态的输出总是先于当前状态生成
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                inherited = output[fail[next_state]]
+                output[next_state] = (keyword[next_state], *inherited) if keyword[next_state] is not None else inherited # type: ignore
+        self._dirty = False
+
+    def iter(self, text: str) -> Iterator[tuple[int, str]]:
+        '''
+        ## 依次产生所有出现的`(起始位置, 关键词)`
+
+        同一位置结束的关键词按长度从长到短排列
+        '''
+        if self._dirty:
+            self._build()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for index, char in enumerate(self._normalize(text)):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if matched := output[state]:
+                for keyword in matched:
+                    yield index - len(keyword) + 1, keyword
+
+    def search(self, text: str) -> list[tuple[int, str]]:
+        '''
+        ## 查找所有出现的`(起始位置, 关键词)`
+
+        忽略大小写时位置对应转换为小写后的文本
+        '''
+        return list(self.iter(text))
+
+    def contains_any(self, text: str) -> bool:
+        '''
+        ## 文本中是否出现任意关键词
+        '''
+        for _ in self.iter(text):
+            return True
+        return False
+
+
+__all__ = [
+    'AhoCorasick',
+]
@@ -0,0 +1,73 @@
+'''
+## JSON编解码
+
+安装`orjson`时使用`orjson`, 否则使用标准库`json`
+'''
+import json
+
+from typing import Any, Union
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+BACKEND: str = 'orjson' if orjson is not None else 'json'
+'''## 当前使用的JSON后端'''
+
+
+def _default(o: Any) -> Any:
+    # 仅在`Message`/`MessageSegment`未预先转换时调用, 消息段的字典在构建时已生成
+    from chara.onebot.message import Message, MessageSegment
+
+    if isinstance(o, Message):
+        return o.array
+    elif isinstance(o, MessageSegment):
+        return [o.dict]
+    raise TypeError(f'Object of type {type(o).__name__} is not JSON serializable')
+
+
+if orjson is not None:
+    _OPTION = orjson.OPT_NON_STR_KEYS
+    _OPTION_INDENT = _OPTION | orjson.OPT_INDENT_2
+
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        '''
+        ## 序列化为UTF-8编码的JSON
+
+        可直接序列化`Message`与`MessageSegment`
+        '''
+        return orjson.dumps(obj, _default, _OPTION_INDENT if indent else _OPTION)
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        '''
+        ## 反序列化JSON
+        '''
+        return orjson.loads(data)
+
+else:
+    def dumps(obj: Any, indent: bool = False) -> bytes:
+        '''
+        ## 序列化为UTF-8编码的JSON
+
+        可直接序列化`Message`与`MessageSegment`
+        '''
+        if indent:
+            return json.dumps(obj, ensure_ascii=False, default=_default, indent=2).encode('UTF-8')
+        return json.dumps(obj, ensure_ascii=False, default=_default, separators=(',', ':')).encode('UTF-8')
+
+    def loads(data: Union[bytes, bytearray, memoryview, str]) -> Any:
+        '''
+        ## 反序列化JSON
+        '''
+        if isinstance(data, memoryview):
+            data = data.tobytes()
+        return json.loads(data)
+
+
+__all__ = [
+    'BACKEND',
+    'dumps',
+    'loads',
+]
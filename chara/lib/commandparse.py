@@ -4,6 +4,24 @@ import shlex
 from dataclasses import dataclass
 from typing import Any, Callable, Optional, Type
 
+from chara.lib.prefilter import LiteralPrefilter, literal_pattern, literal_prefix, required_literals
+
+
+# shlex.split仅以以下字符分隔, 不含引号与转义符时可直接按空白分隔
+_SHLEX_WHITESPACE = re.compile('[ \t\r\n]+')
+_SHLEX_SPECIAL = frozenset('\'"\\')
+
+
+def split_command(command: str) -> list[str]:
+    '''
+    ## 分割命令
+
+    结果与`shlex.split`一致, 不含引号与转义符时不经过`shlex`
+    '''
+    if _SHLEX_SPECIAL.isdisjoint(command):
+        return [arg for arg in _SHLEX_WHITESPACE.split(command) if arg]
+    return shlex.split(command)
+
 
 @dataclass(repr=False, eq=False, frozen=True, slots=True)
 class FlagArgument:
@@ -52,11 +70,86 @@ class ParseResult:
     uncatch: list[str]
 
 
+_ROLE_NONE = 0
+_ROLE_FLAG = 1
+_ROLE_KEYWORD = 3
+
+
+class _ParsePlan:
+    '''
+    ## 解析计划
+
+    由`CommandParser.compile`生成, 参数添加后首次解析时自动生成
+    '''
+    __slots__ = ('roles', 'keywords', 'flag_defaults', 'kwarg_defaults', 'posargs', 'sub_exact', 'sub_scan', 'sub_parsers')
+
+    roles: dict[str, int]
+    '''## 参数 -> 标记参数/键值参数'''
+    keywords: dict[str, KeywordArgument]
+    flag_defaults: dict[str, bool]
+    kwarg_defaults: dict[str, Any]
+    posargs: tuple[PostionArgument, ...]
+    sub_exact: dict[str, tuple[int, 'CommandParser']]
+    '''## 完整匹配的子解析器: 字面量 -> (顺序, 子解析器)'''
+    sub_scan: tuple[tuple[int, Optional[str], re.Pattern[str], 'CommandParser'], ...]
+    '''## 其余子解析器: (顺序, 子串字面量, 正则表达式, 子解析器)'''
+    sub_parsers: tuple['CommandParser', ...]
+
+    def __init__(self, parser: 'CommandParser') -> None:
+        self.roles = dict()
+        self.keywords = dict()
+        for kwarg in parser.kwargs:
+            self.roles[kwarg.key] = _ROLE_KEYWORD
+            self.keywords[kwarg.key] = kwarg
+        # 与键值参数同名时作为标记参数
+        for flag in parser.flags:
+            self.roles[flag.name] = _ROLE_FLAG
+        self.flag_defaults = {flag.name: False for flag in parser.flags}
+        self.kwarg_defaults = {kwarg.name: kwarg.default for kwarg in parser.kwargs}
+        self.posargs = tuple(parser.posargs)
+
+        self.sub_parsers = tuple(parser.sub_parsers)
+        self.sub_exact = dict()
+        sub_scan: list[tuple[int, Optional[str], re.Pattern[str], 'CommandParser']] = list()
+        for order, sub_parser in enumerate(self.sub_parsers):
+            pattern = sub_parser.pattern
+            literal = literal_pattern(pattern)
+            if literal is not None and literal[1] and literal[2]:
+                self.sub_exact.setdefault(literal[0], (order, sub_parser))
+            elif literal is not None and not literal[1] and not literal[2]:
+                # 不含锚点时`re.search`等价于子串查找
+                sub_scan.append((order, literal[0], pattern, sub_parser))
+            else:
+                sub_scan.append((order, None, pattern, sub_parser))
+        self.sub_scan = tuple(sub_scan)
+
+    def find_sub_parser(self, command_start: str) -> Optional['CommandParser']:
+        '''
+        ## 按添加顺序查找第一个匹配的子解析器
+        '''
+        if command_start.endswith('\n'):
+            # `$`可匹配末尾的换行符, 无法使用完整匹配
+            for sub_parser in self.sub_parsers:
+                if sub_parser.pattern.search(command_start):
+                    return sub_parser
+            return None
+
+        exact = self.sub_exact.get(command_start, None)
+        for order, literal, pattern, sub_parser in self.sub_scan:
+            if exact is not None and order > exact[0]:
+                break
+            if literal in command_start if literal is not None else pattern.search(command_start):
+                return sub_parser
+        return exact[1] if exact is not None else None
+
+
 class CommandParser:
     '''
     ## 命令解析器
+
+    首次解析时生成解析计划, 之后添加参数或子解析器时重新生成
     '''
-    __slots__ = ('flags', 'kwargs', 'pattern', 'posargs', 'start', 'sub_parsers')
+    __slots__ = ('flags', 'kwargs', 'pattern', 'posargs', 'start', 'sub_parsers', '_plan')
     
     flags: list[FlagArgument]
     kwargs: list[KeywordArgument]
@@ -77,96 +170,220 @@ class CommandParser:
         self.kwargs = list()
         self.posargs = list()
         self.sub_parsers = list()
+        self._plan: Optional[_ParsePlan] = None
     
     def add_flag_argument(self, name: str, usage: str = '') -> None:
         self.flags.append(FlagArgument(name, usage))
+        self._plan = None
 
     def add_keyword_argument(self, name: str, prefix: str = '-', default: Any = None, as_type: Type[Any] | Callable[[str], Any] = str, usage: str = '') -> None:
         self.kwargs.append(KeywordArgument(name, prefix, default, as_type, usage))
+        self._plan = None
 
     def add_postion_argument(self, default: Any = None, as_type: Type[Any] | Callable[[str], Any] = str, usage: str = '') -> None:
         self.posargs.append(PostionArgument(default, as_type, usage))
+        self._plan = None
 
     def add_sub_parser(self, parser: 'CommandParser') -> None:
         self.sub_parsers.append(parser)
+        self._plan = None
+
+    def compile(self) -> None:
+        '''
+        ## 生成解析计划
+
+        直接修改`flags`/`kwargs`/`posargs`/`sub_parsers`后需手动调用
+        '''
+        self._plan = _ParsePlan(self)
+        for sub_parser in self.sub_parsers:
+            sub_parser.compile()
         
     def parse(self, command: str) -> Optional[ParseResult]:
-        command_args = shlex.split(command)
+        command_args = split_command(command)
         if command_args:  
-            if re.search(self.pattern, command_args[0]):
+            if self.pattern.search(command_args[0]):
                 return self(command_args[1:])
 
     def __call__(self, command: str | list[str]) -> ParseResult:
         if isinstance(command, str):
-            command_args = shlex.split(command)
+            command_args = split_command(command)
         else:
             command_args = command
         
-        if command_args:
-            command_start = command_args[0]
-            for sub_parser in self.sub_parsers:
-                if re.search(sub_parser.pattern, command_start):
-                    result = sub_parser(command_args[1:])
-                    result.commands.insert(0, self.start)
-                    return result
+        plan = self._plan or self._compile()
+        if command_args and plan.sub_parsers:
+            if sub_parser := plan.find_sub_parser(command_args[0]):
+                result = sub_parser(command_args[1:])
+                result.commands.insert(0, self.start)
+                return result
         
-        result_command = [self.start]
-        result_flags = {flag.name: False for flag in self.flags}
-        result_kwargs = {kwarg.name: kwarg.default for kwarg in self.kwargs}
+        result_flags = plan.flag_defaults.copy()
+        result_kwargs = plan.kwarg_defaults.copy()
         result_posargs: list[Any] = list()
         result_uncatch: list[str] = list()
-        catched_kwargs: dict[str, KeywordArgument] = dict()
-        # 0 未分配
-        # 1 标记参数
-        # 2 位置参数
-        # 3 键值参数
-        len_command_args = len(command_args)
-        command_args_mask = [0] * len_command_args
-
-        for kwarg in self.kwargs:
-            if (key := kwarg.key) not in command_args:
-                continue
-            index = command_args.index(key)
-            command_args_mask[index] = 3
-            catched_kwargs[key] = kwarg
-        
-        for flag in self.flags:
-            if flag.name not in command_args:
-                continue
-            index = command_args.index(flag.name)
-            command_args_mask[index] = 1
         
-        if self.posargs:
-            for i in range(len_command_args):
-                if command_args_mask[i] == 0:
-                    command_args_mask[i] = 2
+        roles = plan.roles
+        posargs = plan.posargs
+        # 位置参数仅取开头连续的未分配参数
+        leading = bool(posargs)
+        # 每个标记参数/键值参数仅第一次出现时生效
+        catched: set[str] = set()
+        keyword: Optional[KeywordArgument] = None
+        for arg in command_args:
+            role = roles.get(arg, _ROLE_NONE)
+            if role:
+                if arg in catched:
+                    role = _ROLE_NONE
                 else:
-                    break
-        last_arg = ''
-        last_mask = 0
-        for index, mask in enumerate(command_args_mask):
-            arg = command_args[index]
-            if mask == 0:
-                if last_mask == 3 and last_arg in catched_kwargs:
-                    kwarg = catched_kwargs[last_arg]
-                    result_kwargs[kwarg.name] = kwarg.as_type(arg)
+                    catched.add(arg)
+            
+            if role == _ROLE_NONE:
+                if leading and len(result_posargs) < len(posargs):
+                    result_posargs.append(posargs[len(result_posargs)].as_type(arg))
+                elif keyword is not None:
+                    result_kwargs[keyword.name] = keyword.as_type(arg)
                 else:
-                    result_uncatch.append(command_args[index])
-            elif mask == 1:
+                    result_uncatch.append(arg)
+                keyword = None
+            elif role == _ROLE_FLAG:
                 result_flags[arg] = True
-            elif mask == 2:
-                len_posargs = len(result_posargs)
-                result_posargs.append(self.posargs[len_posargs].as_type(arg))
-            
-            last_arg = arg
-            last_mask = mask
-        if (lack := len(result_posargs) - len(self.posargs)) > 0:
-            result_posargs.extend([arg.default for arg in self.posargs[-lack:]])
+                leading = False
+                keyword = None
+            else:
+                leading = False
+                keyword = plan.keywords[arg]
         
-        return ParseResult(result_command, result_flags, result_kwargs, result_posargs, result_uncatch)
+        return ParseResult([self.start], result_flags, result_kwargs, result_posargs, result_uncatch)
+
+    def _compile(self) -> _ParsePlan:
+        self._plan = _ParsePlan(self)
+        return self._plan
+
+
+class CommandIndex:
+    '''
+    ## 命令解析器索引
+
+    多个解析器共用一次命令分割, 按命令起始的正则表达式建立索引:
+    - 锚定开头的字面量前缀(如`^/help`): 按前缀查找字典
+    - 其他含必然出现字面量的正则表达式: 对第一个参数进行一次多字面量查找
+    - 无法提取字面量的正则表达式: 始终检查
+
+    仅对候选解析器执行正则匹配与参数解析
+
+    解析器按引用计数, 每次`add`对应一次`remove`
+    '''
+    __slots__ = ('parsers', '_counts', '_prefixes', '_prefix_lengths', '_literals', '_prefilter', '_always', '_last_command', '_last_args', '_last_matched')
+
+    parsers: set[CommandParser]
+
+    def __init__(self) -> None:
+        self.parsers = set()
+        self._counts: dict[CommandParser, int] = dict()
+        self._prefixes: dict[str, list[CommandParser]] = dict()
+        self._prefix_lengths: list[int] = list()
+        self._literals: dict[str, list[CommandParser]] = dict()
+        self._prefilter = LiteralPrefilter()
+        self._always: list[CommandParser] = list()
+        self._last_command: Optional[str] = None
+        self._last_args: list[str] = list()
+        self._last_matched: frozenset[CommandParser] = frozenset()
+
+    def add(self, parser: CommandParser) -> None:
+        '''
+        ## 添加解析器
+        '''
+        if parser in self.parsers:
+            self._counts[parser] += 1
+            return
+        self.parsers.add(parser)
+        self._counts[parser] = 1
+        self._last_command = None
+        if prefix := literal_prefix(parser.pattern):
+            self._prefixes.setdefault(prefix, list()).append(parser)
+            self._prefix_lengths = sorted({len(prefix) for prefix in self._prefixes})
+        elif literals := required_literals(parser.pattern):
+            for literal in literals:
+                self._literals.setdefault(literal, list()).append(parser)
+            self._prefilter.add(literals)
+        else:
+            self._always.append(parser)
+
+    def remove(self, parser: CommandParser) -> None:
+        '''
+        ## 移出一次`add`添加的解析器
+        '''
+        if parser not in self.parsers:
+            return
+        if (count := self._counts[parser] - 1) > 0:
+            self._counts[parser] = count
+            return
+        del self._counts[parser]
+        self.parsers.discard(parser)
+        self._last_command = None
+        if prefix := literal_prefix(parser.pattern):
+            parsers = self._prefixes[prefix]
+            parsers.remove(parser)
+            if not parsers:
+                del self._prefixes[prefix]
+                self._prefix_lengths = sorted({len(prefix) for prefix in self._prefixes})
+        elif literals := required_literals(parser.pattern):
+            for literal in literals:
+                parsers = self._literals[literal]
+                parsers.remove(parser)
+                if not parsers:
+                    del self._literals[literal]
+            self._prefilter.remove(literals)
+        else:
+            self._always.remove(parser)
+
+    def _candidates(self, command_start: str) -> set[CommandParser]:
+        candidates = set(self._always)
+        prefixes = self._prefixes
+        for length in self._prefix_lengths:
+            if length > len(command_start):
+                break
+            if parsers := prefixes.get(command_start[:length], None):
+                candidates.update(parsers)
+        if self._literals:
+            for literal in self._prefilter.search(command_start):
+                candidates.update(self._literals[literal])
+        return candidates
+
+    def _match(self, command: str) -> tuple[list[str], frozenset[CommandParser]]:
+        if command is self._last_command or command == self._last_command:
+            return self._last_args, self._last_matched
+        try:
+            command_args = split_command(command)
+        except ValueError:
+            command_args = list()
+        if command_args:
+            command_start = command_args[0]
+            matched = frozenset(parser for parser in self._candidates(command_start) if parser.pattern.search(command_start))
+        else:
+            matched = frozenset()
+        self._last_command = command
+        self._last_args = command_args
+        self._last_matched = matched
+        return command_args, matched
+
+    def parse(self, parser: CommandParser, command: str) -> Optional[ParseResult]:
+        '''
+        ## 使用指定解析器解析命令
+
+        结果与`parser.parse(command)`一致, 连续解析相同命令时仅分割一次
+        '''
+        command_args, matched = self._match(command)
+        if parser in matched:
+            return parser(command_args[1:])
+        elif parser not in self.parsers:
+            return parser.parse(command)
+        return None
 
 
 __all__ = [
+    'split_command',
+    'CommandIndex',
     'CommandParser',
     'ParseResult',
 ]
@@ -1,6 +1,6 @@
 import inspect
 
-from typing import Any, Awaitable, Callable, Generic, Type, TypeAlias, TypeVar, Union, get_origin
+from typing import Any, Awaitable, Callable, Generic, Optional, Type, TypeAlias, TypeVar, Union, get_origin
 from types import GenericAlias
 
 
@@ -11,24 +11,39 @@ ExecutorCallable: TypeAlias = Union[Callable[..., R], Callable[..., Awaitable[R]
 class Executor(Generic[R]):
     '''
     ## 执行器
+
+    按实参类型缓存参数绑定, 相同类型的实参再次调用时仅按位置取出参数
     '''
     
-    __slots__ = ('__func', '__awaitable', '__param_annotations')
+    __slots__ = ('__func', '__awaitable', '__param_annotations', '__plans')
     
     def __init__(self, func: ExecutorCallable[R]) -> None:
         self.__func = func
         self.__awaitable = self.__is_awaitable(func)
         self.__param_annotations = self.__get_param_annotations(func)
+        self.__plans: dict[tuple[type, ...], Optional[tuple[int, ...]]] = dict()
 
     @property
     def func(self) -> ExecutorCallable[R]:
         return self.__func
 
+    @property
+    def awaitable(self) -> bool:
+        return self.__awaitable
+
+    @property
+    def annotations(self) -> tuple[Type[Any], ...]:
+        return self.__param_annotations
+
     async def __call__(self, *params: Any) -> R:
+        if (indexes := self.plan(params)) is None:
+            args = self.__parse_params(params)
+        else:
+            args = [params[i] for i in indexes]
         if self.__awaitable:
-            return await self.__func(*self.__parse_params(params)) # type: ignore
+            return await self.__func(*args) # type: ignore
         else:
-            return self.__func(*self.__parse_params(params)) # type: ignore
+            return self.__func(*args) # type: ignore
 
     def __is_awaitable(self, call: Callable[..., Any]) -> bool:
         if inspect.isroutine(call):
@@ -45,8 +60,35 @@ class Executor(Generic[R]):
     def __parse_params(self, params: tuple[Any, ...]) -> tuple[Any, ...]:
         return tuple(next((param for param in params if isinstance(param, t)), None) for t in self.__param_annotations)
 
+    def bind(self, types: tuple[type, ...]) -> Optional[tuple[int, ...]]:
+        '''
+        ## 根据参数类型得到各形参对应的实参位置
+
+        存在无法绑定的形参时返回`None`
+        '''
+        indexes: list[int] = list()
+        for t in self.__param_annotations:
+            index = next((i for i, arg_type in enumerate(types) if issubclass(arg_type, t)), None)
+            if index is None:
+                return None
+            indexes.append(index)
+        return tuple(indexes)
+
+    def plan(self, params: tuple[Any, ...]) -> Optional[tuple[int, ...]]:
+        '''
+        ## 获取实参对应的参数绑定
+
+        按实参类型缓存`bind`的结果
+        '''
+        types = tuple(map(type, params))
+        try:
+            return self.__plans[types]
+        except KeyError:
+            indexes = self.__plans[types] = self.bind(types)
+            return indexes
+
     def verify_params(self, params: tuple[Any, ...]) -> bool:
-        return all(any(isinstance(arg, t) for arg in params) for t in self.__param_annotations)
+        return self.plan(params) is not None
 
 
 __all__ = [
@@ -0,0 +1,228 @@
+'''
+## 正则表达式字面量预过滤
+
+从正则表达式中提取匹配时必然出现的字面量, 并对多个正则表达式的字面量进行一次性查找
+'''
+import re
+
+from typing import Iterable, Optional
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parser # type: ignore
+except ImportError:
+    import sre_constants, sre_parse as sre_parser # type: ignore
+
+
+_AT = sre_constants.AT
+_AT_BEGINNINGS = (sre_constants.AT_BEGINNING, sre_constants.AT_BEGINNING_STRING)
+_AT_ENDS = (sre_constants.AT_END, sre_constants.AT_END_STRING)
+_LITERAL = sre_constants.LITERAL
+_SUBPATTERN = sre_constants.SUBPATTERN
+_BRANCH = sre_constants.BRANCH
+_ATOMIC_GROUP = getattr(sre_constants, 'ATOMIC_GROUP', None)
+_REPEATS = tuple(op for op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT, getattr(sre_constants, 'POSSESSIVE_REPEAT', None)) if op is not None)
+
+
+def _score(literals: Optional[frozenset[str]]) -> int:
+    return min(map(len, literals)) if literals else 0
+
+def _required(items: Iterable[tuple[object, object]]) -> Optional[frozenset[str]]:
+    best: Optional[frozenset[str]] = None
+    run: list[str] = list()
+
+    def consider(literals: Optional[frozenset[str]]) -> None:
+        nonlocal best
+        if _score(literals) > _score(best):
+            best = literals
+
+    for op, av in items:
+        if op is _LITERAL:
+            run.append(chr(av)) # type: ignore
+            continue
+        if run:
+            consider(frozenset([''.join(run)]))
+            run.clear()
+
+        if op is _SUBPATTERN:
+            _, add_flags, _, sub = av # type: ignore
+            # 局部忽略大小写时无法确定字面量
+            if not add_flags & re.IGNORECASE:
+                consider(_required(sub))
+        elif op is _ATOMIC_GROUP:
+            consider(_required(av)) # type: ignore
+        elif op in _REPEATS:
+            min_repeat, _, sub = av # type: ignore
+            if min_repeat >= 1:
+                consider(_required(sub))
+        elif op is _BRANCH:
+            # 任一分支匹配即可, 需所有分支均含有字面量
+            alternatives = [_required(sub) for sub in av[1]] # type: ignore
+            if all(alternatives):
+                consider(frozenset().union(*alternatives)) # type: ignore
+
+    if run:
+        consider(frozenset([''.join(run)]))
+    return best
+
+def required_literals(pattern: str | re.Pattern[str], flags: int = 0) -> Optional[frozenset[str]]:
+    '''
+    ## 提取匹配时必然出现的字面量
+
+    匹配成功的文本至少包含返回的字面量之一, 无法提取时返回`None`
+
+    忽略大小写的正则表达式不进行提取
+    '''
+    if isinstance(pattern, re.Pattern):
+        pattern, flags = pattern.pattern, pattern.flags
+    if flags & re.IGNORECASE:
+        return None
+    try:
+        parsed = sre_parser.parse(pattern, flags)
+    except re.error:
+        return None
+    if parsed.state.flags & re.IGNORECASE:
+        return None
+    return _required(parsed)
+
+
+def _parse_anchored(pattern: str | re.Pattern[str], flags: int) -> Optional[list[tuple[object, object]]]:
+    if isinstance(pattern, re.Pattern):
+        pattern, flags = pattern.pattern, pattern.flags
+    # 多行模式下`^`/`$`可匹配任意行首/行尾
+    if flags & (re.IGNORECASE | re.MULTILINE):
+        return None
+    try:
+        parsed = sre_parser.parse(pattern, flags)
+    except re.error:
+        return None
+    if parsed.state.flags & (re.IGNORECASE | re.MULTILINE):
+        return None
+    return list(parsed)
+
+def literal_prefix(pattern: str | re.Pattern[str], flags: int = 0) -> Optional[str]:
+    '''
+    ## 提取锚定在开头的字面量前缀
+
+    匹配成功的文本必然以返回的字面量开头, 如`^/help`返回`/help`, 无法提取时返回`None`
+    '''
+    items = _parse_anchored(pattern, flags)
+    if not items or items[0][0] is not _AT or items[0][1] not in _AT_BEGINNINGS:
+        return None
+    prefix: list[str] = list()
+    for op, av in items[1:]:
+        if op is not _LITERAL:
+            break
+        prefix.append(chr(av)) # type: ignore
+    return ''.join(prefix) or None
+
+def literal_pattern(pattern: str | re.Pattern[str], flags: int = 0) -> Optional[tuple[str, bool, bool]]:
+    '''
+    ## 仅由字面量与首尾锚点组成时返回`(字面量, 是否锚定开头, 是否锚定结尾)`
+
+    如`^/help$`返回`('/help', True, True)`, `签到`返回`('签到', False, False)`
+    '''
+    items = _parse_anchored(pattern, flags)
+    if not items:
+        return None
+    start = items[0][0] is _AT and items[0][1] in _AT_BEGINNINGS
+    end = len(items) > int(start) and items[-1][0] is _AT and items[-1][1] in _AT_ENDS
+    literal: list[str] = list()
+    for op, av in items[int(start):len(items) - int(end)]:
+        if op is not _LITERAL:
+            return None
+        literal.append(chr(av)) # type: ignore
+    if not literal:
+        return None
+    return ''.join(literal), start, end
+
+
+class LiteralPrefilter:
+    '''
+    ## 多字面量查找
+
+    所有字面量合并为一个正则表达式, 对文本进行一次扫描即可得到出现的全部字面量
+
+    字面量按引用计数, 每次`add`对应一次`remove`, 计数归零时移出
+    '''
+
+    __slots__ = ('literals', '_counts', '_pattern', '_implied', '_last_text', '_last_found')
+
+    literals: set[str]
+
+    def __init__(self) -> None:
+        self.literals = set()
+        self._counts: dict[str, int] = dict()
+        self._pattern: Optional[re.Pattern[str]] = None
+        self._implied: dict[str, frozenset[str]] = dict()
+        self._last_text: Optional[str] = None
+        self._last_found: frozenset[str] = frozenset()
+
+    def add(self, literals: Iterable[str]) -> None:
+        '''
+        ## 添加需要查找的字面量
+        '''
+        counts = self._counts
+        changed = False
+        for literal in set(literals):
+            if literal not in counts:
+                counts[literal] = 0
+                self.literals.add(literal)
+                changed = True
+            counts[literal] += 1
+        if changed:
+            self._pattern = None
+            self._last_text = None
+
+    def remove(self, literals: Iterable[str]) -> None:
+        '''
+        ## 移出一次`add`添加的字面量
+        '''
+        counts = self._counts
+        changed = False
+        for literal in set(literals):
+            if (count := counts.get(literal, 0) - 1) > 0:
+                counts[literal] = count
+            elif literal in counts:
+                del counts[literal]
+                self.literals.discard(literal)
+                changed = True
+        if changed:
+            self._pattern = None
+            self._last_text = None
+
+    def _compile(self) -> re.Pattern[str]:
+        literals = sorted(self.literals, key=len, reverse=True)
+        # 先行断言可在每个位置匹配, 不会因匹配结果重叠而遗漏
+        self._pattern = re.compile('(?=(' + '|'.join(map(re.escape, literals)) + '))', re.S)
+        # 同一位置仅能得到最长的字面量, 其所包含的字面量也必然出现
+        self._implied = {literal: frozenset(other for other in literals if other in literal) for literal in literals}
+        return self._pattern
+
+    def search(self, text: str) -> frozenset[str]:
+        '''
+        ## 查找文本中出现的字面量
+
+        连续查找相同文本时直接返回上次结果
+        '''
+        if text is self._last_text or text == self._last_text:
+            return self._last_found
+        if not self.literals:
+            return frozenset()
+        pattern = self._pattern or self._compile()
+
+        found: set[str] = set()
+        implied = self._implied
+        for literal in set(pattern.findall(text)):
+            found.update(implied[literal])
+
+        self._last_text = text
+        self._last_found = frozenset(found)
+        return self._last_found
+
+
+__all__ = [
+    'required_literals',
+    'literal_prefix',
+    'literal_pattern',
+    'LiteralPrefilter',
+]
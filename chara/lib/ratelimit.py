@@ -0,0 +1,207 @@
+'''
+## 限流
+
+不使用定时器的限流器, 记录在访问时按需过期, 并在访问时每隔一段时间整体清理一次已过期的记录
+'''
+import time
+
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Callable, Generic, Hashable, Optional, TypeVar
+
+
+K = TypeVar('K', bound=Hashable)
+S = TypeVar('S')
+
+
+class RateLimiter(ABC, Generic[K, S]):
+    '''
+    ## 限流器基类
+
+    ---
+    ### 参数
+    - sweep_interval: 整体清理已过期记录的间隔(s)
+    - clock: 时钟, 默认为`time.monotonic`
+    '''
+
+    __slots__ = ('clock', 'sweep_interval', '_entries', '_next_sweep')
+
+    clock: Callable[[], float]
+    sweep_interval: float
+
+    def __init__(self, sweep_interval: float = 60, clock: Callable[[], float] = time.monotonic) -> None:
+        self.clock = clock
+        self.sweep_interval = sweep_interval
+        self._entries: dict[K, S] = dict()
+        self._next_sweep = clock() + sweep_interval
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._entries
+
+    def hit(self, key: K, now: Optional[float] = None) -> bool:
+        '''
+        ## 尝试通过一次, 返回是否允许
+        '''
+        if now is None:
+            now = self.clock()
+        if now >= self._next_sweep:
+            self.sweep(now)
+        return self._hit(key, now)
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        '''
+        ## 清理已过期的记录, 返回清理数量
+        '''
+        if now is None:
+            now = self.clock()
+        self._next_sweep = now + self.sweep_interval
+        expired = [key for key, state in self._entries.items() if self._expired(state, now)]
+        for key in expired:
+            del self._entries[key]
+        return len(expired)
+
+    def reset(self, key: Optional[K] = None) -> None:
+        '''
+        ## 清除指定键或全部记录
+        '''
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    @abstractmethod
+    def _hit(self, key: K, now: float) -> bool:
+        '''
+        ## 尝试通过一次, 返回是否允许
+        '''
+
+    @abstractmethod
+    def _expired(self, state: S, now: float) -> bool:
+        '''
+        ## 记录是否已过期, 过期的记录与不存在时等价
+        '''
+
+
+class SlidingWindowLog(RateLimiter[K, deque[float]]):
+    '''
+    ## 滑动窗口(日志)
+
+    任意`window`秒内最多通过`limit`次, 每个键最多保存`limit`个时间戳
+    '''
+
+    __slots__ = ('limit', 'window')
+
+    limit: int
+    window: float
+
+    def __init__(self, limit: int, window: float, sweep_interval: float = 60, clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__(sweep_interval, clock)
+        self.limit = limit
+        self.window = window
+
+    def _hit(self, key: K, now: float) -> bool:
+        if (log := self._entries.get(key, None)) is None:
+            log = self._entries[key] = deque(maxlen=self.limit)
+        else:
+            # 通过后满`window`秒的记录过期
+            expire = now - self.window
+            while log and log[0] <= expire:
+                log.popleft()
+            if len(log) >= self.limit:
+                return False
+        log.append(now)
+        return True
+
+    def _expired(self, state: deque[float], now: float) -> bool:
+        return not state or state[-1] <= now - self.window
+
+    def remaining(self, key: K, now: Optional[float] = None) -> float:
+        '''
+        ## 距离下一次可以通过的时间(s), 可以通过时为`0`
+        '''
+        if now is None:
+            now = self.clock()
+        if (log := self._entries.get(key, None)) is None or len(log) < self.limit:
+            return 0
+        return max(0.0, log[0] + self.window - now)
+
+
+class SlidingWindowCounter(RateLimiter[K, list[float]]):
+    '''
+    ## 滑动窗口(计数)
+
+    按上一窗口计数的剩余比例估算当前滑动窗口内的通过次数, 每个键仅保存三个数值
+    '''
+
+    __slots__ = ('limit', 'window')
+
+    limit: int
+    window: float
+
+    def __init__(self, limit: int, window: float, sweep_interval: float = 60, clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__(sweep_interval, clock)
+        self.limit = limit
+        self.window = window
+
+    def _hit(self, key: K, now: float) -> bool:
+        window = self.window
+        start = now - now % window
+        # [当前窗口起点, 上一窗口计数, 当前窗口计数]
+        if (state := self._entries.get(key, None)) is None:
+            state = self._entries[key] = [start, 0, 0]
+        elif state[0] != start:
+            state[1] = state[2] if start - state[0] == window else 0
+            state[0], state[2] = start, 0
+        estimated = state[1] * (1 - (now - start) / window) + state[2]
+        if estimated >= self.limit:
+            return False
+        state[2] += 1
+        return True
+
+    def _expired(self, state: list[float], now: float) -> bool:
+        return state[0] + 2 * self.window <= now
+
+
+class TokenBucket(RateLimiter[K, list[float]]):
+    '''
+    ## 令牌桶
+
+    每秒补充`rate`个令牌, 最多存放`capacity`个, 每次通过消耗一个令牌, 每个键仅保存两个数值
+    '''
+
+    __slots__ = ('rate', 'capacity')
+
+    rate: float
+    capacity: float
+
+    def __init__(self, rate: float, capacity: float, sweep_interval: float = 60, clock: Callable[[], float] = time.monotonic) -> None:
+        super().__init__(sweep_interval, clock)
+        self.rate = rate
+        self.capacity = capacity
+
+    def _hit(self, key: K, now: float) -> bool:
+        # [令牌数, 上次更新时间]
+        if (state := self._entries.get(key, None)) is None:
+            state = self._entries[key] = [self.capacity, now]
+        else:
+            state[0] = min(self.capacity, state[0] + (now - state[1]) * self.rate)
+            state[1] = now
+        if state[0] < 1:
+            return False
+        state[0] -= 1
+        return True
+
+    def _expired(self, state: list[float], now: float) -> bool:
+        # 令牌已补满时与新建记录等价
+        return state[0] + (now - state[1]) * self.rate >= self.capacity
+
+
+__all__ = [
+    'RateLimiter',
+    'SlidingWindowLog',
+    'SlidingWindowCounter',
+    'TokenBucket',
+]
@@ -0,0 +1,85 @@
+'''
+## 紧凑消息事件
+
+不进行字段校验, 直接构建`chara.onebot.events`中的消息事件模型, 得到的实例与校验后构建的实例类型相同
+
+- 仅检查事件必需字段是否存在, 不转换字段类型; `sender`仍进行校验
+- `message`为OneBot消息格式时延迟构建消息段, 在此之前`pure_text`/`at_ids`/`at_all`直接读取原始消息段
+'''
+from typing import Any, Type, TypeVar
+
+from pydantic import BaseModel
+
+from chara.onebot.events import Event, GroupMessageEvent, MessageEvent, PrivateMessageEvent, Sender
+from chara.onebot.message import Message, MessageSegment
+
+
+M = TypeVar('M', bound=BaseModel)
+E = TypeVar('E', bound=Event)
+
+_escape = MessageSegment._escape
+
+_MODEL_FIELDS: dict[type[BaseModel], tuple[frozenset[str], tuple[tuple[str, Any], ...]]] = dict()
+'''## 模型 -> (必需字段, (字段名, 默认值)...)'''
+
+_object_new = object.__new__
+_object_setattr = object.__setattr__
+
+
+def _model_fields(model: type[BaseModel]) -> tuple[frozenset[str], tuple[tuple[str, Any], ...]]:
+    if (fields := _MODEL_FIELDS.get(model, None)) is None:
+        required = frozenset(name for name, field in model.model_fields.items() if field.is_required())
+        fields = _MODEL_FIELDS[model] = (required, tuple((name, None if field.is_required() else field.get_default(call_default_factory=False)) for name, field in model.model_fields.items()))
+    return fields
+
+
+def construct(model: Type[M], data: dict[str, Any]) -> M:
+    '''
+    ## 不进行校验构建模型
+
+    与`model_construct`结果相同, 省去别名与默认值工厂的处理, 缺少必需字段时抛出`KeyError`
+    '''
+    required, fields = _model_fields(model)
+    if not data.keys() >= required:
+        raise KeyError(f'{model.__name__} missing fields {sorted(required - data.keys())}.')
+    get = data.get
+    values = {name: get(name, default) for name, default in fields}
+    instance = _object_new(model)
+    _object_setattr(instance, '__dict__', values)
+    _object_setattr(instance, '__pydantic_fields_set__', data.keys() & values.keys())
+    _object_setattr(instance, '__pydantic_extra__', None)
+    _object_setattr(instance, '__pydantic_private__', None)
+    return instance
+
+
+def compact_message_event(event_class: Type[E], data: dict[str, Any]) -> E:
+    '''
+    ## 不进行校验构建消息事件
+
+    `event_class`应为`COMPACT_EVENTS`中的消息事件模型
+
+    缺少必需字段或字段结构不正确时抛出`KeyError`/`TypeError`, `sender`校验失败时抛出`ValidationError`
+    '''
+    data = dict(data)
+    data['sender'] = Sender.model_validate(data['sender'])
+    if isinstance(raw := data['message'], list):
+        message = data['message'] = Message.deferred(raw)
+        if raw and (segment := raw[0])['type'] == 'reply':
+            data['reply_id'] = _escape(segment['data'].get('id'))
+    else:
+        message = data['message'] = Message(raw)
+        if (segments := message.segments) and segments[0].type == 'reply':
+            data['reply_id'] = segments[0].data.get('id')
+    data['at_me'] = data['self_id'] in message.at_ids if issubclass(event_class, GroupMessageEvent) else True
+    return construct(event_class, data)
+
+
+COMPACT_EVENTS: frozenset[type[Event]] = frozenset((MessageEvent, GroupMessageEvent, PrivateMessageEvent))
+'''## 使用紧凑构建的事件模型'''
+
+
+__all__ = [
+    'construct',
+    'compact_message_event',
+    'COMPACT_EVENTS',
+]
@@ -1,6 +1,6 @@
 from typing import Any, Optional
 
-from pydantic import BaseModel, ConfigDict, field_validator
+from pydantic import BaseModel, ConfigDict, field_serializer, field_validator
 
 from chara.onebot.message import Message
 
@@ -65,11 +65,15 @@ class MessageEvent(Event):
     def _check_message(cls, data: Any) -> Message:
         return Message(data)
 
+    @field_serializer('message')
+    def _serialize_message(self, message: Message) -> list[dict[str, Any]]:
+        return message.array
+
 
     @property
-    def pure_text(self):
+    def pure_text(self) -> str:
         '''## 不含CQCode的纯文本消息'''
-        return ''.join([segment.data['text'] for segment in self.message.segments if segment.type == 'text'])
+        return self.message.pure_text
 
 
 class GroupMessageEvent(MessageEvent):
@@ -85,15 +89,12 @@ class GroupMessageEvent(MessageEvent):
         
         不包含at全体成员
         '''
-        return [int(qq) for segment in self.message.segments if segment.type == 'at' and (qq := segment.data['qq']) != 'all']
+        return self.message.at_ids
     
     @property
     def at_all(self) -> bool:
         '''## 获取消息是否at全体成员'''
-        for segment in self.message.segments:
-            if segment.type == 'at' and segment.data['qq'] == 'all':
-                return True
-        return False
+        return self.message.at_all
 
 
 class PrivateMessageEvent(MessageEvent):
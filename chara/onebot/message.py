@@ -4,27 +4,149 @@ import re
 from base64 import b64encode
 from io import BytesIO
 from pathlib import Path
-from typing import Any, Generator, Optional, Union, overload
+from typing import Any, Generator, Iterable, Optional, SupportsIndex, Union, overload
 
 from PIL.Image import Image
 
 
+_DATA_EDITS = 0
+'''## 任意消息段数据被修改的次数, 消息段可能被多条消息共用, 修改时使所有消息的缓存失效'''
+
+def _data_edited() -> None:
+    global _DATA_EDITS
+    _DATA_EDITS += 1
+
+
+class SegmentData(dict[str, Any]):
+    '''
+    ## 消息段数据
+
+    修改时使所有消息的`pure_text`/`at_ids`/`at_all`缓存失效
+    '''
+
+    __slots__ = ()
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        super().__setitem__(key, value)
+        _data_edited()
+
+    def __delitem__(self, key: str) -> None:
+        super().__delitem__(key)
+        _data_edited()
+
+    def __ior__(self, other: Any) -> 'SegmentData':
+        self.update(other)
+        return self
+
+    def clear(self) -> None:
+        super().clear()
+        _data_edited()
+
+    def pop(self, *args: Any) -> Any:
+        result = super().pop(*args)
+        _data_edited()
+        return result
+
+    def popitem(self) -> tuple[str, Any]:
+        result = super().popitem()
+        _data_edited()
+        return result
+
+    def setdefault(self, key: str, default: Any = None) -> Any:
+        result = super().setdefault(key, default)
+        _data_edited()
+        return result
+
+    def update(self, *args: Any, **kwargs: Any) -> None:
+        super().update(*args, **kwargs)
+        _data_edited()
+
+
+class SegmentList(list['MessageSegment']):
+    '''
+    ## 消息段列表
+
+    每条消息拥有独立的列表, 增删或替换消息段时设置`dirty`, 所属消息读取缓存前检查
+    '''
+
+    __slots__ = ('dirty', )
+
+    dirty: bool
+
+    def __init__(self, segments: Iterable['MessageSegment'] = ()) -> None:
+        super().__init__(segments)
+        self.dirty = False
+
+    def __reduce__(self) -> tuple[Any, ...]:
+        return SegmentList, (list(self), )
+
+    def __setitem__(self, index: Any, value: Any) -> None:
+        super().__setitem__(index, value)
+        self.dirty = True
+
+    def __delitem__(self, index: Union[SupportsIndex, slice]) -> None:
+        super().__delitem__(index)
+        self.dirty = True
+
+    def __iadd__(self, other: Iterable['MessageSegment']) -> 'SegmentList': # type: ignore
+        self.extend(other)
+        return self
+
+    def __imul__(self, n: SupportsIndex) -> 'SegmentList':
+        super().__imul__(n)
+        self.dirty = True
+        return self
+
+    def append(self, segment: 'MessageSegment') -> None:
+        super().append(segment)
+        self.dirty = True
+
+    def extend(self, segments: Iterable['MessageSegment']) -> None:
+        super().extend(segments)
+        self.dirty = True
+
+    def insert(self, index: SupportsIndex, segment: 'MessageSegment') -> None:
+        super().insert(index, segment)
+        self.dirty = True
+
+    def pop(self, index: SupportsIndex = -1) -> 'MessageSegment':
+        result = super().pop(index)
+        self.dirty = True
+        return result
+
+    def remove(self, segment: 'MessageSegment') -> None:
+        super().remove(segment)
+        self.dirty = True
+
+    def clear(self) -> None:
+        super().clear()
+        self.dirty = True
+
+    def reverse(self) -> None:
+        super().reverse()
+        self.dirty = True
+
+    def sort(self, *args: Any, **kwargs: Any) -> None:
+        super().sort(*args, **kwargs)
+        self.dirty = True
+
+
 class MessageSegment:
     '''## 消息段'''
     
-    __slots__ = ('type', 'data')
-    
-    data: dict[str, Any]
+    __slots__ = ('_dict', )
 
     def __init__(self, type: str, data: dict[str, Any]) -> None:
-        self.type = type
-        if self.type == 'json':
-            if raw_data := data.get('data', None):
-                self.data = json.loads(raw_data)
-            else:
-                self.data = {k: self._escape(v) for k, v in data.items()}
+        if type == 'json' and (raw_data := data.get('data', None)):
+            data = SegmentData(json.loads(raw_data))
         else:
-            self.data = {k: self._escape(v) for k, v in data.items()}
+            # 复制后原地转义, 不创建中间字典
+            data = SegmentData(data)
+            for k, v in data.items():
+                if isinstance(v, str):
+                    dict.__setitem__(data, k, self._escape(v))
+        # 构建时即为OneBot消息段格式, JSON后端可直接序列化
+        self._dict: dict[str, Any] = {'type': type, 'data': data}
     
     def __str__(self) -> str:
         return str(self.cqcode)
@@ -52,9 +174,28 @@ class MessageSegment:
         data = ',' + data if data else ''
         return f'[CQ:{self.type}{data}]'
 
+    @property
+    def type(self) -> str:
+        return self._dict['type']
+
+    @type.setter
+    def type(self, value: str) -> None:
+        self._dict['type'] = value
+        _data_edited()
+
+    @property
+    def data(self) -> SegmentData:
+        return self._dict['data']
+
+    @data.setter
+    def data(self, value: dict[str, Any]) -> None:
+        self._dict['data'] = SegmentData(value)
+        _data_edited()
+
     @property
     def dict(self) -> dict[str, Any]:
-        return dict(type=self.type, data=self.data)
+        '''## OneBot消息段格式, 返回的字典与消息段共用, 请勿修改'''
+        return self._dict
 
     @staticmethod
     def text(text: str) -> 'MessageSegment':
@@ -157,7 +298,8 @@ class MessageSegment:
         if id is not None:
             return MessageSegment('node', {'id': id})
         else:
-            return MessageSegment('node', {'name': name, 'uin': uin, 'content': content})
+            # 消息内容转为OneBot消息格式, 序列化时无需再转换
+            return MessageSegment('node', {'name': name, 'uin': uin, 'content': content if isinstance(content, str) else Message(content).array})
 
     @staticmethod
     def json(data: str) -> 'MessageSegment':
@@ -169,23 +311,57 @@ class MessageSegment:
 
 
 class Message:
-    '''## 消息'''
-    __slots__ = ('segments')
+    '''
+    ## 消息
+    
+    `pure_text`/`at_ids`/`at_all`在首次访问后缓存, 消息段被增删/替换或消息段的类型/数据被修改时自动失效
+    '''
+    __slots__ = ('_segments', '_raw', '_cache', '_edits')
 
     def __init__(self, message: Optional[Union[MessageSegment, 'Message', list[dict[str, Any]], dict[str, Any], str]] = None):
-        self.segments: list[MessageSegment] = list()
+        self._raw: Optional[list[dict[str, Any]]] = None
+        self._cache: Optional[dict[str, Any]] = None
+        self._edits = 0
         if message is None:
-            pass
+            self._segments = SegmentList()
         elif isinstance(message, Message):
-            self.segments.extend(message.segments)
+            self._segments = SegmentList(message.segments)
         elif isinstance(message, MessageSegment):
-            self.segments.append(message)
+            self._segments = SegmentList((message, ))
         elif isinstance(message, list):
-            self.segments.extend([MessageSegment(**seg) for seg in message])
+            self._segments = SegmentList([MessageSegment(**seg) for seg in message])
         elif isinstance(message, dict):
-            self.segments.append(MessageSegment(**message))
+            self._segments = SegmentList((MessageSegment(**message), ))
         else:
-            self.segments.extend(self._construct(str(message)))
+            self._segments = SegmentList(self._construct(str(message)))
+
+    @staticmethod
+    def deferred(message: list[dict[str, Any]]) -> 'Message':
+        '''
+        ## 由OneBot消息格式构建消息, 消息段在首次访问时才构建
+
+        在此之前`pure_text`/`at_ids`/`at_all`直接读取原始消息段, 传入的列表不应再被修改
+        '''
+        self = Message.__new__(Message)
+        self._raw = message
+        self._cache = None
+        self._edits = _DATA_EDITS
+        return self
+
+    @property
+    def segments(self) -> SegmentList:
+        if (raw := self._raw) is not None:
+            # 与原始消息段得到的缓存一致, 继续沿用
+            self._segments = SegmentList([MessageSegment(**seg) for seg in raw])
+            self._raw = None
+            self._edits = _DATA_EDITS
+        return self._segments
+
+    @segments.setter
+    def segments(self, segments: Iterable[MessageSegment]) -> None:
+        self._segments = SegmentList(segments)
+        self._raw = None
+        self._cache = None
 
     @staticmethod
     def _construct(message: str):
@@ -207,6 +383,15 @@ class Message:
                 data = {k: v for k, v in [d.split('=', 1) for d in data.split(',') if d]}
                 yield MessageSegment(type_, data)
 
+    def __getstate__(self) -> list[MessageSegment]:
+        return list(self.segments)
+
+    def __setstate__(self, state: list[MessageSegment]) -> None:
+        self._segments = SegmentList(state)
+        self._raw = None
+        self._cache = None
+        self._edits = 0
+
     def __iter__(self) -> Generator[MessageSegment, Any, None]:
         for segment in self.segments:
             yield segment
@@ -227,6 +412,7 @@ class Message:
         return str(self.segments)
 
     def __add__(self, other: Union[str, MessageSegment, 'Message']):
+        self._cache = None
         if isinstance(other, Message):
             self.segments.extend(other.segments)
         elif isinstance(other, MessageSegment):
@@ -236,6 +422,7 @@ class Message:
         return self
 
     def __radd__(self, other: Union[str, MessageSegment, 'Message']):
+        self._cache = None
         if isinstance(other, Message):
             self.segments.extend(other.segments)
         elif isinstance(other, MessageSegment):
@@ -246,5 +433,61 @@ class Message:
 
     @property
     def array(self) -> list[dict[str, Any]]:
-        return [segment.dict for segment in self]
+        '''## OneBot消息格式, 各消息段的字典与消息段共用, 请勿修改'''
+        return [segment._dict for segment in self.segments]
+
+    def clear_cache(self) -> None:
+        '''## 清除`pure_text`/`at_ids`/`at_all`的缓存'''
+        self._cache = None
+
+    def _derived(self) -> dict[str, Any]:
+        if self._raw is not None:
+            # 原始消息段不会被修改
+            if self._cache is None:
+                self._cache = dict()
+            return self._cache
+        segments = self._segments
+        if (cache := self._cache) is None or segments.dirty or self._edits != _DATA_EDITS:
+            segments.dirty = False
+            self._edits = _DATA_EDITS
+            cache = self._cache = dict()
+        return cache
 
+    @property
+    def pure_text(self) -> str:
+        '''## 不含CQCode的纯文本消息'''
+        derived = self._derived()
+        if (text := derived.get('pure_text', None)) is None:
+            if (raw := self._raw) is not None:
+                escape = MessageSegment._escape
+                text = ''.join([escape(segment['data']['text']) for segment in raw if segment['type'] == 'text'])
+            else:
+                text = ''.join([segment.data['text'] for segment in self.segments if segment.type == 'text'])
+            derived['pure_text'] = text
+        return text
+
+    @property
+    def at_ids(self) -> list[int]:
+        '''
+        ## 消息内被at的所有人的id
+        
+        不包含at全体成员, 返回的列表为缓存, 请勿修改
+        '''
+        derived = self._derived()
+        if (at_ids := derived.get('at_ids', None)) is None:
+            at_ids = derived['at_ids'] = [int(qq) for qq in self._at_targets() if qq != 'all']
+        return at_ids
+
+    @property
+    def at_all(self) -> bool:
+        '''## 消息是否at全体成员'''
+        derived = self._derived()
+        if (at_all := derived.get('at_all', None)) is None:
+            at_all = derived['at_all'] = 'all' in self._at_targets()
+        return at_all
+
+    def _at_targets(self) -> list[Any]:
+        if (raw := self._raw) is not None:
+            escape = MessageSegment._escape
+            return [escape(segment['data']['qq']) for segment in raw if segment['type'] == 'at']
+        return [segment.data['qq'] for segment in self.segments if segment.type == 'at']
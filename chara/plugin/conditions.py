@@ -1,7 +1,10 @@
+from time import time as wall_time
 from typing import Literal, Optional
 
+from chara.core import hazard
 from chara.core.bot import Bot
 from chara.core.plugin import Condition, Handler
+from chara.lib.ratelimit import SlidingWindowLog
 from chara.onebot.events import Event, GroupMessageEvent, MessageEvent, PrivateMessageEvent
 from chara.typing import MessageLike
 
@@ -50,53 +53,53 @@ async def _bot_is_group_member(bot: Bot, event: GroupMessageEvent) -> bool:
 async def _bot_is_group_owner_or_admin(bot: Bot, event: GroupMessageEvent) -> bool:
     return event.group_id in bot.groups.owned or event.group_id in bot.groups.admin
 
-SUPERUSER = Condition(_is_superuser)
+SUPERUSER = Condition(_is_superuser, pure=True)
 '''## Config中设置的SuperUser'''
 
 SU = SUPERUSER
 '''## Config中设置的SuperUser'''
 
-AT_ME = Condition(_is_at_me)
+AT_ME = Condition(_is_at_me, pure=True)
 '''## bot被at或私聊消息'''
 
-CALL_ME = Condition(_is_call_me)
+CALL_ME = Condition(_is_call_me, pure=True)
 '''## 消息以bot名字或昵称开头'''
 
 TO_ME = AT_ME & CALL_ME
 '''## 消息以bot名字或昵称开头或被at或私聊消息'''
 
-FRIEND = Condition(_is_friend)
+FRIEND = Condition(_is_friend, pure=True)
 '''## 发送者为好友'''
 
-FRIEND_PRIVATE = Condition(_is_friend_private)
+FRIEND_PRIVATE = Condition(_is_friend_private, pure=True)
 '''## 会话为好友私聊'''
 
-SP_0 = Condition(_sender_is_group_owner)
+SP_0 = Condition(_sender_is_group_owner, pure=True)
 '''## 消息发送者为群主'''
 
-SP_1 = Condition(_sender_is_owner_or_admin)
+SP_1 = Condition(_sender_is_owner_or_admin, pure=True)
 '''## 消息发送者为群主或管理员'''
 
-SP_2 = Condition(_sender_is_group_admin)
+SP_2 = Condition(_sender_is_group_admin, pure=True)
 '''## 消息发送者为管理员'''
 
-SP_3 = Condition(_sender_is_group_member)
+SP_3 = Condition(_sender_is_group_member, pure=True)
 '''## 消息发送者为普通群员'''
 
-BP_0 = Condition(_bot_is_group_owner)
+BP_0 = Condition(_bot_is_group_owner, pure=True)
 '''## bot为收到消息群的群主'''
 
-BP_1 = Condition(_bot_is_group_owner_or_admin)
+BP_1 = Condition(_bot_is_group_owner_or_admin, pure=True)
 '''## bot为收到消息群的群主或管理员'''
 
-BP_2 = Condition(_bot_is_group_admin)
+BP_2 = Condition(_bot_is_group_admin, pure=True)
 '''## bot为收到消息群的管理员'''
 
-BP_3 = Condition(_bot_is_group_member)
+BP_3 = Condition(_bot_is_group_member, pure=True)
 '''## bot为收到消息群的普通群员'''
 
 
-def Frequency(num: int = 1, time: float = 10, mode: Literal['group_shared', 'user_shared', 'independent'] = 'independent', prompt: Optional[MessageLike] = None) -> Condition:
+def Frequency(num: int = 1, time: float = 10, mode: Literal['group_shared', 'user_shared', 'independent'] = 'independent', prompt: Optional[MessageLike] = None, shared: bool = False, name: Optional[str] = None) -> Condition:
     '''
     ## 创建一个频率条件
     
@@ -109,46 +112,52 @@ def Frequency(num: int = 1, time: float = 10, mode: Literal['group_shared', 'use
         - user_shared: 用户的所有会话[群聊|私聊]共用一个计时器
         - independent: 用户的每个会话[群聊|私聊]单独使用一个计时器
     - prompt: 未满足频率限制时发送的内容
+    - shared: 是否在所有插件组(子进程)间共享计数, 计数在重启后保留
+    - name: 共享计数的名称, `shared`为`True`时必须提供, 名称相同的共享条件共用计数
+
+    使用滑动窗口记录通过时间, 记录在访问时过期, 不为每次通过创建定时器
     '''
-    ACTIVITY: dict[str, int] = dict()
+    if shared and not name:
+        raise ValueError('shared frequency requires a name.')
+    namespace = name or ''
+    if shared and (table := hazard.SHARED_RATE_LIMIT) is not None and num > table.depth:
+        raise ValueError(f'shared frequency num {num} exceeds ratelimit.depth {table.depth}.')
+    limiter: SlidingWindowLog[tuple[Optional[int], Optional[int]]] = SlidingWindowLog(num, time, max(time, 60))
 
     if mode == 'group_shared':
-        def get_key(event: MessageEvent):
+        def get_key(event: MessageEvent) -> tuple[Optional[int], Optional[int]]:
             if isinstance(event, GroupMessageEvent):
-                return f'{event.group_id}'
+                return event.group_id, None
             else:
-                return f'{event.user_id}'
+                return None, event.user_id
     elif mode == 'user_shared':
-        def get_key(event: MessageEvent):
-            return f'{event.user_id}'
+        def get_key(event: MessageEvent) -> tuple[Optional[int], Optional[int]]:
+            return None, event.user_id
     elif mode == 'independent':
-        def get_key(event: MessageEvent):
+        def get_key(event: MessageEvent) -> tuple[Optional[int], Optional[int]]:
             if isinstance(event, GroupMessageEvent):
-                return f'{event.group_id}.{event.user_id}'
+                return event.group_id, event.user_id
             else:
-                return f'{event.user_id}'
+                return None, event.user_id
     else:
         raise Exception(f'{mode} is not a given mode.')
     
-    def _call_later(key: str):
-        if key in ACTIVITY:
-            ACTIVITY[key] -= 1
-            if ACTIVITY[key] <= 0:
-                del ACTIVITY[key]
-    
+    def hit(key: tuple[Optional[int], Optional[int]]) -> bool:
+        # 主进程未创建共享限流表时使用进程内计数
+        if shared and (table := hazard.SHARED_RATE_LIMIT) is not None:
+            return table.hit((namespace, *key), num, time, wall_time())
+        return limiter.hit(key)
+
     async def _frequency(handler: Handler, event: MessageEvent):
-        key = get_key(event)
-        if key in ACTIVITY and ACTIVITY[key] >= num:
+        if not hit(get_key(event)):
             if prompt:
                 await handler.send(prompt)
             return False
-        ACTIVITY[key] = ACTIVITY.get(key, 0) + 1
-        handler.loop.call_later(time, _call_later, key)
         return True
-    return Condition(_frequency)
+    return Condition(_frequency, stateful=True)
 
 
-def Cooldown(cd: float = 10, mode: Literal['group_shared', 'user_shared', 'independent'] = 'independent', prompt: Optional[MessageLike] = None) -> Condition:
+def Cooldown(cd: float = 10, mode: Literal['group_shared', 'user_shared', 'independent'] = 'independent', prompt: Optional[MessageLike] = None, shared: bool = False, name: Optional[str] = None) -> Condition:
     '''
     ## 创建一个冷却条件
     
@@ -160,8 +169,10 @@ def Cooldown(cd: float = 10, mode: Literal['group_shared', 'user_shared', 'indep
         - user_shared: 用户的所有会话[群聊|私聊]共用一个计时器
         - independent: 用户的每个会话[群聊|私聊]单独使用一个计时器
     - prompt: 未到冷却时间时发送的内容
+    - shared: 是否在所有插件组(子进程)间共享冷却, 冷却在重启后保留
+    - name: 共享冷却的名称, `shared`为`True`时必须提供, 名称相同的共享条件共用冷却
     '''
-    return Frequency(1, cd, mode, prompt)
+    return Frequency(1, cd, mode, prompt, shared, name)
 
 
 def Probability(p: float) -> Condition:
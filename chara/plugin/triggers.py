@@ -1,12 +1,17 @@
 import re
+import time
+import weakref
 
 from contextvars import ContextVar
 from dataclasses import dataclass
-from typing import Optional, Type
+from typing import Any, Iterable, Optional, Type
 
 from chara.core.bot import Bot
+from chara.core.hazard import TRIGGER_REMOVED_CALLBACKS, WORKER_STATS
 from chara.core.plugin import Condition, Trigger, TriggerCapturedData
-from chara.lib.commandparse import CommandParser, ParseResult
+from chara.lib.ahocorasick import AhoCorasick
+from chara.lib.commandparse import CommandIndex, CommandParser, ParseResult
+from chara.lib.prefilter import LiteralPrefilter, required_literals
 from chara.onebot.events import Event, MessageEvent
 
 
@@ -24,7 +29,84 @@ class CommandTriggerCapturedData(TriggerCapturedData):
     result: ParseResult
 
 
-def event_trigger(event_type: Type[Event], condition: Optional[Condition] = None, block: bool = False, name: Optional[str] = None, priority: int = 1) -> Trigger:
+@dataclass(repr=False, eq=False, slots=True)
+class KeywordTriggerCapturedData(TriggerCapturedData):
+    '''## 关键词触发器触发时捕获数据'''
+    
+    keywords: list[str]
+    '''## 出现的关键词(按首次出现顺序, 不重复)'''
+    hits: list[tuple[int, str]]
+    '''## 所有出现的`(起始位置, 关键词)`'''
+
+
+@dataclass(repr=False, eq=False, slots=True)
+class RegexTriggerStats:
+    '''## 正则触发器匹配统计'''
+
+    trigger: weakref.ReferenceType[Trigger]
+    pattern: re.Pattern[str]
+    literals: Optional[frozenset[str]]
+    '''## 匹配时必然出现的字面量, `None`时无法预过滤'''
+    checks: int = 0
+    '''## 检查次数'''
+    filtered: int = 0
+    '''## 被预过滤跳过的次数'''
+    matches: int = 0
+    '''## 匹配成功次数'''
+    elapsed_ns: int = 0
+    '''## 执行正则表达式的总耗时'''
+
+    def json(self) -> dict[str, Any]:
+        searched = self.checks - self.filtered
+        trigger = self.trigger()
+        plugin = getattr(trigger, 'plugin', None)
+        return {
+            'name': trigger.name if trigger else None,
+            'plugin': plugin.metadata.name if plugin else None,
+            'pattern': self.pattern.pattern,
+            'literals': sorted(self.literals) if self.literals is not None else None,
+            'checks': self.checks,
+            'filtered': self.filtered,
+            'matches': self.matches,
+            'search_rate': searched / self.checks if self.checks else 0.0,
+            'match_rate': self.matches / self.checks if self.checks else 0.0,
+            'elapsed_ns': self.elapsed_ns,
+            'avg_search_ns': self.elapsed_ns // searched if searched else 0,
+        }
+
+
+# 当前进程(插件组)内所有正则触发器共用的字面量预过滤
+_REGEX_PREFILTER = LiteralPrefilter()
+# 触发器被回收后对应的统计随之移出
+_REGEX_STATS: weakref.WeakKeyDictionary[Trigger, RegexTriggerStats] = weakref.WeakKeyDictionary()
+# 触发器失效并移出插件或被回收时释放其占用的预过滤字面量与命令索引
+_RELEASES: weakref.WeakKeyDictionary[Trigger, weakref.finalize] = weakref.WeakKeyDictionary()
+# 当前进程(插件组)内所有命令触发器共用的命令索引
+_COMMAND_INDEX = CommandIndex()
+
+
+def regex_trigger_stats() -> list[dict[str, Any]]:
+    '''
+    ## 当前插件组内各正则触发器的匹配统计
+
+    按执行正则表达式的总耗时从高到低排列
+    '''
+    return [stats.json() for stats in sorted(_REGEX_STATS.values(), key=lambda s: s.elapsed_ns, reverse=True)]
+
+
+def _release_trigger(trigger: Trigger) -> None:
+    # 仍然有效的触发器可能被重新添加, 留待回收时释放
+    if trigger.alive:
+        return
+    _REGEX_STATS.pop(trigger, None)
+    if (finalizer := _RELEASES.pop(trigger, None)) is not None:
+        finalizer()
+
+
+TRIGGER_REMOVED_CALLBACKS.append(_release_trigger)
+WORKER_STATS['regex_triggers'] = regex_trigger_stats
+
+def event_trigger(event_type: Type[Event], condition: Optional[Condition] = None, block: bool = False, name: Optional[str] = None, priority: int = 1, concurrency: Optional[int] = None, ordered: bool = False, timeout: Optional[float] = None) -> Trigger:
     '''
     ## 创建一个基于事件类型的触发器
 
@@ -34,6 +116,9 @@ def event_trigger(event_type: Type[Event], condition: Optional[Condition] = None
     - condition: 条件
     - priority: 优先度
     - block: 是否阻塞低优先度触发器
+    - concurrency: 同时执行的事件处理流程上限, `None`时使用插件组的`trigger_concurrency`
+    - ordered: 同一会话[群聊按群号, 其他按QQ号]内的事件处理流程是否按触发顺序依次执行
+    - timeout: 每个事件处理流程的超时时间(s), 超时后取消, `None`时使用插件组的`handler_timeout`
     ---
     ### 触发时捕获数据结构
     - `TriggerCapturedData`
@@ -45,19 +130,24 @@ def event_trigger(event_type: Type[Event], condition: Optional[Condition] = None
             context.set(trigger.captured_data_factory(bot=bot, event=event, extra=dict()))
             return True
         return False
-    return Trigger(Condition(checker) & condition, block, priority, name, TriggerCapturedData)
+    return Trigger(Condition(checker) & condition, block, priority, name, TriggerCapturedData, (event_type, ), concurrency, ordered, timeout)
 
-def regex_trigger(pattern: str | re.Pattern[str], flags: re.RegexFlag = re.S, condition: Optional[Condition] = None, block: bool = False, name: Optional[str] = None, priority: int = 1) -> Trigger:
+def regex_trigger(pattern: str | re.Pattern[str], flags: re.RegexFlag = re.S, condition: Optional[Condition] = None, block: bool = False, name: Optional[str] = None, priority: int = 1, concurrency: Optional[int] = None, ordered: bool = False, timeout: Optional[float] = None) -> Trigger:
     '''
     ## 创建一个基于正则表达式的触发器
 
+    同一插件组内的正则触发器先一次性查找各正则表达式必然出现的字面量, 仅在字面量存在时执行完整的正则匹配
+
     ---
     ### 参数
     - pattern: 正则表达式
-    - flags: 正则标记
+    - flags: 正则标记[`pattern`为已编译的正则表达式时忽略]
     - condition: 条件
     - priority: 优先度
     - block: 是否阻塞低优先度触发器
+    - concurrency: 同时执行的事件处理流程上限, `None`时使用插件组的`trigger_concurrency`
+    - ordered: 同一会话[群聊按群号, 其他按QQ号]内的事件处理流程是否按触发顺序依次执行
+    - timeout: 每个事件处理流程的超时时间(s), 超时后取消, `None`时使用插件组的`handler_timeout`
     ---
     ### 触发时捕获数据结构
     - `RegexTriggerCatchedData`
@@ -65,23 +155,85 @@ def regex_trigger(pattern: str | re.Pattern[str], flags: re.RegexFlag = re.S, co
         - `extra`: dict
         - `matched`: re.Match[str]
     '''
+    compiled = pattern if isinstance(pattern, re.Pattern) else re.compile(pattern, flags)
+    literals = required_literals(compiled)
+    if literals is not None:
+        _REGEX_PREFILTER.add(literals)
+
     def checker(bot: Bot, event: MessageEvent, trigger: Trigger, context: ContextVar[TriggerCapturedData]) -> bool:
-        if matched := re.search(pattern, event.pure_text.strip(), flags):
+        text = event.pure_text.strip()
+        stats.checks += 1
+        # 文本中不含必然出现的字面量时跳过正则匹配
+        if literals is not None and literals.isdisjoint(_REGEX_PREFILTER.search(text)):
+            stats.filtered += 1
+            return False
+
+        start = time.perf_counter_ns()
+        matched = compiled.search(text)
+        stats.elapsed_ns += time.perf_counter_ns() - start
+        if matched:
+            stats.matches += 1
             context.set(trigger.captured_data_factory(bot=bot, event=event, extra=dict(), matched=matched))
             return True
         return False
-    return Trigger(Condition(checker) & condition, block, priority, name, RegexTriggerCapturedData)
 
-def command_trigger(parser: CommandParser, condition: Optional[Condition] = None, block: bool = False, name: Optional[str] = None, priority: int = 1) -> Trigger:
+    trigger = Trigger(Condition(checker) & condition, block, priority, name, RegexTriggerCapturedData, (MessageEvent, ), concurrency, ordered, timeout)
+    stats = _REGEX_STATS[trigger] = RegexTriggerStats(weakref.ref(trigger), compiled, literals)
+    if literals is not None:
+        finalizer = _RELEASES[trigger] = weakref.finalize(trigger, _REGEX_PREFILTER.remove, literals)
+        finalizer.atexit = False
+    return trigger
+
+def keyword_trigger(keywords: Iterable[str] | AhoCorasick, condition: Optional[Condition] = None, block: bool = False, name: Optional[str] = None, priority: int = 1, ignore_case: bool = False, concurrency: Optional[int] = None, ordered: bool = False, timeout: Optional[float] = None) -> Trigger:
+    '''
+    ## 创建一个基于关键词的触发器
+
+    使用Aho-Corasick自动机对`pure_text`进行一次扫描找出所有关键词, 耗时与关键词数量无关
+
+    需要在运行中增删关键词时传入`AhoCorasick`实例并保留其引用
+
+    ---
+    ### 参数
+    - keywords: 关键词或`AhoCorasick`实例
+    - condition: 条件
+    - priority: 优先度
+    - block: 是否阻塞低优先度触发器
+    - ignore_case: 是否忽略大小写[`keywords`为`AhoCorasick`实例时忽略]
+    - concurrency: 同时执行的事件处理流程上限, `None`时使用插件组的`trigger_concurrency`
+    - ordered: 同一会话[群聊按群号, 其他按QQ号]内的事件处理流程是否按触发顺序依次执行
+    - timeout: 每个事件处理流程的超时时间(s), 超时后取消, `None`时使用插件组的`handler_timeout`
+    ---
+    ### 触发时捕获数据结构
+    - `KeywordTriggerCapturedData`
+        - `event`: Event
+        - `extra`: dict
+        - `keywords`: list[str]
+        - `hits`: list[tuple[int, str]]
+    '''
+    automaton = keywords if isinstance(keywords, AhoCorasick) else AhoCorasick(keywords, ignore_case)
+
+    def checker(bot: Bot, event: MessageEvent, trigger: Trigger, context: ContextVar[TriggerCapturedData]) -> bool:
+        if hits := automaton.search(event.pure_text):
+            context.set(trigger.captured_data_factory(bot=bot, event=event, extra=dict(), keywords=list(dict.fromkeys(keyword for _, keyword in hits)), hits=hits))
+            return True
+        return False
+    return Trigger(Condition(checker) & condition, block, priority, name, KeywordTriggerCapturedData, (MessageEvent, ), concurrency, ordered, timeout)
+
+def command_trigger(parser: CommandParser, condition: Optional[Condition] = None, block: bool = False, name: Optional[str] = None, priority: int = 1, concurrency: Optional[int] = None, ordered: bool = False, timeout: Optional[float] = None) -> Trigger:
     '''
     ## 创建一个基于命令解析器的触发器
 
+    同一插件组内的命令触发器共用一次命令分割, 仅命令起始匹配的解析器会进行解析
+
     ---
     ### 参数
     - parser: 命令解析器
     - condition: 条件
     - priority: 优先度
     - block: 是否阻塞低优先度触发器
+    - concurrency: 同时执行的事件处理流程上限, `None`时使用插件组的`trigger_concurrency`
+    - ordered: 同一会话[群聊按群号, 其他按QQ号]内的事件处理流程是否按触发顺序依次执行
+    - timeout: 每个事件处理流程的超时时间(s), 超时后取消, `None`时使用插件组的`handler_timeout`
     ---
     ### 触发时捕获数据结构
     - `CommandTriggerCatchedData`
@@ -89,19 +241,28 @@ def command_trigger(parser: CommandParser, condition: Optional[Condition] = None
         - `extra`: dict
         - `result`: ParseResult
     '''
+    _COMMAND_INDEX.add(parser)
+
     def checker(bot: Bot, event: MessageEvent, trigger: Trigger, context: ContextVar[TriggerCapturedData]) -> bool:
-        if result := parser.parse(event.pure_text.strip()):
+        if result := _COMMAND_INDEX.parse(parser, event.pure_text.strip()):
             context.set(trigger.captured_data_factory(bot=bot, event=event, extra=dict(), result=result))
             return True
         return False
-    return Trigger(Condition(checker) & condition, block, priority, name, CommandTriggerCapturedData)
+    trigger = Trigger(Condition(checker) & condition, block, priority, name, CommandTriggerCapturedData, (MessageEvent, ), concurrency, ordered, timeout)
+    finalizer = _RELEASES[trigger] = weakref.finalize(trigger, _COMMAND_INDEX.remove, parser)
+    finalizer.atexit = False
+    return trigger
 
 
 __all__ = [
     'event_trigger',
     'regex_trigger',
     'command_trigger',
+    'keyword_trigger',
+    'regex_trigger_stats',
     'RegexTriggerCapturedData',
+    'RegexTriggerStats',
     'CommandTriggerCapturedData',
+    'KeywordTriggerCapturedData',
 ]
 
@@ -0,0 +1,31 @@
+from chara.lib.ahocorasick import AhoCorasick
+
+
+def test_search() -> None:
+    automaton = AhoCorasick(['he', 'she', 'his', 'hers'])
+    assert automaton.search('ushers') == [(1, 'she'), (2, 'he'), (2, 'hers')]
+    assert not automaton.contains_any('xyz')
+
+
+def test_ignore_case() -> None:
+    automaton = AhoCorasick(['Hello'], ignore_case=True)
+    assert 'HELLO' in automaton
+    assert automaton.search('say hELLo') == [(4, 'hello')]
+
+
+def test_remove_prunes_and_rebuilds() -> None:
+    automaton = AhoCorasick(['abcd', 'ab', 'bc'])
+    assert automaton.search('abcd') == [(0, 'ab'), (1, 'bc'), (0, 'abcd')]
+    states = len(automaton._goto)
+    assert automaton.remove('abcd')
+    assert not automaton.remove('abcd')
+    assert automaton.search('abcd') == [(0, 'ab'), (1, 'bc')]
+    # 'abcd'独有的'c', 'd'节点被移除, 'ab'仍然保留
+    assert len(automaton._free) == 2
+    assert automaton.remove('ab')
+    assert automaton.search('abcd') == [(1, 'bc')]
+    # 移除的节点在添加关键词时复用
+    automaton.add('xyz')
+    assert len(automaton._goto) == states
+    assert automaton.search('abxyz') == [(2, 'xyz')]
+    assert set(automaton) == {'bc', 'xyz'}
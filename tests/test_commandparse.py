@@ -0,0 +1,42 @@
+from chara.lib.commandparse import CommandIndex, CommandParser
+
+
+def candidates(index: CommandIndex, command_start: str) -> set[CommandParser]:
+    return index._candidates(command_start)
+
+
+def test_index_kinds() -> None:
+    index = CommandIndex()
+    prefix, literal, always = CommandParser('^/help'), CommandParser('(foo|bar)$'), CommandParser(r'^\d+$')
+    for parser in (prefix, literal, always):
+        index.add(parser)
+    assert candidates(index, '/help') == {prefix, always}
+    assert candidates(index, 'xfoo') == {literal, always}
+    assert index.parse(prefix, '/help') is not None
+    assert index.parse(prefix, '/hel') is None
+    assert index.parse(always, '123') is not None
+
+
+def test_remove() -> None:
+    index = CommandIndex()
+    prefix, literal, always = CommandParser('^/help'), CommandParser('(foo|bar)$'), CommandParser(r'^\d+$')
+    for parser in (prefix, literal, always):
+        index.add(parser)
+    for parser in (prefix, literal, always):
+        index.remove(parser)
+    assert not index.parsers
+    assert not index._prefixes and not index._prefix_lengths
+    assert not index._literals and not index._prefilter.literals
+    assert not index._always
+    assert candidates(index, '/help') == set()
+
+
+def test_remove_counts_references() -> None:
+    index = CommandIndex()
+    parser = CommandParser('^/help')
+    index.add(parser)
+    index.add(parser)
+    index.remove(parser)
+    assert index.parse(parser, '/help') is not None
+    index.remove(parser)
+    assert parser not in index.parsers
@@ -0,0 +1,68 @@
+import pickle
+
+from typing import Any
+
+from chara.core.bot.event import get_event
+from chara.onebot.events import GroupMessageEvent, MessageEvent, PrivateMessageEvent
+from chara.onebot.message import Message
+
+
+def group_message(**kwargs: Any) -> dict[str, Any]:
+    data = {
+        'time': 1700000000,
+        'self_id': 10,
+        'post_type': 'message',
+        'message_type': 'group',
+        'sub_type': 'normal',
+        'message_id': 1,
+        'group_id': 100,
+        'user_id': 20,
+        'raw_message': '[CQ:reply,id=1][CQ:at,qq=10] a[b]',
+        'message': [
+            {'type': 'reply', 'data': {'id': '1'}},
+            {'type': 'at', 'data': {'qq': '10'}},
+            {'type': 'text', 'data': {'text': ' a[b]'}},
+        ],
+        'sender': {'user_id': 20, 'nickname': 'chara', 'role': 'member'},
+    }
+    data.update(kwargs)
+    return data
+
+
+def test_compact_is_model_instance() -> None:
+    event = get_event(group_message(), True)
+    assert type(event) is GroupMessageEvent
+    assert isinstance(event, MessageEvent)
+    private = get_event(group_message(message_type='private'), True)
+    assert type(private) is PrivateMessageEvent
+    assert private.at_me
+
+
+def test_compact_matches_validated() -> None:
+    model = get_event(group_message())
+    compact = get_event(group_message(), True)
+    assert isinstance(model, GroupMessageEvent) and isinstance(compact, GroupMessageEvent)
+    assert compact.model_dump() == model.model_dump()
+    for name in ('pure_text', 'at_ids', 'at_all', 'at_me', 'reply_id'):
+        assert getattr(compact, name) == getattr(model, name), name
+    assert compact.sender.role == 'member'
+    assert pickle.loads(pickle.dumps(compact)).model_dump() == model.model_dump()
+    assert compact.model_copy().pure_text == model.pure_text
+
+
+def test_compact_missing_field() -> None:
+    data = group_message()
+    del data['group_id']
+    assert get_event(data, True) is None
+
+
+def test_deferred_message() -> None:
+    raw = group_message()['message']
+    message = Message.deferred(raw)
+    assert message.pure_text == ' a&#91;b&#93;'
+    assert message.at_ids == [10]
+    assert message._raw is raw
+    assert str(message) == str(Message(raw))
+    assert message._raw is None
+    message.segments.pop()
+    assert message.pure_text == ''
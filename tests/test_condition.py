@@ -0,0 +1,68 @@
+import asyncio
+
+from typing import Any
+
+from chara.core.hazard import CONTEXT_EVENT_CACHE
+from chara.core.plugin.condition import Checker, Condition
+
+
+def run(coro: Any) -> Any:
+    return asyncio.run(coro)
+
+
+def test_cost_order_and_short_circuit() -> None:
+    calls: list[str] = list()
+
+    async def stateful(value: int) -> bool:
+        calls.append('stateful')
+        return True
+
+    def expensive(value: int) -> bool:
+        calls.append('expensive')
+        return value > 0
+
+    def cheap(value: int) -> bool:
+        calls.append('cheap')
+        return value != 2
+
+    condition = Condition(Checker(stateful, stateful=True)) & Condition(expensive, cost=10) & Condition(cheap)
+    assert [checker.func for checker in condition.checkers] == [cheap, expensive, stateful]
+    assert run(condition(1))
+    assert calls == ['cheap', 'expensive', 'stateful']
+    calls.clear()
+    # 不满足的检查器之后不再执行, 有状态的检查器不会被计数
+    assert not run(condition(2))
+    assert calls == ['cheap']
+
+
+def test_invert_and_unbound() -> None:
+    def positive(value: int) -> bool:
+        return value > 0
+
+    condition = -Condition(positive)
+    assert run(condition(-1))
+    assert not run(condition(1))
+    # 无法绑定参数时条件不满足
+    assert not run(condition('text'))
+
+
+def test_pure_cached_per_event() -> None:
+    calls: list[int] = list()
+
+    def pure(value: int) -> bool:
+        calls.append(value)
+        return True
+
+    first = Condition(pure, pure=True)
+    second = Condition(pure, pure=True)
+
+    async def main() -> None:
+        CONTEXT_EVENT_CACHE.set(dict())
+        value = 1000
+        assert await first(value)
+        assert await second(value)
+        assert calls == [1000]
+        CONTEXT_EVENT_CACHE.set(dict())
+        assert await first(value)
+        assert calls == [1000, 1000]
+    run(main())
@@ -0,0 +1,39 @@
+from typing import Iterator
+
+import pytest
+
+from chara.core.bot import event as event_module
+from chara.core.bot.event import event_key, get_event_class, register_event
+from chara.onebot.events import Event, GroupMessageEvent, MessageEvent, NoticeEvent, PrivateMessageEvent
+
+
+@pytest.fixture
+def table() -> Iterator[None]:
+    saved = dict(event_module._EVENT_TABLE)
+    yield
+    event_module._EVENT_TABLE.clear()
+    event_module._EVENT_TABLE.update(saved)
+
+
+def test_builtin_lookup() -> None:
+    assert get_event_class({'post_type': 'message', 'message_type': 'group', 'sub_type': 'normal'}) is GroupMessageEvent
+    assert get_event_class({'post_type': 'message', 'message_type': 'private'}) is PrivateMessageEvent
+    # 未知的细分类型回退至post_type
+    assert get_event_class({'post_type': 'message', 'message_type': 'guild'}) is MessageEvent
+    assert get_event_class({'post_type': 'notice', 'notice_type': 'unknown'}) is NoticeEvent
+
+
+def test_register_overrides(table: None) -> None:
+    @register_event
+    class AnonymousMessageEvent(GroupMessageEvent):
+        sub_type: str = 'anonymous'
+
+    assert event_key(AnonymousMessageEvent) == ('message_type', 'group', 'anonymous')
+    assert get_event_class({'post_type': 'message', 'message_type': 'group', 'sub_type': 'anonymous'}) is AnonymousMessageEvent
+    assert get_event_class({'post_type': 'message', 'message_type': 'group', 'sub_type': 'normal'}) is GroupMessageEvent
+
+
+def test_unknown_post_type(table: None) -> None:
+    assert get_event_class({'post_type': 'custom'}) is event_module._EVENT_TABLE.get((None, None, None))
+    register_event(Event, (None, None, None))
+    assert get_event_class({'post_type': 'custom'}) is Event
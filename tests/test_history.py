@@ -0,0 +1,50 @@
+from pathlib import Path
+
+import pytest
+
+from chara.core.plugin import history as history_module
+from chara.core.plugin.history import HistoryBudget, SessionHistory
+
+
+@pytest.fixture
+def budget(monkeypatch: pytest.MonkeyPatch) -> HistoryBudget:
+    budget = HistoryBudget(3)
+    monkeypatch.setattr(history_module, '_BUDGET', budget)
+    return budget
+
+
+def test_maxsize(budget: HistoryBudget) -> None:
+    history = SessionHistory(2)
+    for i in range(5):
+        history.put(i) # type: ignore
+    assert list(history) == [3, 4]
+    assert budget.size == 2
+
+
+def test_budget_evicts_oldest_across_histories(budget: HistoryBudget) -> None:
+    first, second = SessionHistory(-1), SessionHistory(-1)
+    first.put(1) # type: ignore
+    second.put(2) # type: ignore
+    first.put(3) # type: ignore
+    second.put(4) # type: ignore
+    assert budget.size == 3
+    assert list(first) == [3]
+    assert list(second) == [2, 4]
+    # 清空后释放预算, 失效项不再被移出
+    second.clear()
+    assert budget.size == 1
+    first.put(5) # type: ignore
+    first.put(6) # type: ignore
+    assert list(first) == [3, 5, 6]
+
+
+def test_spill(budget: HistoryBudget, tmp_path: Path) -> None:
+    history = SessionHistory(2, lambda: SessionHistory.spill_path(tmp_path))
+    for i in range(5):
+        history.put(i) # type: ignore
+    assert list(history) == [0, 1, 2, 3, 4]
+    assert len(history) == 5
+    assert len(list(tmp_path.iterdir())) == 1
+    history.clear()
+    assert list(history) == []
+    assert list(tmp_path.iterdir()) == []
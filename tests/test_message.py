@@ -0,0 +1,51 @@
+import pickle
+
+from chara.onebot.message import Message, MessageSegment
+
+
+def message() -> Message:
+    return Message([
+        {'type': 'text', 'data': {'text': 'hello '}},
+        {'type': 'at', 'data': {'qq': '10'}},
+        {'type': 'at', 'data': {'qq': 'all'}},
+        {'type': 'text', 'data': {'text': 'a,b'}},
+    ])
+
+
+def test_derived() -> None:
+    msg = message()
+    assert msg.pure_text == 'hello a&#44;b'
+    assert msg.at_ids == [10]
+    assert msg.at_all
+    assert msg.pure_text is msg.pure_text
+
+
+def test_list_mutation_invalidates() -> None:
+    msg = message()
+    assert msg.pure_text == 'hello a&#44;b'
+    msg.segments.append(MessageSegment.text('!'))
+    assert msg.pure_text == 'hello a&#44;b!'
+    del msg.segments[0]
+    assert msg.pure_text == 'a&#44;b!'
+    msg.segments = [MessageSegment.at('20')]
+    assert (msg.pure_text, msg.at_ids, msg.at_all) == ('', [20], False)
+
+
+def test_data_mutation_invalidates_shared_segments() -> None:
+    first = message()
+    second = Message(first)
+    assert first.at_ids == second.at_ids == [10]
+    first.segments[1].data['qq'] = '11'
+    assert first.at_ids == second.at_ids == [11]
+    second.segments[0].type = 'face'
+    assert first.pure_text == second.pure_text == 'a&#44;b'
+    first.segments[3].data = {'text': 'c'}
+    assert first.pure_text == second.pure_text == 'c'
+
+
+def test_pickle() -> None:
+    msg = pickle.loads(pickle.dumps(message()))
+    assert msg.pure_text == 'hello a&#44;b'
+    msg.segments[0].data['text'] = 'bye '
+    assert msg.pure_text == 'bye a&#44;b'
+    assert msg.array == [{'type': 'text', 'data': {'text': 'bye '}}, {'type': 'at', 'data': {'qq': '10'}}, {'type': 'at', 'data': {'qq': 'all'}}, {'type': 'text', 'data': {'text': 'a&#44;b'}}]
@@ -0,0 +1,26 @@
+from chara.lib.prefilter import LiteralPrefilter, required_literals
+
+
+def test_required_literals() -> None:
+    assert required_literals(r'hello\s+world') == frozenset({'hello'})
+    assert required_literals(r'(foo|bar)\d') == frozenset({'foo', 'bar'})
+    assert required_literals(r'\d+') is None
+
+
+def test_search_implied() -> None:
+    prefilter = LiteralPrefilter()
+    prefilter.add(['abc', 'b'])
+    assert prefilter.search('xxabcxx') == frozenset({'abc', 'b'})
+    assert prefilter.search('xxbxx') == frozenset({'b'})
+
+
+def test_remove_counts_references() -> None:
+    prefilter = LiteralPrefilter()
+    prefilter.add(['foo', 'bar'])
+    prefilter.add(['foo'])
+    prefilter.remove(['foo', 'bar'])
+    assert prefilter.literals == {'foo'}
+    assert prefilter.search('foo bar') == frozenset({'foo'})
+    prefilter.remove(['foo'])
+    assert prefilter.literals == set()
+    assert prefilter.search('foo') == frozenset()
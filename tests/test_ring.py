@@ -0,0 +1,82 @@
+from uuid import uuid4
+
+import pytest
+
+from chara.core.share import SharedRingBuffer
+
+
+NAMES: dict[SharedRingBuffer, str] = dict()
+
+
+@pytest.fixture
+def ring():
+    name = f'test-ring-{uuid4()}'
+    writer = SharedRingBuffer(name, 64)
+    NAMES[writer] = name
+    yield writer
+    del NAMES[writer]
+    writer.close()
+    writer.unlink()
+
+
+def attach(writer: SharedRingBuffer) -> SharedRingBuffer:
+    # 同一名字再次创建时连接已有的共享内存, 与子进程相同
+    return SharedRingBuffer(NAMES[writer], writer.capacity)
+
+
+def test_read_in_order(ring: SharedRingBuffer) -> None:
+    reader = attach(ring)
+    for data in (b'a', b'bb', b'ccc'):
+        ring.write(data)
+    assert list(reader.read()) == [b'a', b'bb', b'ccc']
+    assert list(reader.read()) == []
+
+
+def test_read_until(ring: SharedRingBuffer) -> None:
+    reader = attach(ring)
+    ring.write(b'first')
+    until = ring.cursor
+    ring.write(b'second')
+    assert list(reader.read(until)) == [b'first']
+    assert list(reader.read(until)) == []
+    assert list(reader.read(ring.cursor)) == [b'second']
+
+
+def test_wrap(ring: SharedRingBuffer) -> None:
+    reader = attach(ring)
+    for index in range(20):
+        data = bytes([index]) * 10
+        ring.write(data)
+        assert list(reader.read()) == [data]
+    assert reader.lost == 0
+
+
+def test_lapped_reader_skips(ring: SharedRingBuffer) -> None:
+    reader = attach(ring)
+    ring.write(b'0' * 10)
+    until = ring.cursor
+    for _ in range(10):
+        ring.write(b'1' * 10)
+    assert list(reader.read(until)) == []
+    assert reader.lost == 1
+    # 越过被覆盖的数据后仍能读取新数据
+    ring.write(b'new')
+    assert list(reader.read())[-1] == b'new'
+
+
+def test_oversized_record(ring: SharedRingBuffer) -> None:
+    with pytest.raises(ValueError):
+        ring.write(b'x' * 64)
+
+
+def test_worker_filters_by_mask(ring: SharedRingBuffer) -> None:
+    from types import SimpleNamespace
+
+    from chara.core.workers.worker import SIGNAL_RING, WorkerProcess
+
+    received: list[bytes] = list()
+    worker = SimpleNamespace(ring=attach(ring), ring_slot=1, name='test', receive=received.append)
+    for mask, data in ((0b10, b'mine'), (0b01, b'other'), (0b11, b'both')):
+        ring.write(bytes([1, mask]) + data)
+    WorkerProcess._receive(worker, SIGNAL_RING + ring.cursor.to_bytes(8)) # type: ignore
+    assert received == [b'mine', b'both']
@@ -0,0 +1,199 @@
+import asyncio
+import random
+
+from types import SimpleNamespace
+from typing import Any, Optional
+
+from chara.core.hazard import CONTEXT_LOOP
+from chara.core.plugin.runner import HandlerScheduler
+
+
+class FakePlugin:
+    def __init__(self, name: str) -> None:
+        self.metadata = SimpleNamespace(name=name)
+
+
+PLUGIN = FakePlugin('test')
+
+
+class FakeTrigger:
+    def __init__(self, priority: int = 1, concurrency: Optional[int] = None, plugin: Any = PLUGIN) -> None:
+        self.priority = priority
+        self.concurrency = concurrency
+        self.plugin = plugin
+        self.name = f'p{priority}'
+
+
+def run(coro: Any) -> Any:
+    async def main() -> Any:
+        CONTEXT_LOOP.set(asyncio.get_running_loop())
+        return await coro
+    return asyncio.run(main())
+
+
+async def drain() -> None:
+    for _ in range(10):
+        await asyncio.sleep(0)
+
+
+def test_global_concurrency() -> None:
+    async def main() -> None:
+        scheduler = HandlerScheduler(2, 10, 10, 100)
+        trigger = FakeTrigger()
+        running = peak = done = 0
+        gate = asyncio.Event()
+
+        async def job() -> None:
+            nonlocal running, peak, done
+            running += 1
+            peak = max(peak, running)
+            await gate.wait()
+            running -= 1
+            done += 1
+
+        for _ in range(5):
+            assert scheduler.submit(trigger, job) # type: ignore
+        await drain()
+        assert (scheduler.running, scheduler.pending) == (2, 3)
+        gate.set()
+        await drain()
+        assert (peak, done, scheduler.pending) == (2, 5, 0)
+    run(main())
+
+
+def test_priority_order() -> None:
+    async def main() -> None:
+        scheduler = HandlerScheduler(1, 10, 10, 100)
+        gate = asyncio.Event()
+        order: list[str] = list()
+
+        def job(name: str) -> Any:
+            async def run() -> None:
+                if name == 'first':
+                    await gate.wait()
+                order.append(name)
+            return run
+
+        scheduler.submit(FakeTrigger(1), job('first')) # type: ignore
+        scheduler.submit(FakeTrigger(5), job('low')) # type: ignore
+        scheduler.submit(FakeTrigger(0), job('high')) # type: ignore
+        await drain()
+        gate.set()
+        await drain()
+        assert order == ['first', 'high', 'low']
+    run(main())
+
+
+def test_queue_drop_policy() -> None:
+    async def main() -> None:
+        scheduler = HandlerScheduler(1, 10, 10, 1)
+        gate = asyncio.Event()
+        order: list[str] = list()
+
+        def job(name: str) -> Any:
+            async def run() -> None:
+                await gate.wait()
+                order.append(name)
+            return run
+
+        assert scheduler.submit(FakeTrigger(1), job('running')) # type: ignore
+        assert scheduler.submit(FakeTrigger(5), job('low')) # type: ignore
+        # 新流程优先度更高时丢弃最低一道中最早的流程
+        assert scheduler.submit(FakeTrigger(0), job('high')) # type: ignore
+        # 新流程优先度不高于最低一道时丢弃新流程
+        assert not scheduler.submit(FakeTrigger(3), job('dropped')) # type: ignore
+        assert scheduler.stats.dropped == 2
+        gate.set()
+        await drain()
+        assert order == ['running', 'high']
+    run(main())
+
+
+def test_key_follows_ticket_order() -> None:
+    async def main() -> None:
+        scheduler = HandlerScheduler(10, 10, 10, 100)
+        trigger = FakeTrigger()
+        order: list[int] = list()
+
+        def job(ticket: int) -> Any:
+            async def run() -> None:
+                order.append(ticket)
+            return run
+
+        first = scheduler.reserve('key')
+        second = scheduler.reserve('key')
+        # 后分发的事件先检查完毕, 仍需等待更早的事件
+        scheduler.submit(trigger, job(second), 'key', second) # type: ignore
+        scheduler.settle('key', second)
+        await drain()
+        assert order == []
+        scheduler.submit(trigger, job(first), 'key', first) # type: ignore
+        scheduler.settle('key', first)
+        await drain()
+        assert order == [first, second]
+    run(main())
+
+
+def test_trigger_concurrency_with_many_keys() -> None:
+    async def main() -> None:
+        scheduler = HandlerScheduler(100, 100, 100, 10000)
+        trigger = FakeTrigger(concurrency=1)
+        peak = running = done = 0
+
+        async def job() -> None:
+            nonlocal peak, running, done
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0)
+            running -= 1
+            done += 1
+
+        for key in range(2000):
+            scheduler.submit(trigger, job, key) # type: ignore
+        while scheduler.pending or scheduler.running:
+            await asyncio.sleep(0)
+        assert (peak, done) == (1, 2000)
+    run(main())
+
+
+def test_random_limits_and_order() -> None:
+    async def main() -> None:
+        rng = random.Random(0)
+        plugins = [FakePlugin(f'plugin{index}') for index in range(3)]
+        triggers = [FakeTrigger(rng.randrange(3), rng.choice([None, 1, 2]), rng.choice(plugins)) for _ in range(6)]
+        scheduler = HandlerScheduler(4, 3, 2, 10000)
+        running: dict[Any, int] = dict()
+        key_running: set[Any] = set()
+        finished: dict[tuple[Any, str], list[int]] = dict()
+        submitted = 0
+
+        def job(trigger: FakeTrigger, key: str, ticket: int) -> Any:
+            async def run() -> None:
+                assert (trigger, key) not in key_running
+                key_running.add((trigger, key))
+                for resource, limit in ((None, 4), (trigger.plugin, 3), (trigger, trigger.concurrency or 2)):
+                    running[resource] = running.get(resource, 0) + 1
+                    assert running[resource] <= limit
+                for _ in range(rng.randrange(3)):
+                    await asyncio.sleep(0)
+                for resource in (None, trigger.plugin, trigger):
+                    running[resource] -= 1
+                key_running.discard((trigger, key))
+                finished.setdefault((trigger, key), list()).append(ticket)
+            return run
+
+        for _ in range(300):
+            key = rng.choice('abc')
+            ticket = scheduler.reserve(key)
+            chosen = rng.sample(triggers, rng.randrange(3))
+            for trigger in chosen:
+                scheduler.submit(trigger, job(trigger, key, ticket), key, ticket) # type: ignore
+                submitted += 1
+            scheduler.settle(key, ticket)
+            if rng.random() < 0.5:
+                await asyncio.sleep(0)
+        while scheduler.pending or scheduler.running:
+            await asyncio.sleep(0)
+        assert sum(map(len, finished.values())) == submitted
+        assert all(tickets == sorted(tickets) for tickets in finished.values())
+    run(main())
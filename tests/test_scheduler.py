@@ -0,0 +1,79 @@
+import asyncio
+
+from typing import Any
+
+import pytest
+
+from chara.core import hazard
+from chara.core.plugin.scheduler import TriggerScheduler
+from chara.onebot.events import Event, GroupMessageEvent, NoticeEvent
+
+
+CHECKED: list[str] = list()
+
+
+class FakeTrigger:
+    def __init__(self, name: str, priority: int, block: bool = False, triggered: bool = True, event_types: tuple[type, ...] = (Event, )) -> None:
+        self.name = name
+        self.priority = priority
+        self.block = block
+        self.triggered = triggered
+        self.event_types = event_types
+        self.alive = True
+        self.plugin: Any = None
+
+    async def check(self, bot: Any, event: Event) -> bool:
+        CHECKED.append(self.name)
+        return self.triggered
+
+
+class FakePlugin:
+    def __init__(self, *triggers: FakeTrigger) -> None:
+        self.triggers = list(triggers)
+        for trigger in triggers:
+            trigger.plugin = self
+
+    def remove_trigger(self, trigger: FakeTrigger) -> None:
+        self.triggers.remove(trigger)
+
+
+@pytest.fixture
+def scheduler(monkeypatch: pytest.MonkeyPatch) -> TriggerScheduler:
+    CHECKED.clear()
+    for name in list(hazard.PLUGINS):
+        monkeypatch.delitem(hazard.PLUGINS, name)
+    return TriggerScheduler()
+
+
+def notice() -> NoticeEvent:
+    return NoticeEvent(time=0, self_id=1, notice_type='test')
+
+
+def test_priority_across_plugins(scheduler: TriggerScheduler, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(hazard.PLUGINS, 'a', FakePlugin(FakeTrigger('a2', 2), FakeTrigger('a0', 0)))
+    monkeypatch.setitem(hazard.PLUGINS, 'b', FakePlugin(FakeTrigger('b1', 1), FakeTrigger('b0', 0)))
+    asyncio.run(scheduler._handle_event(None, notice())) # type: ignore
+    # 优先度相同时保持插件导入顺序与添加顺序
+    assert CHECKED == ['a0', 'b0', 'b1', 'a2']
+
+
+def test_block_stops_later_triggers(scheduler: TriggerScheduler, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setitem(hazard.PLUGINS, 'a', FakePlugin(
+        FakeTrigger('unmatched', 0, block=True, triggered=False),
+        FakeTrigger('blocking', 1, block=True),
+        FakeTrigger('after', 2),
+    ))
+    asyncio.run(scheduler._handle_event(None, notice())) # type: ignore
+    # 未触发的block触发器不阻止之后的触发器
+    assert CHECKED == ['unmatched', 'blocking']
+
+
+def test_event_type_index_and_dead(scheduler: TriggerScheduler, monkeypatch: pytest.MonkeyPatch) -> None:
+    dead = FakeTrigger('dead', 0)
+    dead.alive = False
+    plugin = FakePlugin(dead, FakeTrigger('message', 1, event_types=(GroupMessageEvent, )), FakeTrigger('any', 2))
+    monkeypatch.setitem(hazard.PLUGINS, 'a', plugin)
+    asyncio.run(scheduler._handle_event(None, notice())) # type: ignore
+    assert CHECKED == ['any']
+    assert dead not in plugin.triggers
+    assert [trigger.name for trigger in scheduler.triggers] == ['message', 'any']
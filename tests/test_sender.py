@@ -0,0 +1,54 @@
+from typing import Any
+
+from chara.core.workers.sender import OverflowPolicy, WorkerSender
+
+
+def sender(overflow: OverflowPolicy, maxsize: int = 2) -> WorkerSender:
+    sender = WorkerSender(None, maxsize, overflow) # type: ignore
+    # 不启动写入线程, 仅检查队列
+    sender._task = object() # type: ignore
+    return sender
+
+
+def queued(sender: WorkerSender) -> list[Any]:
+    return [data for data, _, _ in sender.queue]
+
+
+def test_drop_oldest() -> None:
+    s = sender('drop_oldest')
+    for data in (b'1', b'2', b'3'):
+        assert s.put_nowait(data)
+    assert queued(s) == [b'2', b'3']
+    assert s.dropped == 1
+
+
+def test_drop_meta() -> None:
+    s = sender('drop_meta')
+    s.put_nowait(b'meta', True)
+    s.put_nowait(b'1')
+    # 新的元事件直接丢弃, 其他事件先丢弃队列中的元事件
+    assert not s.put_nowait(b'meta2', True)
+    assert s.put_nowait(b'2')
+    assert queued(s) == [b'1', b'2']
+    assert s.put_nowait(b'3')
+    assert queued(s) == [b'1', b'2', b'3']
+    assert s.dropped == 2
+
+
+def test_block_grows() -> None:
+    s = sender('block')
+    for data in (b'1', b'2', b'3'):
+        assert s.put_nowait(data)
+    assert queued(s) == [b'1', b'2', b'3']
+    assert s.max_depth == 3
+    assert s.dropped == 0
+
+
+def test_coalesce_tail() -> None:
+    s = sender('drop_oldest')
+    s.put_nowait(b'a', coalesce=True)
+    s.put_nowait(b'b', coalesce=True)
+    assert queued(s) == [b'b']
+    s.put_nowait(b'c')
+    s.put_nowait(b'd', coalesce=True)
+    assert queued(s) == [b'c', b'd']
@@ -0,0 +1,42 @@
+from types import SimpleNamespace
+
+from chara.core.plugin.session import SessionRegistry
+from chara.onebot.events import GroupMessageEvent, MessageEvent, NoticeEvent, PrivateMessageEvent
+
+
+def session(self_id, gid, uid, event_types=(MessageEvent, )):
+    return SimpleNamespace(self_id=self_id, gid=gid, uid=uid, event_types=event_types)
+
+
+def test_count() -> None:
+    registry = SessionRegistry()
+    first, second = session(1, 10, None), session(None, None, 20)
+    registry.add(first)
+    registry.add(first)
+    registry.add(second)
+    assert len(registry) == 2
+    registry.discard(first)
+    registry.discard(first)
+    assert len(registry) == 1
+
+
+def test_wants_sessions() -> None:
+    registry = SessionRegistry()
+    registry.add(session(1, 10, None)) # type: ignore
+    registry.add(session(None, None, 20, (NoticeEvent, ))) # type: ignore
+    assert registry.wants(GroupMessageEvent, 1, 10, 99)
+    assert not registry.wants(GroupMessageEvent, 2, 10, 99)
+    assert not registry.wants(NoticeEvent, 1, 10, 99)
+    assert registry.wants(NoticeEvent, 2, None, 20)
+    assert not registry.wants(PrivateMessageEvent, 2, None, 20)
+
+
+def test_wants_waiters() -> None:
+    registry = SessionRegistry()
+    registry.add_waiter(SimpleNamespace(key=(1, 10, None))) # type: ignore
+    registry.add_waiter(SimpleNamespace(key=(1, None, 20))) # type: ignore
+    assert registry.wants(GroupMessageEvent, 1, 10, 99)
+    assert not registry.wants(GroupMessageEvent, 1, 11, 99)
+    assert registry.wants(PrivateMessageEvent, 1, None, 20)
+    assert not registry.wants(NoticeEvent, 1, 10, 20)
+    assert len(registry) == 2
@@ -0,0 +1,44 @@
+import uuid
+
+from typing import Iterator
+
+import pytest
+
+from chara.core.share import SharedRateLimitTable
+from chara.plugin.conditions import Cooldown, Frequency
+
+
+@pytest.fixture
+def table() -> Iterator[SharedRateLimitTable]:
+    table = SharedRateLimitTable(f'test-ratelimit-{uuid.uuid4()}', 8, 4)
+    yield table
+    table.close()
+    table.unlink()
+
+
+def test_hit_window(table: SharedRateLimitTable) -> None:
+    assert table.hit('a', 2, 10, 0)
+    assert table.hit('a', 2, 10, 1)
+    assert not table.hit('a', 2, 10, 2)
+    assert table.hit('b', 2, 10, 2)
+    assert table.hit('a', 2, 10, 10)
+
+
+def test_hit_probe_bounded(table: SharedRateLimitTable, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(SharedRateLimitTable, 'MAX_PROBE', 2)
+    for i in range(8):
+        table.hit(i, 1, 100, 0)
+    # 表已满且均未过期, 新键总是允许
+    assert table.hit('new', 1, 100, 1)
+    assert table.hit('new', 1, 100, 1)
+    # 过期的位置被复用
+    assert table.hit('new', 1, 100, 200)
+    assert not table.hit('new', 1, 100, 201)
+
+
+def test_shared_requires_name() -> None:
+    with pytest.raises(ValueError):
+        Frequency(1, 10, shared=True)
+    with pytest.raises(ValueError):
+        Cooldown(10, shared=True)
+    Cooldown(10, shared=True, name='test')
@@ -0,0 +1,57 @@
+import gc
+
+from chara.core.hazard import TRIGGER_REMOVED_CALLBACKS
+from chara.plugin import triggers
+from chara.plugin.triggers import regex_trigger
+
+
+def remove(trigger) -> None:
+    for callback in TRIGGER_REMOVED_CALLBACKS:
+        callback(trigger)
+
+
+def test_removed_regex_trigger_releases_literals() -> None:
+    trigger = regex_trigger(r'removed-literal\d+')
+    assert 'removed-literal' in triggers._REGEX_PREFILTER.literals
+    remove(trigger)
+    # 仍然有效的触发器可能被重新添加
+    assert 'removed-literal' in triggers._REGEX_PREFILTER.literals
+    trigger.alive = False
+    remove(trigger)
+    assert 'removed-literal' not in triggers._REGEX_PREFILTER.literals
+    assert trigger not in triggers._REGEX_STATS
+
+
+def test_collected_regex_trigger_releases_literals() -> None:
+    trigger = regex_trigger(r'collected-literal\d+')
+    assert 'collected-literal' in triggers._REGEX_PREFILTER.literals
+    del trigger
+    gc.collect()
+    assert 'collected-literal' not in triggers._REGEX_PREFILTER.literals
+
+
+def test_shared_literal_kept_for_other_trigger() -> None:
+    first = regex_trigger(r'shared-literal\d+a')
+    second = regex_trigger(r'shared-literal\s+b')
+    first.alive = False
+    remove(first)
+    assert 'shared-literal' in triggers._REGEX_PREFILTER.literals
+    second.alive = False
+    remove(second)
+    assert 'shared-literal' not in triggers._REGEX_PREFILTER.literals
+
+
+def test_removed_command_trigger_leaves_index() -> None:
+    from chara.lib.commandparse import CommandParser
+    from chara.plugin.triggers import command_trigger
+
+    parser = CommandParser('^/removed-command')
+    trigger = command_trigger(parser)
+    assert parser in triggers._COMMAND_INDEX.parsers
+    trigger.alive = False
+    remove(trigger)
+    assert parser not in triggers._COMMAND_INDEX.parsers
+    trigger = command_trigger(parser)
+    del trigger
+    gc.collect()
+    assert parser not in triggers._COMMAND_INDEX.parsers